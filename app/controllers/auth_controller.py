@@ -1,5 +1,12 @@
 from app.models import usuario_model
+from app.models import sessao_model
+from app.utils import sessao_local
+from config import settings
 import bcrypt # Importamos a biblioteca de hashing
+import hashlib
+import secrets
+import threading
+import time
 
 """
 Camada Controller (Controlador) para Autenticação.
@@ -9,12 +16,122 @@ Responsabilidade:
 - Validar entradas do usuário (email, senha).
 - Usar bcrypt para comparar senhas de forma segura.
 - Retornar o status do login para a View.
+- Manter a sessão "lembrar de mim" (token local + tabela 'sessoes').
+
+As funções daqui são lentas de propósito (bcrypt): a View deve chamá-las
+em segundo plano (app/utils/background.py), nunca na thread do Tk.
 """
 
-def login(email, senha):
+# Usuários já buscados por pre_carregar_usuario() (email -> (momento, dados)).
+# Enquanto a pessoa digita a senha, a consulta ao banco já foi feita;
+# ao clicar em "Entrar", resta só a verificação do bcrypt.
+_pre_carregados = {}
+_pre_carregados_lock = threading.Lock()
+# Validade (segundos) de um usuário pré-carregado
+PRE_CARREGADO_VALIDADE = 60
+
+def pre_carregar_usuario(email):
+    """
+    Busca antecipadamente o usuário de 'email' (ex: quando o campo de e-mail
+    perde o foco), para que o login só precise conferir a senha.
+    Não retorna dados à View: o hash da senha fica só aqui no Controller.
+    """
+    if not email or not email.strip():
+        return
+    user_data = usuario_model.get_user_by_email(email)
+    with _pre_carregados_lock:
+        _pre_carregados[email] = (time.monotonic(), user_data)
+
+def _obter_usuario(email):
+    """ Usa o usuário pré-carregado (se recente) ou consulta o banco. """
+    with _pre_carregados_lock:
+        pre_carregado = _pre_carregados.pop(email, None)
+    if pre_carregado is not None:
+        momento, user_data = pre_carregado
+        if user_data and time.monotonic() - momento <= PRE_CARREGADO_VALIDADE:
+            print(f"Controller (Auth): Usando usuário '{email}' pré-carregado.")
+            return user_data
+    return usuario_model.get_user_by_email(email)
+
+def _custo_do_hash(hash_str):
+    """ Custo (rounds) de um hash bcrypt no formato '$2b$12$...'. """
+    try:
+        return int(hash_str.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+def _atualizar_custo_se_necessario(user_id, senha_bytes, hash_str):
+    """
+    Se o hash foi gerado com um custo menor que o configurado
+    (settings.BCRYPT_ROUNDS), gera um novo hash com o custo atual.
+    Só é possível no login, que é quando temos a senha em texto puro.
+    """
+    if _custo_do_hash(hash_str) >= settings.BCRYPT_ROUNDS:
+        return
+    try:
+        novo_hash = bcrypt.hashpw(senha_bytes, bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
+        if usuario_model.update_senha_hash(user_id, novo_hash):
+            print(f"Controller (Auth): Hash do usuário #{user_id} atualizado para custo {settings.BCRYPT_ROUNDS}.")
+    except Exception as e:
+        # Não impede o login: tenta de novo no próximo
+        print(f"Controller (Auth): Não foi possível atualizar o custo do hash. {e}")
+
+def _montar_user_info(user_data):
+    """ Dados do usuário logado que vão para a "sessão" das Views. """
+    return {
+        "id": user_data['id'],
+        "nome": user_data['nome_completo'],
+        "email": user_data['email'],
+        "perfil": user_data['perfil'] # Ex: 'empresa', 'proprietario'
+    }
+
+def _hash_token(token):
+    # O banco guarda só o hash: quem ler a tabela 'sessoes' não consegue entrar.
+    # SHA-256 basta (e é rápido): o token é aleatório, não uma senha.
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _lembrar_sessao(user_id):
+    """ Cria a sessão persistente e guarda o token neste computador. """
+    token = secrets.token_urlsafe(32)
+    expira_em = sessao_model.create_sessao(user_id, _hash_token(token), settings.SESSAO_DIAS)
+    if expira_em is None or not sessao_local.salvar(token):
+        # Não impede o login: só não será lembrado na próxima vez
+        print("Controller (Auth): Não foi possível lembrar a sessão.")
+
+def restaurar_sessao():
+    """
+    Tenta entrar com a sessão "lembrar de mim" salva neste computador,
+    sem e-mail, senha nem bcrypt (uma única consulta ao banco).
+    Retorna (True, user_info) ou (False, None).
+    """
+    token = sessao_local.ler()
+    if token is None:
+        return (False, None)
+
+    user_data = sessao_model.get_usuario_por_sessao(_hash_token(token))
+    if not user_data:
+        # Expirada, revogada ou usuário desativado: o token não serve mais
+        print("Controller (Auth): Sessão salva não é mais válida.")
+        sessao_local.apagar()
+        return (False, None)
+
+    print(f"Controller (Auth): Sessão restaurada para {user_data['email']}.")
+    return (True, _montar_user_info(user_data))
+
+def encerrar_sessao():
+    """ "Sair": revoga a sessão lembrada (se houver) e apaga o token local. """
+    token = sessao_local.ler()
+    sessao_local.apagar()
+    if token is not None:
+        sessao_model.revogar_sessao(_hash_token(token))
+    return (True, None)
+
+def login(email, senha, lembrar=False):
     """
     Controlador para tentar realizar o login.
     Recebe email e senha (texto puro) da View.
+    'lembrar=True' mantém o usuário conectado nas próximas aberturas
+    (por settings.SESSAO_DIAS dias).
     """
     
     # --- 1. Validação de Lógica de Negócio ---
@@ -26,8 +143,8 @@ def login(email, senha):
     # --- 2. Chamada ao Model ---
     
     print(f"Controller (Auth): Buscando usuário '{email}' no Model.")
-    # Busca o usuário no banco de dados
-    user_data = usuario_model.get_user_by_email(email)
+    # Busca o usuário no banco de dados (ou usa o que já foi pré-carregado)
+    user_data = _obter_usuario(email)
     
     # --- 3. Verificação de Segurança (Hashing) ---
     
@@ -51,13 +168,11 @@ def login(email, senha):
         
         if is_valid:
             print(f"Controller (Auth): Login bem-sucedido para {email}.")
+            _atualizar_custo_se_necessario(user_data['id'], senha_bytes, user_data['senha_hash'].strip())
+            if lembrar:
+                _lembrar_sessao(user_data['id'])
             # Login OK. Retornamos os dados do usuário para a "sessão"
-            user_info = {
-                "id": user_data['id'],
-                "nome": user_data['nome_completo'],
-                "email": user_data['email'],
-                "perfil": user_data['perfil'] # Ex: 'empresa', 'proprietario'
-            }
+            user_info = _montar_user_info(user_data)
             # (Sucesso, Dados do Usuário)
             return (True, user_info)
         else:
@@ -30,33 +30,66 @@ def enviar_mensagem(os_id, remetente_id, conteudo):
     else:
         return (False, "Erro ao enviar mensagem.")
 
-def buscar_chat_os(os_id):
+def buscar_chat_os(os_id, apos_id=None):
     """
     Busca o histórico de mensagens e FORMATA os dados para a View.
+    Com 'apos_id', traz só as mensagens mais novas que ela (busca incremental).
     """
     if not os_id:
         return (False, [])
         
-    print(f"Controller (Chat): Buscando histórico da OS #{os_id}...")
+    print(f"Controller (Chat): Buscando histórico da OS #{os_id} (após a mensagem {apos_id})...")
     
-    mensagens_raw = chat_model.get_messages_by_os(os_id)
-    mensagens_formatadas = []
+    mensagens_raw = chat_model.get_messages_by_os(os_id, apos_id)
     
     # Formata os dados para facilitar a vida da View
-    for msg in mensagens_raw:
-        # Converte datetime para string "DD/MM/YYYY HH:MM"
-        data_obj = msg['data_envio']
-        data_fmt = data_obj.strftime('%d/%m %H:%M') if data_obj else "--/--"
+    mensagens_formatadas = [_formatar_mensagem(msg) for msg in mensagens_raw]
         
-        # Cria um dicionário limpo para a View
-        msg_dict = {
-            'id': msg['id'],
-            'remetente_id': msg['remetente_id'],
-            'nome': msg['remetente_nome'] or "Usuário Desconhecido", # Caso tenha sido deletado
-            'perfil': msg['remetente_perfil'],
-            'texto': msg['conteudo'],
-            'data': data_fmt
-        }
-        mensagens_formatadas.append(msg_dict)
-        
-    return (True, mensagens_formatadas)
\ No newline at end of file
+    return (True, mensagens_formatadas)
+
+def buscar_chat_anterior(os_id, antes=None, limite=chat_model.TAMANHO_PAGINA):
+    """
+    Busca uma página do histórico, da mais recente para a mais antiga.
+    Sem 'antes', traz as últimas 'limite' mensagens (abertura do chat).
+    Para a página anterior, passe o 'cursor_anterior' recebido em 'antes'.
+
+    Retorna (True, {'mensagens': [...], 'cursor_anterior': ...}),
+    com as mensagens em ordem crescente e já formatadas.
+    """
+    if not os_id:
+        return (False, {"mensagens": [], "cursor_anterior": None})
+
+    print(f"Controller (Chat): Buscando página do histórico da OS #{os_id}...")
+
+    mensagens_raw, cursor_anterior = chat_model.get_messages_page(os_id, limite, antes)
+    mensagens_formatadas = [_formatar_mensagem(msg) for msg in mensagens_raw]
+
+    return (True, {"mensagens": mensagens_formatadas, "cursor_anterior": cursor_anterior})
+
+def marcar_como_lidas(os_id, usuario_id, ultima_lida_id):
+    """
+    Registra que o usuário viu as mensagens da OS até 'ultima_lida_id'
+    (zera o contador de não lidas daquela OS na listagem).
+    """
+    if not os_id or not usuario_id or not ultima_lida_id:
+        return (False, "Dados inválidos.")
+
+    if chat_model.marcar_mensagens_lidas(usuario_id, os_id, ultima_lida_id):
+        return (True, "Mensagens marcadas como lidas.")
+    return (False, "Erro ao marcar mensagens como lidas.")
+
+def _formatar_mensagem(msg):
+    """ Converte uma linha do Model no dicionário usado pela View. """
+    # Converte datetime para string "DD/MM HH:MM"
+    data_obj = msg['data_envio']
+    data_fmt = data_obj.strftime('%d/%m %H:%M') if data_obj else "--/--"
+    
+    # Cria um dicionário limpo para a View
+    return {
+        'id': msg['id'],
+        'remetente_id': msg['remetente_id'],
+        'nome': msg['remetente_nome'] or "Usuário Desconhecido", # Caso tenha sido deletado
+        'perfil': msg['remetente_perfil'],
+        'texto': msg['conteudo'],
+        'data': data_fmt
+    }
\ No newline at end of file
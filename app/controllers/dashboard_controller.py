@@ -1,9 +1,8 @@
-from app.models import os_model
-from app.models import estoque_model
+from app.models import dashboard_model
 
 """
 Camada Controller para o Dashboard.
-Agrega dados de múltiplos models.
+Agrega as métricas de OS e Estoque (uma única consulta, ver dashboard_model).
 """
 
 def get_dashboard_data():
@@ -12,19 +11,16 @@ def get_dashboard_data():
     """
     print("Controller (Dash): Coletando métricas...")
     
-    # Busca dados de OS
-    os_stats = os_model.get_os_stats()
-    
-    # Busca dados de Estoque
-    estoque_baixo = estoque_model.get_estoque_baixo_count()
+    # Busca dados de OS e Estoque de uma vez
+    stats = dashboard_model.get_dashboard_stats()
     
     # Monta o objeto final
     data = {
-        "os_abertas": os_stats["total_abertas"],
-        "os_andamento": os_stats["total_em_andamento"],
-        "os_pendentes": os_stats["total_pendentes"],
-        "faturamento": os_stats["valor_em_projetos"],
-        "alertas_estoque": estoque_baixo
+        "os_abertas": stats["total_abertas"],
+        "os_andamento": stats["total_em_andamento"],
+        "os_pendentes": stats["total_pendentes"],
+        "faturamento": stats["valor_em_projetos"],
+        "alertas_estoque": stats["estoque_baixo"]
     }
     
     return (True, data)
\ No newline at end of file
@@ -69,14 +69,17 @@ def salvar_material(data):
 
     # --- 2. Chamada ao Model ---
     print(f"Controller: Dados validados. Enviando para o Model (Create): {dados_formatados}")
-    novo_id = estoque_model.create_material(dados_formatados)
+    # Uma única instrução cria o material OU informa que o SKU já existe
+    novo_id, ja_existia = estoque_model.create_material(dados_formatados)
     
     # --- 3. Resposta para a View ---
     if novo_id:
         return (True, f"Material '{dados_formatados['nome']}' salvo com sucesso! (ID: {novo_id})")
+    elif ja_existia:
+        return (False, f"Erro: O SKU '{dados_formatados['sku']}' já está cadastrado.")
     else:
-        # O Model já imprimiu o erro específico (ex: "UNIQUE constraint failed")
-        return (False, "Erro ao salvar o material no banco de dados. (SKU duplicado?)")
+        # O Model já imprimiu o erro específico
+        return (False, "Erro ao salvar o material no banco de dados.")
 
 
 # --- FUNÇÃO NOVA ---
@@ -166,16 +169,54 @@ def deletar_material(material_id):
 
 
 # --- FUNÇÃO EXISTENTE ---
-def listar_materiais():
+def listar_materiais(filtros=None, limite=estoque_model.TAMANHO_PAGINA, cursor=None, versao_conhecida=None):
     """
-    Controlador para buscar todos os materiais.
-    (Neste caso simples, é apenas um repasse)
+    Controlador para buscar o catálogo de materiais (uma página por vez).
+    'filtros' aceita 'fornecedor', 'localizacao' e 'estoque_baixo' (bool).
+    'limite=None' traz o catálogo inteiro.
+
+    Retorna (True, {'materiais': [...], 'proximo_cursor': ...}).
+    Cada material é uma tupla na ordem de estoque_model.COLUNAS_CATALOGO.
+
+    O resultado traz também 'versao' (da tabela de materiais). Numa recarga da
+    mesma consulta, passe-a em 'versao_conhecida': se nada mudou desde então,
+    retorna só (True, {'nao_modificado': True, 'versao': ...}).
     """
     
-    print("Controller: Solicitando lista de materiais ao Model.")
+    print("Controller: Solicitando página do catálogo de materiais ao Model.")
+    filtros = filtros or {}
+    filtros_formatados = {
+        'fornecedor': (filtros.get('fornecedor') or '').strip(),
+        'localizacao': (filtros.get('localizacao') or '').strip(),
+        'estoque_baixo': bool(filtros.get('estoque_baixo'))
+    }
     try:
-        materiais = estoque_model.get_all_materials()
-        return (True, materiais) # (Sucesso, Dados)
+        # Versão lida ANTES dos dados: se algo mudar no meio, a próxima recarga busca de novo
+        versao, modificado = estoque_model.get_versao_materiais(versao_conhecida if cursor is None else None)
+        if cursor is None and not modificado:
+            return (True, {"nao_modificado": True, "versao": versao})
+
+        materiais, proximo_cursor = estoque_model.get_materials_page(filtros_formatados, limite, cursor)
+        return (True, {"materiais": materiais, "proximo_cursor": proximo_cursor, "versao": versao}) # (Sucesso, Dados)
     except Exception as e:
         print(f"Controller Error: Erro ao listar materiais. {e}")
-        return (False, []) # (Sucesso, Dados)
\ No newline at end of file
+        return (False, {"materiais": [], "proximo_cursor": None}) # (Sucesso, Dados)
+
+
+# --- FUNÇÃO NOVA ---
+def buscar_materiais(termo, limite=10):
+    """
+    Controlador da busca de materiais "enquanto digita" (tela Gerenciar Materiais).
+    Termos com menos de 2 caracteres não consultam o banco.
+    Retorna (True, lista_de_materiais) em ordem de relevância.
+    """
+    termo = (termo or '').strip()
+    if len(termo) < 2:
+        return (True, [])
+
+    try:
+        materiais = estoque_model.search_materials(termo, limite)
+        return (True, materiais)
+    except Exception as e:
+        print(f"Controller Error: Erro ao buscar materiais. {e}")
+        return (False, [])
@@ -1,5 +1,5 @@
 from app.models import os_model
-from app.models import estoque_model # Necessário para o vínculo de materiais
+from app.models import chat_model # Contador de mensagens não lidas na listagem
 import datetime
 import decimal # Necessário para o orçamento
 import re 
@@ -35,14 +35,22 @@ def _validar_e_formatar_dados_os(data):
         print(f"Controller Error: Prioridade inválida '{data['prioridade']}'.")
         return (False, f"Prioridade inválida. Use um de: {VALID_PRIORIDADE}")
         
-    data['status'] = data.get('status', 'aberta').lower()
-    if data['status'] not in VALID_STATUS:
-        print(f"Controller Error: Status inválido '{data['status']}'.")
-        return (False, f"Status inválido. Use um de: {VALID_STATUS}")
-        
+    # O status não é editável aqui: só muda pelas transições (os_model.TRANSICOES_OS)
+    data.pop('status', None)
+
     # Garante que o cliente_id seja passado (ou None)
     data['cliente_id'] = data.get('cliente_id')
 
+    # Proprietário do imóvel (define quem vê e aprova a OS)
+    proprietario_id = data.get('proprietario_id')
+    if proprietario_id in (None, ''):
+        data['proprietario_id'] = None
+    else:
+        try:
+            data['proprietario_id'] = int(proprietario_id)
+        except (TypeError, ValueError):
+            return (False, "Proprietário inválido.")
+
     # 3. Validação e Formatação de Data (String -> Objeto Date)
     data_prevista_str = data.get('data_conclusao_prevista')
     
@@ -69,6 +77,7 @@ def salvar_os(data):
         return (False, dados_ou_erro) 
     
     dados_formatados = dados_ou_erro
+    dados_formatados['status'] = 'aberta' # Toda OS nova começa 'aberta'
 
     print(f"Controller: Dados da OS validados. Enviando para o Model (Create)...")
     novo_id = os_model.create_os(dados_formatados)
@@ -118,39 +127,167 @@ def buscar_os_por_id(os_id):
         print(f"Controller Error: Erro ao buscar OS por ID. {e}")
         return (False, "Erro ao buscar dados da OS. Verifique o console.")
 
+def _validar_filtros_os(filtros):
+    """
+    Função auxiliar PRIVADA para validar os filtros da listagem de OS (vindos da View).
+    Campos vazios são ignorados. Datas no formato DD/MM/AAAA.
+    Retorna (True, filtros_formatados) ou (False, mensagem_erro).
+    """
+    filtros = filtros or {}
+    formatados = {}
+
+    status = (filtros.get('status') or '').strip().lower()
+    if status:
+        if status not in VALID_STATUS:
+            return (False, f"Status inválido. Use um de: {VALID_STATUS}")
+        formatados['status'] = status
+
+    prioridade = (filtros.get('prioridade') or '').strip().lower()
+    if prioridade:
+        if prioridade not in VALID_PRIORIDADE:
+            return (False, f"Prioridade inválida. Use um de: {VALID_PRIORIDADE}")
+        formatados['prioridade'] = prioridade
+
+    for chave in ('data_de', 'data_ate'):
+        data_str = (filtros.get(chave) or '').strip()
+        if data_str:
+            try:
+                formatados[chave] = datetime.datetime.strptime(data_str, '%d/%m/%Y').date()
+            except ValueError:
+                return (False, "Formato de data inválido no filtro. Use DD/MM/AAAA.")
+
+    cliente_id = filtros.get('cliente_id')
+    if cliente_id not in (None, ''):
+        try:
+            formatados['cliente_id'] = int(cliente_id)
+        except (TypeError, ValueError):
+            return (False, "O ID do cliente deve ser um número.")
+
+    endereco = (filtros.get('endereco') or '').strip()
+    if endereco:
+        formatados['endereco'] = endereco
+
+    return (True, formatados)
+
+def _aplicar_filtro_perfil(user_id, perfil, filtros):
+    """
+    Acrescenta a 'filtros' a restrição do perfil do usuário.
+    Usada pela listagem e pela busca por texto, para que as duas
+    mostrem exatamente as mesmas OS. Retorna (True, None) ou (False, mensagem).
+    """
+    # 1. Regra para EMPRESA (Vê tudo)
+    if perfil == 'empresa' or perfil is None: 
+        # (is None mantido para compatibilidade)
+        pass
+        
+    # 2. Regra para PROPRIETÁRIO (só as OS dos seus imóveis)
+    elif perfil == 'proprietario':
+        if not user_id: return (False, "Usuário inválido.")
+        filtros['proprietario_id'] = user_id
+        
+    # 3. Regra para CLIENTE (só as suas OS, independente do filtro da tela)
+    elif perfil == 'cliente':
+        if not user_id: return (False, "Usuário inválido.")
+        filtros['cliente_id'] = user_id
+        
+    else:
+        # Perfil desconhecido
+        return (False, "Perfil de usuário desconhecido.")
+
+    return (True, None)
+
 # --- MUDANÇA IMPORTANTE AQUI (FILTRAGEM) ---
-def listar_os(user_id=None, perfil=None):
+def listar_os(user_id=None, perfil=None, filtros=None, ordenar_por='id', decrescente=True,
+              limite=os_model.TAMANHO_PAGINA, cursor=None, versao_conhecida=None,
+              os_ids_exibidas=None):
     """
     Controlador para buscar Ordens de Serviço.
-    Aplica FILTRAGEM baseada no perfil do usuário.
+    Aplica FILTRAGEM baseada no perfil do usuário, mais os filtros da tela
+    (status, prioridade, período, cliente e endereço), tudo no servidor.
+
+    Retorna uma página: (True, {'ordens': [...], 'proximo_cursor': ...,
+    'nao_lidas': {os_id: quantidade}}), onde 'nao_lidas' conta as mensagens
+    do chat que 'user_id' ainda não viu em cada OS da página.
+    Para a próxima página, passe 'proximo_cursor' em 'cursor'
+    (com os mesmos filtros e ordenação). Em caso de erro: (False, mensagem).
+
+    O resultado traz também 'versao' (da tabela de OS). Numa recarga da mesma
+    consulta, passe-a em 'versao_conhecida': se nada mudou desde então, retorna
+    só (True, {'nao_modificado': True, 'versao': ..., 'nao_lidas': {...}}), sem
+    buscar as OS. O contador de não lidas é de cada usuário e não entra na
+    versão: nesse caso ele vem para as OS de 'os_ids_exibidas' (as da tela).
     """
-    print(f"Controller: Solicitando lista de OS (Perfil: {perfil}, ID: {user_id})")
+    print(f"Controller: Solicitando lista de OS (Perfil: {perfil}, ID: {user_id}, Ordem: {ordenar_por})")
+
+    sucesso_validacao, filtros_ou_erro = _validar_filtros_os(filtros)
+    if not sucesso_validacao:
+        return (False, filtros_ou_erro)
+    filtros_formatados = filtros_ou_erro
+
+    if ordenar_por not in os_model.COLUNAS_ORDENAVEIS_OS:
+        return (False, f"Não é possível ordenar por '{ordenar_por}'.")
     
-    try:
-        # 1. Regra para EMPRESA (Vê tudo)
-        if perfil == 'empresa' or perfil is None: 
-            # (is None mantido para compatibilidade)
-            ordens = os_model.get_all_os()
-            
-        # 2. Regra para PROPRIETÁRIO
-        elif perfil == 'proprietario':
-            if not user_id: return (False, [])
-            ordens = os_model.get_os_by_proprietario(user_id)
-            
-        # 3. Regra para CLIENTE
-        elif perfil == 'cliente':
-            if not user_id: return (False, [])
-            ordens = os_model.get_os_by_cliente(user_id)
-            
-        else:
-            # Perfil desconhecido
-            return (False, [])
+    sucesso_perfil, erro_perfil = _aplicar_filtro_perfil(user_id, perfil, filtros_formatados)
+    if not sucesso_perfil:
+        return (False, erro_perfil)
 
-        return (True, ordens)
+    try:
+        # Versão lida ANTES dos dados: se algo mudar no meio, a próxima recarga busca de novo
+        versao, modificado = os_model.get_versao_os(versao_conhecida if cursor is None else None)
+        if cursor is None and not modificado:
+            nao_lidas = {}
+            if user_id and os_ids_exibidas:
+                nao_lidas = chat_model.get_nao_lidas_por_os(user_id, os_ids_exibidas)
+            return (True, {"nao_modificado": True, "versao": versao, "nao_lidas": nao_lidas})
+
+        ordens, proximo_cursor = os_model.get_os_page(
+            filtros_formatados, ordenar_por, decrescente, limite, cursor
+        )
+        # Uma única consulta agregada para todas as OS da página
+        nao_lidas = {}
+        if user_id and ordens:
+            nao_lidas = chat_model.get_nao_lidas_por_os(user_id, [os['id'] for os in ordens])
+        return (True, {"ordens": ordens, "proximo_cursor": proximo_cursor,
+                       "nao_lidas": nao_lidas, "versao": versao})
 
     except Exception as e:
         print(f"Controller Error: Erro ao listar OS. {e}")
-        return (False, [])
+        return (False, "Não foi possível carregar a lista de Ordens de Serviço.")
+
+def buscar_texto(user_id, perfil, termo, limite=os_model.TAMANHO_PAGINA, cursor=None):
+    """
+    Busca por palavras nas OS (descrição, serviço, endereço) e nas mensagens
+    do chat, em ordem de relevância. Respeita o mesmo filtro de perfil da
+    listagem (listar_os): cada usuário só encontra as OS que pode ver.
+
+    Retorna (True, {'resultados': [...], 'proximo_cursor': ...}) ou (False, mensagem).
+    Cada resultado traz origem ('os'/'mensagem'), os_id, trecho e data (formatada).
+    """
+    termo = (termo or '').strip()
+    if len(termo) < 2:
+        return (False, "Digite ao menos 2 caracteres para buscar.")
+
+    filtros = {}
+    sucesso_perfil, erro_perfil = _aplicar_filtro_perfil(user_id, perfil, filtros)
+    if not sucesso_perfil:
+        return (False, erro_perfil)
+
+    print(f"Controller: Buscando '{termo}' (Perfil: {perfil}, ID: {user_id})")
+    try:
+        linhas, proximo_cursor = os_model.buscar_texto(termo, filtros, limite, cursor)
+
+        resultados = [{
+            'origem': linha['origem'],
+            'id': linha['id'],
+            'os_id': linha['os_id'],
+            'trecho': " ".join(linha['trecho'].split()), # Uma linha só, para a tabela
+            'data': linha['data'].strftime('%d/%m/%Y %H:%M') if linha['data'] else "---"
+        } for linha in linhas]
+        return (True, {"resultados": resultados, "proximo_cursor": proximo_cursor})
+
+    except Exception as e:
+        print(f"Controller Error: Erro na busca por texto. {e}")
+        return (False, "Não foi possível realizar a busca.")
 
 def deletar_os(os_id):
     """ Controlador para deletar uma Ordem de Serviço. """
@@ -187,56 +324,37 @@ def vincular_material_os(os_id, material_id, quantidade):
         if quantidade_num <= 0: return (False, "A quantidade deve ser maior que zero.")
     except ValueError: return (False, "Quantidade inválida.")
 
-    material_data = estoque_model.get_material_by_id(material_id)
-    if not material_data: return (False, "Erro: Material não encontrado no estoque.")
-        
-    estoque_atual = material_data['estoque_atual']
-    preco_custo = material_data['preco_custo']
-    material_nome = material_data['nome']
+    # Baixa condicional + vínculo em um único comando (sem ler o saldo antes):
+    # dois operadores reservando ao mesmo tempo não sobrescrevem o estoque um do outro.
+    print(f"Controller: Reservando {quantidade_num} un. do material ID {material_id} na OS {os_id}...")
+    reserva = os_model.reservar_material_para_os(os_id, material_id, quantidade_num)
+    material_nome = reserva['material_nome']
 
-    if quantidade_num > estoque_atual:
+    if reserva['resultado'] == 'ok':
+        return (True, f"'{material_nome}' adicionado à OS e estoque atualizado!")
+    elif reserva['resultado'] == 'estoque_insuficiente':
         msg = (f"Estoque insuficiente para '{material_nome}'.\n"
-               f"Disponível: {estoque_atual} | Solicitado: {quantidade_num}")
+               f"Disponível: {reserva['disponivel']} | Solicitado: {quantidade_num}")
         return (False, msg)
-
-    print(f"Controller: Adicionando {quantidade_num} de '{material_nome}' (R${preco_custo}) na OS {os_id}...")
-    novo_id_vinculo = os_model.add_material_to_os(os_id, material_id, quantidade_num, preco_custo)
-    
-    if not novo_id_vinculo:
-        return (False, f"O material '{material_nome}' já está adicionado nesta OS.")
-
-    nova_quantidade_estoque = estoque_atual - quantidade_num
-    print(f"Controller: Dando baixa no estoque de '{material_nome}'.")
-    sucesso_baixa = estoque_model.update_material_estoque(material_id, nova_quantidade_estoque)
-    
-    if sucesso_baixa:
-        return (True, f"'{material_nome}' adicionado à OS e estoque atualizado!")
+    elif reserva['resultado'] == 'nao_encontrado':
+        return (False, "Erro: OS ou material não encontrado (pode ter sido excluído).")
+    elif reserva['resultado'] == 'duplicado':
+        return (False, "Este material já está adicionado nesta OS.")
     else:
-        print(f"Controller CRÍTICO: Falha ao dar baixa no estoque.")
-        return (False, "Material adicionado à OS, mas falhou ao atualizar o estoque.")
-
+        return (False, "Erro ao vincular o material. Nenhuma alteração foi salva.")
 
-def desvincular_material_os(os_material_id, material_id, quantidade_removida):
-    material_data = estoque_model.get_material_by_id(material_id)
-    if not material_data: return (False, "Erro: Material não encontrado no estoque.")
-        
-    estoque_atual = material_data['estoque_atual']
-    material_nome = material_data['nome']
 
-    print(f"Controller: Removendo vínculo ID {os_material_id} da OS...")
-    sucesso_remocao = os_model.remove_material_from_os(os_material_id)
-    
-    if not sucesso_remocao: return (False, "Erro ao remover o material da OS.")
+def desvincular_material_os(os_material_id):
+    """
+    Remove o material da OS e estorna ao estoque a quantidade gravada no vínculo.
+    """
+    print(f"Controller: Removendo vínculo ID {os_material_id} da OS e estornando o estoque...")
+    estorno = os_model.estornar_material_da_os(os_material_id)
 
-    nova_quantidade_estoque = estoque_atual + int(quantidade_removida)
-    print(f"Controller: Estornando {quantidade_removida} de '{material_nome}' ao estoque.")
-    sucesso_estorno = estoque_model.update_material_estoque(material_id, nova_quantidade_estoque)
-    
-    if sucesso_estorno:
-        return (True, f"'{material_nome}' removido da OS e estoque estornado!")
+    if estorno:
+        return (True, f"'{estorno['material_nome']}' removido da OS e {estorno['quantidade']} un. estornadas ao estoque!")
     else:
-        print(f"Controller CRÍTICO: Falha ao estornar o estoque.")
-        return (False, "Material removido da OS, mas falhou ao atualizar o estoque.")
+        return (False, "Erro ao remover o material da OS (já removido?). Nenhuma alteração foi salva.")
 
 
 # --- Seção 3: Lógica de Orçamento ---
@@ -262,73 +380,113 @@ def get_orcamento_os(os_id):
 
 def recalcular_e_salvar_orcamento_os(os_id, custo_mao_de_obra_str):
     if not os_id: return (False, "ID da OS inválido.")
-        
-    # 1. Calcular Custo dos Materiais
-    try:
-        materiais_vinculados = os_model.get_materiais_for_os(os_id)
-        total_custo_materiais = decimal.Decimal(0.0)
-        for item in materiais_vinculados:
-            total_custo_materiais += (item['preco_custo_na_data'] * item['quantidade'])
-        print(f"Controller: Custo total de materiais calculado: R$ {total_custo_materiais}")
-    except Exception as e:
-        print(f"Controller Error: Erro ao calcular custo de materiais: {e}")
-        return (False, "Erro ao calcular o custo dos materiais.")
 
-    # 2. Validar Custo de Mão de Obra
+    # 1. Validar Custo de Mão de Obra (antes de tocar no banco)
     try:
         custo_mao_de_obra = decimal.Decimal(custo_mao_de_obra_str if custo_mao_de_obra_str else 0.0)
         if custo_mao_de_obra < 0:
             return (False, "Custo de Mão de Obra não pode ser negativo.")
     except (decimal.InvalidOperation, ValueError):
         return (False, "Valor de Mão de Obra inválido.")
-        
-    # 3. Calcular Total e Salvar no Model
-    custo_total_orcamento = total_custo_materiais + custo_mao_de_obra
-    print(f"Controller: Salvando orçamento... Mat: {total_custo_materiais}, M.O: {custo_mao_de_obra}, Total: {custo_total_orcamento}")
-    
-    sucesso_save = os_model.update_os_orcamento(os_id, total_custo_materiais, custo_mao_de_obra, custo_total_orcamento)
-    
-    if sucesso_save:
-        return (True, "Orçamento recalculado e salvo com sucesso!")
+
+    # 2. Soma dos materiais, total e gravação: tudo numa instrução no banco
+    print(f"Controller: Recalculando orçamento da OS #{os_id} (M.O: {custo_mao_de_obra})...")
+    totais = os_model.recalcular_orcamento_os(os_id, custo_mao_de_obra)
+
+    if totais:
+        return (True, f"Orçamento recalculado e salvo com sucesso!\nTotal: R$ {totais['total']:.2f}")
     else:
         return (False, "Erro ao salvar o orçamento no banco de dados.")
 
 
 # --- Seção 4: Fluxo de Aprovação ---
 
+# As mudanças de status seguem os_model.TRANSICOES_OS e são feitas com um
+# único UPDATE condicional: se a OS já mudou (ex: outro usuário aprovou),
+# a ação é recusada com o motivo, sem sobrescrever o status.
+
+def _motivo_recusa(acao, resultado):
+    """ Mensagem de por que a transição 'acao' não foi aplicada à OS. """
+    if resultado is None:
+        return "OS não encontrada."
+    transicao = os_model.TRANSICOES_OS[acao]
+    status = resultado['status_anterior']
+    if status in transicao['de']:
+        # Status certo: só pode ter falhado a condição extra
+        return transicao['motivo']
+    esperado = " ou ".join(f"'{s}'" for s in transicao['de'])
+    return f"A OS está '{status}' (precisa estar {esperado})."
+
+def _transicionar_os(os_id, acao):
+    """ Aplica 'acao' a uma OS. Retorna (True, None) ou (False, motivo). """
+    resultados = os_model.aplicar_transicao_os([os_id], acao)
+    if resultados is None:
+        return (False, "Erro ao atualizar o status no banco de dados.")
+    resultado = resultados.get(os_id)
+    if resultado and resultado['aplicada']:
+        return (True, None)
+    return (False, _motivo_recusa(acao, resultado))
+
 def enviar_orcamento_para_aprovacao(os_id):
     if not os_id: return (False, "ID da OS inválido.")
-
-    sucesso_get, data_orcamento = get_orcamento_os(os_id)
-    if not sucesso_get or data_orcamento['total'] <= 0:
-        return (False, "Não é possível enviar. O orçamento ainda não foi calculado ou está zerado.")
-
     print(f"Controller: Enviando orçamento da OS #{os_id} para aprovação.")
-    sucesso = os_model.set_os_orcamento_enviado(os_id)
-    
+    sucesso, motivo = _transicionar_os(os_id, 'enviar')
+
     if sucesso:
         return (True, "Orçamento enviado para aprovação com sucesso!")
     else:
-        return (False, "Erro ao enviar orçamento.")
+        return (False, f"Não é possível enviar. {motivo}")
 
 def aprovar_orcamento_os(os_id):
     if not os_id: return (False, "ID da OS inválido.")
     print(f"Controller: Aprovando orçamento da OS #{os_id}.")
-    novo_status = 'em andamento' 
-    sucesso = os_model.set_os_orcamento_aprovado(os_id, novo_status)
+    sucesso, motivo = _transicionar_os(os_id, 'aprovar')
     
     if sucesso:
         return (True, "Orçamento aprovado! O status da OS foi atualizado para 'Em Andamento'.")
     else:
-        return (False, "Erro ao aprovar o orçamento.")
+        return (False, f"Não é possível aprovar. {motivo}")
 
 def rejeitar_orcamento_os(os_id):
     if not os_id: return (False, "ID da OS inválido.")
     print(f"Controller: Rejeitando orçamento da OS #{os_id}.")
-    novo_status = 'aberta'
-    sucesso = os_model.update_os_status(os_id, novo_status)
+    sucesso, motivo = _transicionar_os(os_id, 'rejeitar')
     
     if sucesso:
         return (True, "Orçamento rejeitado. O status da OS voltou para 'Aberta'.")
     else:
-        return (False, "Erro ao rejeitar o orçamento.")
\ No newline at end of file
+        return (False, f"Não é possível rejeitar. {motivo}")
+
+def aplicar_transicao_em_lote(os_ids, acao):
+    """
+    Aplica a mesma transição ('enviar', 'iniciar', 'aprovar', 'rejeitar',
+    'concluir', 'cancelar') a várias OS de uma vez: uma única instrução no banco.
+    Cada OS é tratada por conta própria: as que não estão no status
+    esperado ficam como estão e voltam com o motivo.
+
+    Retorna (True, {"aplicadas": [os_id, ...], "recusadas": {os_id: motivo}})
+    ou (False, mensagem).
+    """
+    if acao not in os_model.TRANSICOES_OS:
+        return (False, f"Ação '{acao}' inválida.")
+    try:
+        os_ids = sorted({int(os_id) for os_id in os_ids})
+    except (TypeError, ValueError):
+        return (False, "Lista de OS inválida.")
+    if not os_ids:
+        return (False, "Nenhuma OS selecionada.")
+
+    print(f"Controller: Aplicando '{acao}' em {len(os_ids)} OS.")
+    resultados = os_model.aplicar_transicao_os(os_ids, acao)
+    if resultados is None:
+        return (False, "Erro ao atualizar o status no banco de dados.")
+
+    aplicadas = []
+    recusadas = {}
+    for os_id in os_ids:
+        resultado = resultados.get(os_id)
+        if resultado and resultado['aplicada']:
+            aplicadas.append(os_id)
+        else:
+            recusadas[os_id] = _motivo_recusa(acao, resultado)
+    return (True, {"aplicadas": aplicadas, "recusadas": recusadas})
@@ -1,5 +1,10 @@
 from app.models import usuario_model
+from config import settings
+from concurrent.futures import ProcessPoolExecutor
 import bcrypt # Para criar o hash da senha
+import csv
+import multiprocessing
+import os
 import re # Para validar o e-mail (Regex)
 
 """
@@ -10,6 +15,7 @@ Responsabilidade:
 - Validar dados (campos, senhas, e-mail duplicado).
 - Criar o HASH seguro da senha (bcrypt).
 - Chamar o Model para salvar o usuário.
+- Importar usuários em lote (CSV ou lista de dicts).
 """
 
 # Lista de perfis válidos (baseado no ENUM do DB)
@@ -18,6 +24,51 @@ VALID_PROFILES = ['empresa', 'proprietario', 'cliente']
 # Expressão regular simples para validar e-mail
 EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
 
+# Abaixo disso, a importação gera os hashes no próprio processo
+# (abrir o pool de processos custaria mais que os hashes)
+MIN_LINHAS_PROCESSOS = 8
+
+
+def _validar_usuario(nome, email, senha, perfil, confirma_senha=None):
+    """
+    Regras de negócio de um novo usuário (dados já normalizados).
+    'confirma_senha=None' pula a confirmação (ex: importação em lote).
+    Retorna a mensagem de erro, ou None se estiver tudo certo.
+    """
+    # Validação de campos vazios
+    campos = [nome, email, senha, perfil]
+    if confirma_senha is not None:
+        campos.append(confirma_senha)
+    if not all(campos):
+        return "Erro: Todos os campos são obrigatórios."
+
+    # Validação de e-mail (formato)
+    if not re.match(EMAIL_REGEX, email):
+        return "Erro: Formato de e-mail inválido."
+
+    # Validação de senhas
+    if confirma_senha is not None and senha != confirma_senha:
+        return "Erro: As senhas não coincidem."
+
+    if len(senha) < 6:
+        return "Erro: A senha deve ter pelo menos 6 caracteres."
+
+    # Validação do perfil
+    if perfil not in VALID_PROFILES:
+        return "Erro: Perfil de usuário inválido."
+
+    return None
+
+def _gerar_hash(senha):
+    """
+    Hash bcrypt (str) de 'senha', com o custo configurado.
+    Função de módulo para poder rodar nos processos da importação em lote.
+    """
+    # Gera o "sal" (com o custo configurado) e cria o hash
+    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS))
+    # Converte o hash (bytes) de volta para string para salvar no DB
+    return senha_hash.decode('utf-8')
+
 
 def register_user(data):
     """
@@ -34,50 +85,16 @@ def register_user(data):
 
     # --- 1. Lógica de Negócio e Validação ---
 
-    # Validação de campos vazios
-    if not nome or not email or not senha or not confirma_senha or not perfil:
-        print("Controller (User): Erro: Todos os campos são obrigatórios.")
-        return (False, "Erro: Todos os campos são obrigatórios.")
-
-    # Validação de e-mail (formato)
-    if not re.match(EMAIL_REGEX, email):
-        print("Controller (User): Erro: Formato de e-mail inválido.")
-        return (False, "Erro: Formato de e-mail inválido.")
-
-    # Validação de senhas
-    if senha != confirma_senha:
-        print("Controller (User): Erro: As senhas não coincidem.")
-        return (False, "Erro: As senhas não coincidem.")
+    erro = _validar_usuario(nome, email, senha, perfil, confirma_senha)
+    if erro:
+        print(f"Controller (User): {erro}")
+        return (False, erro)
         
-    if len(senha) < 6:
-        print("Controller (User): Erro: A senha deve ter pelo menos 6 caracteres.")
-        return (False, "Erro: A senha deve ter pelo menos 6 caracteres.")
-
-    # Validação do perfil
-    if perfil not in VALID_PROFILES:
-        print(f"Controller (User): Erro: Perfil '{perfil}' inválido.")
-        return (False, "Erro: Perfil de usuário inválido.")
-        
-    # --- 2. Verificação de Duplicidade (Model) ---
-    
-    print(f"Controller (User): Verificando se o e-mail '{email}' já existe...")
-    existing_user = usuario_model.get_user_by_email(email)
-    
-    if existing_user:
-        print("Controller (User): Erro: E-mail já cadastrado.")
-        return (False, "Erro: Este e-mail já está em uso.")
-
-    # --- 3. Hashing da Senha (Segurança) ---
+    # --- 2. Hashing da Senha (Segurança) ---
     
     try:
         print("Controller (User): Gerando hash da senha...")
-        senha_bytes = senha.encode('utf-8')
-        
-        # Gera o "sal" e cria o hash
-        senha_hash = bcrypt.hashpw(senha_bytes, bcrypt.gensalt())
-        
-        # Converte o hash (bytes) de volta para string para salvar no DB
-        senha_hash_str = senha_hash.decode('utf-8')
+        senha_hash_str = _gerar_hash(senha)
         
         print("Controller (User): Hash gerado com sucesso.")
 
@@ -85,23 +102,150 @@ def register_user(data):
         print(f"Controller (User): Erro crítico ao gerar hash: {e}")
         return (False, "Erro interno ao processar senha. Tente novamente.")
 
-    # --- 4. Chamada ao Model (Create) ---
+    # --- 3. Chamada ao Model (Create) ---
+    # Uma única instrução cria o usuário OU informa que o e-mail já existe
     
     print(f"Controller (User): Enviando dados para o Model criar o usuário {email}...")
     
-    novo_id = usuario_model.create_user(
+    novo_id, ja_existia = usuario_model.create_user(
         nome=nome, 
         email=email, 
         senha_hash=senha_hash_str, 
         perfil=perfil
     )
 
-    # --- 5. Resposta para a View ---
+    # --- 4. Resposta para a View ---
     
     if novo_id:
         msg = f"Usuário '{nome}' (Perfil: {perfil}) criado com sucesso!"
         return (True, msg)
+    elif ja_existia:
+        print("Controller (User): Erro: E-mail já cadastrado.")
+        return (False, "Erro: Este e-mail já está em uso.")
+    else:
+        return (False, "Erro ao salvar usuário no banco de dados.")
+
+
+def listar_proprietarios():
+    """
+    Proprietários ativos, para escolher o dono do imóvel de uma OS.
+    Retorna (True, [{"id", "nome"}, ...]).
+    """
+    proprietarios = usuario_model.get_users_by_perfil('proprietario')
+    return (True, [{"id": p['id'], "nome": p['nome_completo']} for p in proprietarios])
+
+
+# --- IMPORTAÇÃO EM LOTE ---
+
+def _ler_csv(caminho):
+    """
+    Lê o CSV de usuários (colunas: nome, email, senha, perfil).
+    Aceita vírgula ou ponto e vírgula (padrão do Excel em português).
+    Retorna a lista de (numero_da_linha, dict).
+    """
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(arquivo, dialect=dialeto)
+        # Cabeçalhos sem diferenciar maiúsculas/espaços ("Nome" == "nome ")
+        leitor.fieldnames = [(campo or '').strip().lower() for campo in (leitor.fieldnames or [])]
+        # A linha 1 é o cabeçalho
+        return [(leitor.line_num, linha) for linha in leitor]
+
+def _gerar_hashes(senhas):
+    """ Hashes bcrypt de 'senhas' (mesma ordem), usando todos os núcleos. """
+    if len(senhas) < MIN_LINHAS_PROCESSOS:
+        return [_gerar_hash(senha) for senha in senhas]
+
+    processos = settings.IMPORTACAO_PROCESSOS or os.cpu_count() or 1
+    # 'spawn': o app tem threads (Tk, pool de conexões); um fork copiaria esse estado
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        lote = max(1, len(senhas) // (processos * 4))
+        return list(executor.map(_gerar_hash, senhas, chunksize=lote))
+
+def importar_usuarios(origem):
+    """
+    Importa vários usuários de uma vez.
+    'origem' é o caminho de um CSV (colunas: nome, email, senha, perfil)
+    ou uma lista de dicts com essas chaves.
+
+    1. Valida TODAS as linhas antes de gravar qualquer coisa.
+    2. Gera os hashes das senhas em paralelo (vários processos).
+    3. Grava todas as válidas num único INSERT (e-mails já cadastrados são pulados).
+
+    Retorna (True, resumo) ou (False, mensagem). 'resumo' traz as contagens
+    ('criados', 'existentes', 'invalidos') e o 'relatorio': uma entrada por
+    linha com 'linha', 'email', 'status' ('criado', 'existente' ou 'invalido'),
+    'mensagem' e 'id' (do usuário criado).
+    """
+    # --- 1. Leitura ---
+    if isinstance(origem, str):
+        try:
+            linhas = _ler_csv(origem)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            print(f"Controller (User): Erro ao ler o arquivo de importação: {e}")
+            return (False, "Erro: Não foi possível ler o arquivo CSV.")
     else:
-        # A única falha aqui seria o IntegrityError (e-mail duplicado)
-        # que já checamos, mas é bom ter como fallback.
-        return (False, "Erro ao salvar usuário no banco de dados. (E-mail duplicado?)")
\ No newline at end of file
+        linhas = list(enumerate(origem, start=1))
+
+    if not linhas:
+        return (False, "Erro: Nenhum usuário para importar.")
+
+    # --- 2. Validação de todas as linhas ---
+    relatorio = []
+    validos = []   # (entrada do relatório, nome, email, senha, perfil)
+    emails_vistos = set()
+
+    for numero, dados in linhas:
+        nome = (dados.get('nome') or dados.get('nome_completo') or '').strip()
+        email = (dados.get('email') or '').strip().lower()
+        senha = dados.get('senha') or ''
+        perfil = (dados.get('perfil') or '').strip().lower()
+
+        entrada = {"linha": numero, "email": email, "status": "invalido", "mensagem": "", "id": None}
+        relatorio.append(entrada)
+
+        erro = _validar_usuario(nome, email, senha, perfil)
+        if not erro and email in emails_vistos:
+            erro = "Erro: E-mail repetido na importação."
+        if erro:
+            entrada["mensagem"] = erro
+            continue
+
+        emails_vistos.add(email)
+        validos.append((entrada, nome, email, senha, perfil))
+
+    print(f"Controller (User): Importação: {len(validos)} de {len(linhas)} linha(s) válidas.")
+
+    # --- 3. Hashing em paralelo ---
+    if validos:
+        try:
+            hashes = _gerar_hashes([senha for _, _, _, senha, _ in validos])
+        except Exception as e:
+            print(f"Controller (User): Erro crítico ao gerar hashes: {e}")
+            return (False, "Erro interno ao processar senhas. Tente novamente.")
+
+        # --- 4. Gravação (um único INSERT) ---
+        criados = usuario_model.create_users_bulk([
+            (nome, email, senha_hash, perfil)
+            for (_, nome, email, _, perfil), senha_hash in zip(validos, hashes)
+        ])
+        if criados is None:
+            return (False, "Erro ao salvar usuários no banco de dados. Nenhum usuário foi importado.")
+
+        for entrada, nome, email, _, perfil in validos:
+            if email in criados:
+                entrada.update(status="criado", id=criados[email],
+                               mensagem=f"Usuário '{nome}' (Perfil: {perfil}) criado.")
+            else:
+                entrada.update(status="existente", mensagem="Este e-mail já está em uso.")
+
+    resumo = {"relatorio": relatorio}
+    for status, chave in (("criado", "criados"), ("existente", "existentes"), ("invalido", "invalidos")):
+        resumo[chave] = sum(1 for entrada in relatorio if entrada["status"] == status)
+    return (True, resumo)
@@ -0,0 +1,146 @@
+from app.utils import db_connector
+import psycopg2
+from psycopg2 import extras # Para retornar dicts
+from contextlib import contextmanager
+
+"""
+Camada Model (Base) compartilhada pelos demais Models.
+
+Responsabilidade:
+- Fornecer a Unidade de Trabalho (UnitOfWork): uma conexão e UMA transação
+  para uma ação do Controller que grava em várias funções de Model
+  (leituras isoladas não precisam dela).
+- Fornecer o cursor_scope(), que cada função de Model usa para obter um cursor
+  (dentro do UoW recebido ou numa transação própria).
+- Fornecer a versão (registro de alterações) das tabelas, usada para
+  não recarregar listagens que não mudaram.
+"""
+
+class UnitOfWork:
+    """
+    Agrupa várias chamadas de Model em uma única conexão e transação.
+
+    Uso (no Controller):
+        with UnitOfWork() as uow:
+            material = estoque_model.get_material_by_id(material_id, uow=uow)
+            os_model.add_material_to_os(..., uow=uow)
+
+    - Ao sair do bloco sem erro, faz UM commit.
+    - Se ocorrer uma exceção, ou se set_rollback_only() tiver sido chamado
+      (ex: uma regra de negócio falhou no meio), faz rollback de tudo.
+    """
+
+    def __init__(self):
+        self.conn = None
+        self.committed = False
+        self._rollback_only = False
+
+    def __enter__(self):
+        self.conn = db_connector.get_connection()
+        if self.conn is None:
+            raise psycopg2.OperationalError("Não foi possível obter uma conexão do pool.")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        descartar = exc_type is not None and issubclass(
+            exc_type, (psycopg2.OperationalError, psycopg2.InterfaceError)
+        )
+        try:
+            if exc_type is None and not self._rollback_only:
+                self.conn.commit()
+                self.committed = True
+            elif not self.conn.closed:
+                self.conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            descartar = True
+            raise
+        finally:
+            db_connector.release_connection(self.conn, descartar=descartar)
+            self.conn = None
+        return False # Não "engole" exceções
+
+    def set_rollback_only(self):
+        """ Marca a unidade de trabalho para ser desfeita (rollback) ao final. """
+        self._rollback_only = True
+
+    @property
+    def rollback_only(self):
+        return self._rollback_only
+
+
+@contextmanager
+def cursor_scope(uow=None, dict_cursor=False):
+    """
+    Entrega um cursor para uma função de Model.
+
+    - Com 'uow': usa a conexão da Unidade de Trabalho e NÃO faz commit
+      (quem decide é o UoW). Um erro marca o UoW para rollback.
+    - Sem 'uow': abre uma transação própria, com commit ao final
+      (comportamento de sempre das funções de Model).
+
+    'dict_cursor=True' usa DictCursor (linhas acessíveis por nome de coluna).
+    """
+    cursor_factory = extras.DictCursor if dict_cursor else None
+
+    if uow is not None:
+        cursor = uow.conn.cursor(cursor_factory=cursor_factory)
+        try:
+            yield cursor
+        except BaseException:
+            uow.set_rollback_only()
+            raise
+        finally:
+            cursor.close()
+    else:
+        with db_connector.transaction() as conn:
+            with conn.cursor(cursor_factory=cursor_factory) as cursor:
+                yield cursor
+
+
+def escapar_like(texto):
+    """ Escapa os curingas do LIKE/ILIKE (%, _) digitados pelo usuário. """
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def get_versao_tabelas(tabelas, versao_conhecida=None, uow=None):
+    """
+    Versão ("token") das tabelas para as listagens, a partir do registro de
+    alterações mantido por trigger (migração 005).
+
+    Retorna (versao, modificado): 'versao' é o snapshot atual do banco, que a
+    tela guarda e devolve na próxima recarga em 'versao_conhecida';
+    'modificado' diz se alguma das tabelas mudou desde aquela versão (sempre
+    True sem 'versao_conhecida', ou se ela tiver mais de 1 hora).
+
+    Em caso de erro (ex: migração não aplicada) retorna (None, True);
+    nesse caso quem chama deve sempre buscar os dados completos.
+    """
+    try:
+        with cursor_scope(uow) as cursor:
+            if versao_conhecida is None:
+                cursor.execute("SELECT pg_current_snapshot()::text, CURRENT_TIMESTAMP;")
+                snapshot, data = cursor.fetchone()
+                return ((snapshot, data), True)
+
+            snapshot_conhecido, data_conhecida = versao_conhecida
+            # Alterou se há alteração que o snapshot conhecido não enxergava
+            # (ainda em andamento ou posterior a ele)
+            cursor.execute(
+                """
+                SELECT pg_current_snapshot()::text, CURRENT_TIMESTAMP,
+                       %(data)s < CURRENT_TIMESTAMP - INTERVAL '1 hour'
+                       OR EXISTS (
+                           SELECT 1 FROM alteracoes_tabelas
+                           WHERE tabela = ANY(%(tabelas)s)
+                             AND xid >= pg_snapshot_xmin(%(snapshot)s::pg_snapshot)
+                             AND NOT pg_visible_in_snapshot(xid, %(snapshot)s::pg_snapshot)
+                       );
+                """,
+                {'tabelas': list(tabelas), 'snapshot': snapshot_conhecido, 'data': data_conhecida}
+            )
+            snapshot, data, modificado = cursor.fetchone()
+        return ((snapshot, data), modificado)
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Versão {', '.join(tabelas)}): {error}")
+        return (None, True)
@@ -1,6 +1,5 @@
-from app.utils.db_connector import get_connection, release_connection
+from app.models.base_model import cursor_scope
 import psycopg2
-from psycopg2 import extras
 
 """
 Camada Model (Modelo) para o Chat.
@@ -8,83 +7,172 @@ Camada Model (Modelo) para o Chat.
 Responsabilidade:
 - Salvar mensagens no banco de dados.
 - Buscar histórico de mensagens de uma OS (trazendo o nome do remetente).
+- Buscar só as mensagens novas (posteriores a um ID já exibido).
+- Buscar o histórico em páginas, da mais recente para a mais antiga.
+- Marcar mensagens como lidas e contar as não lidas de várias OS de uma vez.
 """
 
-def create_message(os_id, remetente_id, conteudo):
+# Quantidade padrão de mensagens por página do histórico
+TAMANHO_PAGINA = 50
+
+def create_message(os_id, remetente_id, conteudo, uow=None):
     """
     Salva uma nova mensagem no banco de dados.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO mensagens (os_id, remetente_id, conteudo)
-        VALUES (%s, %s, %s)
-        RETURNING id;
-        """
-        
-        cursor.execute(query, (os_id, remetente_id, conteudo))
-        new_id = cursor.fetchone()[0]
-        conn.commit()
-        
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO mensagens (os_id, remetente_id, conteudo)
+            VALUES (%s, %s, %s)
+            RETURNING id;
+            """
+
+            cursor.execute(query, (os_id, remetente_id, conteudo))
+            new_id = cursor.fetchone()[0]
+
         print(f"Model (Chat): Mensagem enviada na OS #{os_id} pelo User #{remetente_id}.")
         return new_id
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (Chat): Erro ao salvar mensagem: {error}")
-        if conn:
-            conn.rollback()
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def get_messages_by_os(os_id):
+
+def get_messages_by_os(os_id, apos_id=None, uow=None):
     """
-    Busca todas as mensagens de uma OS, ordenadas por data.
+    Busca as mensagens de uma OS, ordenadas por data.
     Faz um JOIN com a tabela de usuários para pegar o nome do remetente.
+
+    'apos_id': traz só as mensagens com ID maior (as que chegaram depois
+    da última que a tela já tem). Usa o índice (os_id, id) da migração 007.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        # Query Inteligente:
-        # Trazemos as colunas da mensagem E a coluna 'nome_completo' do usuário.
-        # Usamos 'LEFT JOIN' para que, se o usuário foi deletado (id nulo),
-        # a mensagem ainda venha (com nome nulo).
-        query = """
-        SELECT 
-            m.id,
-            m.os_id,
-            m.remetente_id,
-            m.conteudo,
-            m.data_envio,
-            u.nome_completo as remetente_nome,
-            u.perfil as remetente_perfil
-        FROM mensagens AS m
-        LEFT JOIN usuarios AS u ON m.remetente_id = u.id
-        WHERE m.os_id = %s
-        ORDER BY m.data_envio ASC;
-        """
-        
-        cursor.execute(query, (os_id,))
-        mensagens = cursor.fetchall()
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            # Query Inteligente:
+            # Trazemos as colunas da mensagem E a coluna 'nome_completo' do usuário.
+            # Usamos 'LEFT JOIN' para que, se o usuário foi deletado (id nulo),
+            # a mensagem ainda venha (com nome nulo).
+            query = """
+            SELECT
+                m.id,
+                m.os_id,
+                m.remetente_id,
+                m.conteudo,
+                m.data_envio,
+                u.nome_completo as remetente_nome,
+                u.perfil as remetente_perfil
+            FROM mensagens AS m
+            LEFT JOIN usuarios AS u ON m.remetente_id = u.id
+            WHERE m.os_id = %(os_id)s
+              AND (%(apos_id)s::bigint IS NULL OR m.id > %(apos_id)s)
+            ORDER BY m.data_envio ASC, m.id ASC;
+            """
+
+            cursor.execute(query, {"os_id": os_id, "apos_id": apos_id})
+            mensagens = cursor.fetchall()
         return mensagens # Lista de dicionários
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (Chat): Erro ao buscar mensagens: {error}")
         return []
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
\ No newline at end of file
+
+def get_messages_page(os_id, limite=TAMANHO_PAGINA, antes=None, uow=None):
+    """
+    Uma página do histórico, "de trás para frente" (paginação keyset).
+
+    Traz as 'limite' mensagens mais recentes ANTERIORES a 'antes', que é o
+    (data_envio, id) da mais antiga que a tela já tem. Sem 'antes', traz as
+    mais recentes da OS. Usa o índice (os_id, data_envio, id) da migração 008,
+    então o custo não depende do tamanho do histórico.
+
+    Retorna (mensagens em ordem crescente de data, cursor_anterior).
+    'cursor_anterior' é None quando não há mensagens mais antigas.
+    """
+    condicao_antes = ""
+    params = {"os_id": os_id, "limite": limite + 1} # Uma a mais indica que existe página anterior
+    if antes is not None:
+        condicao_antes = "AND (m.data_envio, m.id) < (%(antes_data)s, %(antes_id)s)"
+        params['antes_data'], params['antes_id'] = antes
+
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = f"""
+            SELECT
+                m.id,
+                m.os_id,
+                m.remetente_id,
+                m.conteudo,
+                m.data_envio,
+                u.nome_completo as remetente_nome,
+                u.perfil as remetente_perfil
+            FROM mensagens AS m
+            LEFT JOIN usuarios AS u ON m.remetente_id = u.id
+            WHERE m.os_id = %(os_id)s
+              {condicao_antes}
+            ORDER BY m.data_envio DESC, m.id DESC
+            LIMIT %(limite)s;
+            """
+
+            cursor.execute(query, params)
+            mensagens = cursor.fetchall()
+
+        cursor_anterior = None
+        if len(mensagens) > limite:
+            mensagens = mensagens[:limite]
+            mais_antiga = mensagens[-1]
+            cursor_anterior = (mais_antiga['data_envio'], mais_antiga['id'])
+        mensagens.reverse() # A tela exibe da mais antiga para a mais nova
+        return (mensagens, cursor_anterior)
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Chat): Erro ao buscar página do histórico: {error}")
+        return ([], None)
+
+def marcar_mensagens_lidas(usuario_id, os_id, ultima_lida_id, uow=None):
+    """
+    Registra que 'usuario_id' já viu as mensagens da OS até 'ultima_lida_id'.
+    Nunca "volta" o marcador (se já havia um ID maior, ele é mantido).
+    """
+    try:
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO mensagens_lidas (usuario_id, os_id, ultima_lida_id)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (usuario_id, os_id) DO UPDATE SET
+                ultima_lida_id = EXCLUDED.ultima_lida_id,
+                data_leitura = CURRENT_TIMESTAMP
+            WHERE mensagens_lidas.ultima_lida_id < EXCLUDED.ultima_lida_id;
+            """
+            cursor.execute(query, (usuario_id, os_id, ultima_lida_id))
+        return True
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Chat): Erro ao marcar mensagens como lidas: {error}")
+        return False
+
+def get_nao_lidas_por_os(usuario_id, os_ids, uow=None):
+    """
+    Conta, numa única consulta agregada, as mensagens não lidas por
+    'usuario_id' em cada OS de 'os_ids' (as enviadas por ele não contam).
+    Retorna um dict {os_id: quantidade}; OS sem mensagens novas não aparecem.
+    """
+    if not os_ids:
+        return {}
+    try:
+        with cursor_scope(uow) as cursor:
+            query = """
+            SELECT m.os_id, COUNT(*)
+            FROM mensagens AS m
+            LEFT JOIN mensagens_lidas AS l
+                   ON l.os_id = m.os_id AND l.usuario_id = %(usuario_id)s
+            WHERE m.os_id = ANY(%(os_ids)s)
+              AND m.id > COALESCE(l.ultima_lida_id, 0)
+              AND m.remetente_id IS DISTINCT FROM %(usuario_id)s
+            GROUP BY m.os_id;
+            """
+            cursor.execute(query, {"usuario_id": usuario_id, "os_ids": list(os_ids)})
+            contagens = dict(cursor.fetchall())
+        return contagens
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Chat): Erro ao contar mensagens não lidas: {error}")
+        return {}
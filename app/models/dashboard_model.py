@@ -0,0 +1,63 @@
+from app.models.base_model import cursor_scope
+import psycopg2
+
+"""
+Camada Model (Modelo) para o Dashboard.
+
+Responsabilidade:
+- Buscar TODAS as métricas do Dashboard (OS e Estoque) numa única
+  consulta: uma conexão, uma ida ao banco.
+"""
+
+def get_dashboard_stats(uow=None):
+    """
+    Retorna um dicionário com:
+    - 'total_abertas', 'total_em_andamento', 'total_pendentes' (aguardando aprovação)
+    - 'valor_em_projetos': soma dos orçamentos em andamento/concluídos
+    - 'estoque_baixo': materiais abaixo do estoque mínimo
+    """
+    stats = {
+        "total_abertas": 0,
+        "total_em_andamento": 0,
+        "total_pendentes": 0,
+        "valor_em_projetos": 0.00,
+        "estoque_baixo": 0
+    }
+
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            # OS: uma única leitura da tabela, cada métrica com seu FILTER.
+            # Estoque: WHERE (e não FILTER) para o PostgreSQL contar só pelo
+            # índice parcial idx_materiais_estoque_baixo (migração 003).
+            query = """
+            SELECT
+                os.total_abertas,
+                os.total_em_andamento,
+                os.total_pendentes,
+                os.valor_em_projetos,
+                mat.estoque_baixo
+            FROM (
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'aberta') AS total_abertas,
+                    COUNT(*) FILTER (WHERE status = 'em andamento') AS total_em_andamento,
+                    COUNT(*) FILTER (WHERE status = 'aguardando aprovação') AS total_pendentes,
+                    COALESCE(SUM(orcamento_total) FILTER (
+                        WHERE status IN ('em andamento', 'concluída')
+                    ), 0) AS valor_em_projetos
+                FROM ordens_servico
+            ) AS os
+            CROSS JOIN (
+                SELECT COUNT(*) AS estoque_baixo
+                FROM materiais
+                WHERE estoque_atual < estoque_minimo
+            ) AS mat;
+            """
+            cursor.execute(query)
+            linha = cursor.fetchone()
+
+        stats.update(dict(linha))
+        return stats
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Dashboard Stats): {error}")
+        return stats # Retorna zerado em caso de erro
@@ -1,6 +1,5 @@
-from app.utils.db_connector import get_connection, release_connection
+from app.models.base_model import cursor_scope, escapar_like, get_versao_tabelas
 import psycopg2
-from psycopg2 import extras # Para retornar dicts
 
 """
 Camada Model (Modelo) para Estoque.
@@ -12,139 +11,234 @@ Responsabilidade:
 - NÃO deve conter código de interface (isso é da View).
 """
 
-def create_material(data):
+# Colunas do catálogo, NESTA ordem, nas tuplas retornadas por get_materials_page().
+# São exatamente as colunas exibidas nas tabelas de estoque (MainView).
+COLUNAS_CATALOGO = ("id", "sku", "nome", "estoque_atual", "preco_custo", "unidade_medida")
+
+# Quantidade padrão de linhas por página no catálogo
+TAMANHO_PAGINA = 100
+
+def create_material(data, uow=None):
     """
-    Cria um novo material no banco de dados.
+    Cria um novo material no banco de dados, numa única instrução que
+    também detecta SKU já cadastrado (ON CONFLICT, ver migração 012).
     'data' é um dicionário contendo as chaves:
-    'nome', 'sku', 'unidade_medida', 'preco_custo', 
+    'nome', 'sku', 'unidade_medida', 'preco_custo',
     'estoque_atual', 'estoque_minimo', 'fornecedor', 'localizacao'
+
+    Retorna (novo_id, ja_existia):
+    - (id, False):   material criado
+    - (None, True):  o SKU já está cadastrado (nada foi gravado)
+    - (None, False): erro no banco
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection() # Pega uma conexão do pool
-        cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO materiais (
-            nome, sku, unidade_medida, preco_custo, 
-            estoque_atual, estoque_minimo, fornecedor_preferencial, localizacao
-        ) VALUES (
-            %(nome)s, %(sku)s, %(unidade_medida)s, %(preco_custo)s, 
-            %(estoque_atual)s, %(estoque_minimo)s, %(fornecedor)s, %(localizacao)s
-        ) RETURNING id;
-        """
-        
-        # O psycopg2 faz o "sanitize" (limpeza) dos dados, evitando SQL Injection
-        cursor.execute(query, data)
-        
-        new_id = cursor.fetchone()[0] # Pega o ID do material recém-criado
-        conn.commit() # Confirma a transação
-        
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO materiais (
+                nome, sku, unidade_medida, preco_custo,
+                estoque_atual, estoque_minimo, fornecedor_preferencial, localizacao
+            ) VALUES (
+                %(nome)s, %(sku)s, %(unidade_medida)s, %(preco_custo)s,
+                %(estoque_atual)s, %(estoque_minimo)s, %(fornecedor)s, %(localizacao)s
+            )
+            ON CONFLICT (sku) DO NOTHING
+            RETURNING id;
+            """
+
+            # O psycopg2 faz o "sanitize" (limpeza) dos dados, evitando SQL Injection
+            cursor.execute(query, data)
+
+            linha = cursor.fetchone() # Nenhuma linha = SKU já existia
+
+        if linha is None:
+            print(f"Material não criado: SKU '{data.get('sku')}' já cadastrado.")
+            return (None, True)
+
+        new_id = linha[0] # Pega o ID do material recém-criado
         print(f"Material criado com sucesso. ID: {new_id}")
-        return new_id
-        
+        return (new_id, False)
+
     except (Exception, psycopg2.DatabaseError) as error:
+        # A transação já foi desfeita pelo cursor_scope (ou marcada no UoW)
         print(f"Erro ao criar material: {error}")
-        if conn:
-            conn.rollback() # Desfaz a transação em caso de erro
-        return None
-        
-    finally:
-        # Garante que a conexão seja devolvida ao pool, ocorrendo erro ou não
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn) # Devolve a conexão
-
-def get_all_materials():
+        return (None, False)
+
+def get_all_materials(uow=None):
     """
     Busca todos os materiais cadastrados, ordenados por nome.
     Retorna uma lista de dicionários.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
         # Usamos DictCursor para que o resultado venha como dicionário
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        query = "SELECT * FROM materiais ORDER BY nome ASC;"
-        cursor.execute(query)
-        
-        materiais = cursor.fetchall()
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = "SELECT * FROM materiais ORDER BY nome ASC;"
+            cursor.execute(query)
+
+            materiais = cursor.fetchall()
         return materiais # Lista de dicts
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao buscar materiais: {error}")
         return [] # Retorna lista vazia em caso de erro
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
+
+def get_materials_page(filtros=None, limite=TAMANHO_PAGINA, cursor=None, uow=None):
+    """
+    Catálogo de materiais em ordem alfabética, paginado por "keyset" (nome, id).
+
+    Traz SÓ as colunas de COLUNAS_CATALOGO, como tuplas simples (sem DictCursor),
+    para que atualizar a tela não transfira nem converta colunas que ninguém exibe.
+
+    'filtros' (todos opcionais):
+    - 'fornecedor', 'localizacao': trecho do texto (sem diferenciar maiúsculas)
+    - 'estoque_baixo': True para trazer só itens abaixo do estoque mínimo
+
+    'limite=None' traz o catálogo inteiro (sem paginação).
+    Retorna (linhas, proximo_cursor). 'proximo_cursor' é None na última página.
+    """
+    filtros = filtros or {}
+    condicoes = []
+    params = {}
+
+    if filtros.get('fornecedor'):
+        condicoes.append("fornecedor_preferencial ILIKE %(fornecedor)s")
+        params['fornecedor'] = f"%{escapar_like(filtros['fornecedor'])}%"
+    if filtros.get('localizacao'):
+        condicoes.append("localizacao ILIKE %(localizacao)s")
+        params['localizacao'] = f"%{escapar_like(filtros['localizacao'])}%"
+    if filtros.get('estoque_baixo'):
+        condicoes.append("estoque_atual < estoque_minimo")
+
+    # Keyset: continua depois do último (nome, id) da página anterior
+    if cursor is not None:
+        condicoes.append("(nome, id) > (%(cursor_nome)s, %(cursor_id)s)")
+        params['cursor_nome'], params['cursor_id'] = cursor
+
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    limit = ""
+    if limite is not None:
+        limit = "LIMIT %(limite)s"
+        params['limite'] = limite + 1 # Uma linha a mais indica que existe próxima página
+
+    try:
+        with cursor_scope(uow) as cur:
+            query = f"""
+            SELECT {', '.join(COLUNAS_CATALOGO)}
+            FROM materiais
+            {where}
+            ORDER BY nome ASC, id ASC
+            {limit};
+            """
+            cur.execute(query, params)
+            linhas = cur.fetchall()
+
+        proximo_cursor = None
+        if limite is not None and len(linhas) > limite:
+            linhas = linhas[:limite]
+            ultima = linhas[-1]
+            proximo_cursor = (ultima[COLUNAS_CATALOGO.index("nome")], ultima[COLUNAS_CATALOGO.index("id")])
+        return (linhas, proximo_cursor)
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Erro ao buscar página do catálogo de materiais: {error}")
+        return ([], None)
+
+def get_versao_materiais(versao_conhecida=None, uow=None):
+    """ (versao, modificado) da tabela 'materiais' (ver get_versao_tabelas). """
+    return get_versao_tabelas(('materiais',), versao_conhecida, uow=uow)
+
+def search_materials(termo, limite=10, uow=None):
+    """
+    Busca "enquanto digita": os 'limite' materiais mais relevantes para 'termo',
+    procurando em nome, SKU e fornecedor (índices de trigramas, ver migração 004).
+
+    Ordem: SKU idêntico primeiro, depois nomes que começam com o termo,
+    depois pela similaridade (pg_trgm). Tolera pequenos erros de digitação.
+    Retorna uma lista de dicionários (id, nome, sku, estoque_atual, fornecedor).
+    """
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            # '%%' é o operador de similaridade do pg_trgm ('%' escapado para o psycopg2)
+            query = """
+            SELECT
+                id, nome, sku, estoque_atual,
+                fornecedor_preferencial AS fornecedor,
+                GREATEST(
+                    similarity(nome, %(termo)s),
+                    similarity(sku, %(termo)s),
+                    similarity(COALESCE(fornecedor_preferencial, ''), %(termo)s)
+                ) AS relevancia
+            FROM materiais
+            WHERE nome ILIKE %(contem)s
+               OR sku ILIKE %(contem)s
+               OR fornecedor_preferencial ILIKE %(contem)s
+               OR nome %% %(termo)s
+            ORDER BY
+                (lower(sku) = lower(%(termo)s)) DESC,
+                (nome ILIKE %(comeca)s) DESC,
+                relevancia DESC,
+                nome ASC
+            LIMIT %(limite)s;
+            """
+            termo_like = escapar_like(termo)
+            cursor.execute(query, {
+                "termo": termo,
+                "contem": f"%{termo_like}%",
+                "comeca": f"{termo_like}%",
+                "limite": limite
+            })
+            materiais = cursor.fetchall()
+        return materiais
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Erro ao buscar materiais por '{termo}': {error}")
+        return []
 
 # --- FUNÇÕES ATUALIZADAS (CRUD COMPLETO) ---
 
-def get_material_by_id(material_id):
+def get_material_by_id(material_id, uow=None):
     """ Busca um material pelo seu ID. Retorna um dict. """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        query = "SELECT * FROM materiais WHERE id = %s;"
-        cursor.execute(query, (material_id,))
-        
-        material = cursor.fetchone()
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = "SELECT * FROM materiais WHERE id = %s;"
+            cursor.execute(query, (material_id,))
+
+            material = cursor.fetchone()
         return material
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao buscar material por ID ({material_id}): {error}")
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def update_material(material_id, data):
-    """ 
-    Atualiza um material existente. 
+
+def update_material(material_id, data, uow=None):
+    """
+    Atualiza um material existente.
     'data' deve conter as mesmas chaves de 'create_material'.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Adiciona o ID ao dicionário para a query
-        data['id'] = material_id
-        
-        query = """
-        UPDATE materiais SET
-            nome = %(nome)s,
-            sku = %(sku)s,
-            unidade_medida = %(unidade_medida)s,
-            preco_custo = %(preco_custo)s,
-            estoque_atual = %(estoque_atual)s,
-            estoque_minimo = %(estoque_minimo)s,
-            fornecedor_preferencial = %(fornecedor)s,
-            localizacao = %(localizacao)s,
-            data_atualizacao = CURRENT_TIMESTAMP
-        WHERE
-            id = %(id)s;
-        """
-        
-        cursor.execute(query, data)
-        conn.commit()
-        
+        with cursor_scope(uow) as cursor:
+            # Adiciona o ID ao dicionário para a query
+            data['id'] = material_id
+
+            query = """
+            UPDATE materiais SET
+                nome = %(nome)s,
+                sku = %(sku)s,
+                unidade_medida = %(unidade_medida)s,
+                preco_custo = %(preco_custo)s,
+                estoque_atual = %(estoque_atual)s,
+                estoque_minimo = %(estoque_minimo)s,
+                fornecedor_preferencial = %(fornecedor)s,
+                localizacao = %(localizacao)s,
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE
+                id = %(id)s;
+            """
+
+            cursor.execute(query, data)
+            atualizou = cursor.rowcount > 0
+
         # Verifica se alguma linha foi realmente atualizada
-        if cursor.rowcount > 0:
+        if atualizou:
             print(f"Model (Estoque): Material ID {material_id} atualizado com sucesso.")
             return True
         else:
@@ -153,76 +247,52 @@ def update_material(material_id, data):
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao atualizar material: {error}")
-        if conn:
-            conn.rollback()
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def delete_material(material_id):
+
+def delete_material(material_id, uow=None):
     """
     Deleta um material do banco de dados usando seu ID.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = "DELETE FROM materiais WHERE id = %s;"
-        
-        cursor.execute(query, (material_id,))
-        conn.commit() # Confirma a transação
-        
+        with cursor_scope(uow) as cursor:
+            query = "DELETE FROM materiais WHERE id = %s;"
+
+            cursor.execute(query, (material_id,))
+            deletou = cursor.rowcount > 0
+
         # Verifica se alguma linha foi realmente deletada
-        if cursor.rowcount > 0:
+        if deletou:
             print(f"Model (Estoque): Material ID {material_id} deletado com sucesso.")
             return True
         else:
             print(f"Model (Estoque): NENHUM material encontrado com ID {material_id}.")
             return False # Nenhuma linha foi afetada
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         # Se este material estiver sendo usado (ex: FK em outra tabela),
         # o banco de dados dará um erro aqui, protegendo a integridade.
         print(f"Model Error (Estoque): Erro ao deletar material: {error}")
-        if conn:
-            conn.rollback() # Desfaz a transação
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def update_material_estoque(material_id, nova_quantidade):
+
+def update_material_estoque(material_id, nova_quantidade, uow=None):
     """
     Atualiza APENAS a coluna 'estoque_atual' de um material.
     Usado para dar baixa ou estornar (retornar) estoque.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        UPDATE materiais SET
-            estoque_atual = %s,
-            data_atualizacao = CURRENT_TIMESTAMP
-        WHERE
-            id = %s;
-        """
-        
-        cursor.execute(query, (nova_quantidade, material_id))
-        conn.commit()
-        
-        if cursor.rowcount > 0:
+        with cursor_scope(uow) as cursor:
+            query = """
+            UPDATE materiais SET
+                estoque_atual = %s,
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE
+                id = %s;
+            """
+
+            cursor.execute(query, (nova_quantidade, material_id))
+            atualizou = cursor.rowcount > 0
+
+        if atualizou:
             print(f"Model (Estoque): Estoque do ID {material_id} atualizado para {nova_quantidade}.")
             return True
         else:
@@ -231,36 +301,4 @@ def update_material_estoque(material_id, nova_quantidade):
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao atualizar estoque do material: {error}")
-        if conn:
-            conn.rollback()
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def get_estoque_baixo_count():
-    """
-    Retorna a quantidade de itens que estão abaixo do estoque mínimo.
-    """
-    conn = None
-    cursor = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Conta quantos materiais têm estoque_atual < estoque_minimo
-        query = "SELECT COUNT(*) FROM materiais WHERE estoque_atual < estoque_minimo;"
-        
-        cursor.execute(query)
-        count = cursor.fetchone()[0]
-        return count
-
-    except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (Estoque Stats): {error}")
-        return 0
-    finally:
-        if cursor: cursor.close()
-        if conn: release_connection(conn)
\ No newline at end of file
@@ -1,6 +1,6 @@
-from app.utils.db_connector import get_connection, release_connection
+from app.models.base_model import cursor_scope, escapar_like, get_versao_tabelas
 import psycopg2
-from psycopg2 import extras # Para retornar dicts
+from psycopg2 import errorcodes # Para distinguir os tipos de IntegrityError
 
 """
 Camada Model (Modelo) para Ordem de Serviço (OS).
@@ -11,510 +11,705 @@ Responsabilidade:
 - Funções para gerenciar a tabela-ponte 'os_materiais'.
 """
 
+# Colunas exibidas na listagem de OS (MainView.load_os).
+# As listagens trazem só isso; o registro completo vem de get_os_by_id().
+COLUNAS_LISTAGEM_OS = """
+    id, status, prioridade, tipo_servico, endereco,
+    data_abertura, data_conclusao_prevista
+"""
+
+# Quantidade padrão de linhas por página nas listagens
+TAMANHO_PAGINA = 50
+
+# Colunas da listagem que podem ser usadas para ordenar (chave -> expressão SQL).
+# A data prevista pode ser nula; usamos uma data "infinita" para que o
+# cursor de paginação (valor, id) funcione sempre.
+COLUNAS_ORDENAVEIS_OS = {
+    'id': "id",
+    'status': "status",
+    'prioridade': "prioridade",
+    'tipo_servico': "tipo_servico",
+    'endereco': "endereco",
+    'data_abertura': "data_abertura",
+    'data_prevista': "COALESCE(data_conclusao_prevista, DATE '9999-12-31')",
+}
+
+def get_versao_os(versao_conhecida=None, uow=None):
+    """
+    (versao, modificado) da listagem de OS: alterações em 'ordens_servico'
+    (ver get_versao_tabelas). O contador de não lidas fica de fora.
+    """
+    return get_versao_tabelas(('ordens_servico',), versao_conhecida, uow=uow)
+
 # --- Seção 1: CRUD Básico da OS ---
 
-def create_os(data):
+def create_os(data, uow=None):
     """
     Cria uma nova Ordem de Serviço no banco de dados.
-    Atualizado para incluir cliente_id.
+    Atualizado para incluir cliente_id e proprietario_id.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Adiciona cliente_id na query
-        query = """
-        INSERT INTO ordens_servico (
-            tipo_servico, endereco, descricao, prioridade, 
-            status, data_conclusao_prevista, cliente_id
-        ) VALUES (
-            %(tipo_servico)s, %(endereco)s, %(descricao)s, %(prioridade)s,
-            %(status)s, %(data_conclusao_prevista)s, %(cliente_id)s
-        ) RETURNING id;
-        """
-        
-        # Garante que cliente_id exista no dicionário (pode ser None se for criado pela Empresa)
-        if 'cliente_id' not in data:
-            data['cliente_id'] = None
-            
-        cursor.execute(query, data)
-        
-        new_id = cursor.fetchone()[0]
-        conn.commit()
-        
+        with cursor_scope(uow) as cursor:
+            # Adiciona cliente_id na query
+            query = """
+            INSERT INTO ordens_servico (
+                tipo_servico, endereco, descricao, prioridade,
+                status, data_conclusao_prevista, cliente_id, proprietario_id
+            ) VALUES (
+                %(tipo_servico)s, %(endereco)s, %(descricao)s, %(prioridade)s,
+                %(status)s, %(data_conclusao_prevista)s, %(cliente_id)s, %(proprietario_id)s
+            ) RETURNING id;
+            """
+
+            # Garante que cliente_id exista no dicionário (pode ser None se for criado pela Empresa)
+            if 'cliente_id' not in data:
+                data['cliente_id'] = None
+            # Idem para o proprietário (ex: solicitação aberta pelo cliente)
+            if 'proprietario_id' not in data:
+                data['proprietario_id'] = None
+
+            cursor.execute(query, data)
+
+            new_id = cursor.fetchone()[0]
+
         print(f"OS criada com sucesso. ID: {new_id}")
         return new_id
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao criar OS: {error}")
-        if conn:
-            conn.rollback()
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def get_all_os():
+def get_all_os(limite=None, apos_id=None, uow=None):
     """
-    Busca todas as OS cadastradas, ordenadas pela mais recente.
+    Busca as OS cadastradas, ordenadas pela mais recente.
+    Sem 'limite', retorna todas; com 'limite', retorna uma página com as
+    colunas da listagem (próxima página: 'apos_id' = ID da última OS recebida).
     Retorna uma lista de dicionários.
     """
-    conn = None
-    cursor = None
+    if limite is not None:
+        return _get_os_page_por_id({}, limite, apos_id, uow)
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        # Ordena por ID decrescente (mais novas primeiro)
-        query = "SELECT * FROM ordens_servico ORDER BY id DESC;"
-        cursor.execute(query)
-        
-        ordens = cursor.fetchall()
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            # Ordena por ID decrescente (mais novas primeiro)
+            query = "SELECT * FROM ordens_servico ORDER BY id DESC;"
+            cursor.execute(query)
+
+            ordens = cursor.fetchall()
         return ordens
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao buscar Ordens de Serviço: {error}")
         return []
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def get_os_by_id(os_id):
+def get_os_page(filtros=None, ordenar_por='id', decrescente=True,
+                limite=TAMANHO_PAGINA, cursor=None, uow=None):
+    """
+    Listagem de OS filtrada e ordenada NO SERVIDOR, paginada por "keyset".
+
+    'filtros' (todos opcionais):
+    - 'status', 'prioridade'   : valor exato
+    - 'data_de', 'data_ate'    : objetos date (intervalo de data_abertura, inclusivo)
+    - 'cliente_id', 'proprietario_id'
+    - 'endereco'               : trecho do endereço (sem diferenciar maiúsculas)
+
+    'ordenar_por' é uma chave de COLUNAS_ORDENAVEIS_OS (as colunas da tabela de OS).
+    'cursor' é o 'proximo_cursor' devolvido pela página anterior.
+
+    Retorna (linhas, proximo_cursor). 'proximo_cursor' é None na última página.
+    Em caso de erro, retorna ([], None).
+    """
+    filtros = filtros or {}
+    if ordenar_por not in COLUNAS_ORDENAVEIS_OS:
+        raise ValueError(f"Coluna de ordenação inválida: {ordenar_por}")
+
+    expressao_ordem = COLUNAS_ORDENAVEIS_OS[ordenar_por]
+    direcao = "DESC" if decrescente else "ASC"
+
+    condicoes = []
+    params = {"limite": limite + 1} # Uma linha a mais indica que existe próxima página
+
+    for coluna in ('status', 'prioridade', 'cliente_id', 'proprietario_id'):
+        if filtros.get(coluna) is not None:
+            condicoes.append(f"{coluna} = %({coluna})s")
+            params[coluna] = filtros[coluna]
+
+    if filtros.get('data_de'):
+        condicoes.append("data_abertura >= %(data_de)s")
+        params['data_de'] = filtros['data_de']
+    if filtros.get('data_ate'):
+        condicoes.append("data_abertura < %(data_ate)s::date + 1")
+        params['data_ate'] = filtros['data_ate']
+
+    if filtros.get('endereco'):
+        condicoes.append("endereco ILIKE %(endereco)s")
+        params['endereco'] = f"%{escapar_like(filtros['endereco'])}%"
+
+    # Keyset: continua depois da última linha da página anterior (sem OFFSET)
+    if cursor is not None:
+        comparador = "<" if decrescente else ">"
+        condicoes.append(f"({expressao_ordem}, id) {comparador} (%(cursor_valor)s, %(cursor_id)s)")
+        params['cursor_valor'], params['cursor_id'] = cursor
+
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cur:
+            query = f"""
+            SELECT {COLUNAS_LISTAGEM_OS}, {expressao_ordem} AS chave_ordem
+            FROM ordens_servico
+            {where}
+            ORDER BY {expressao_ordem} {direcao}, id {direcao}
+            LIMIT %(limite)s;
+            """
+            cur.execute(query, params)
+            linhas = cur.fetchall()
+
+        proximo_cursor = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            proximo_cursor = (linhas[-1]['chave_ordem'], linhas[-1]['id'])
+        return (linhas, proximo_cursor)
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Erro ao buscar página de Ordens de Serviço: {error}")
+        return ([], None)
+
+def _get_os_page_por_id(filtros, limite, apos_id, uow):
+    """
+    Função auxiliar PRIVADA: página de OS em ordem de ID decrescente
+    (próxima página começa depois de 'apos_id').
+    """
+    cursor = (apos_id, apos_id) if apos_id is not None else None
+    linhas, _ = get_os_page(filtros, 'id', True, limite, cursor, uow)
+    return linhas
+
+def get_os_by_proprietario(proprietario_id, limite=TAMANHO_PAGINA, apos_id=None, uow=None):
+    """
+    Busca as OS dos imóveis de um Proprietário, das mais novas para as mais antigas.
+    Retorna uma página (até 'limite' linhas) com as colunas da listagem.
+    Para a página seguinte, passe em 'apos_id' o ID da última OS recebida.
+    """
+    return _get_os_page_por_id({'proprietario_id': proprietario_id}, limite, apos_id, uow)
+
+def get_os_by_cliente(cliente_id, limite=TAMANHO_PAGINA, apos_id=None, uow=None):
+    """
+    Busca as OS abertas por (ou para) um Cliente/Inquilino, das mais novas para as mais antigas.
+    Retorna uma página (até 'limite' linhas) com as colunas da listagem.
+    Para a página seguinte, passe em 'apos_id' o ID da última OS recebida.
+    """
+    return _get_os_page_por_id({'cliente_id': cliente_id}, limite, apos_id, uow)
+
+def get_os_by_id(os_id, uow=None):
     """
     Busca uma Ordem de Serviço específica pelo seu ID.
     Retorna um dicionário (DictRow).
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        query = "SELECT * FROM ordens_servico WHERE id = %s;"
-        cursor.execute(query, (os_id,)) # Passa o ID como uma tupla
-        
-        os_data = cursor.fetchone() # Pega apenas um resultado
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = "SELECT * FROM ordens_servico WHERE id = %s;"
+            cursor.execute(query, (os_id,)) # Passa o ID como uma tupla
+
+            os_data = cursor.fetchone() # Pega apenas um resultado
         return os_data
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao buscar OS por ID ({os_id}): {error}")
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def update_os(os_id, data):
+def update_os(os_id, data, uow=None):
     """
     Atualiza uma Ordem de Serviço existente no banco de dados.
     'data' é um dicionário contendo os campos a serem atualizados.
     'os_id' é o ID da OS a ser modificada.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        UPDATE ordens_servico SET
-            tipo_servico = %(tipo_servico)s,
-            endereco = %(endereco)s,
-            descricao = %(descricao)s,
-            prioridade = %(prioridade)s,
-            status = %(status)s,
-            data_conclusao_prevista = %(data_conclusao_prevista)s,
-            data_atualizacao = CURRENT_TIMESTAMP
-        WHERE
-            id = %(os_id)s;
-        """
-        
-        # Adicionamos o os_id ao dicionário de dados para a query
-        data['os_id'] = os_id
-        
-        cursor.execute(query, data)
-        conn.commit()
-        
+        with cursor_scope(uow) as cursor:
+            query = """
+            UPDATE ordens_servico SET
+                tipo_servico = %(tipo_servico)s,
+                endereco = %(endereco)s,
+                descricao = %(descricao)s,
+                prioridade = %(prioridade)s,
+                data_conclusao_prevista = %(data_conclusao_prevista)s,
+                proprietario_id = %(proprietario_id)s,
+                data_atualizacao = CURRENT_TIMESTAMP
+            WHERE
+                id = %(os_id)s;
+            """
+
+            # Adicionamos o os_id ao dicionário de dados para a query
+            data['os_id'] = os_id
+
+            cursor.execute(query, data)
+
         print(f"OS ID: {os_id} atualizada com sucesso.")
         return True # Retorna sucesso
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao atualizar OS ({os_id}): {error}")
-        if conn:
-            conn.rollback()
         return False # Retorna falha
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def delete_os(os_id):
+def delete_os(os_id, uow=None):
     """
     Deleta uma Ordem de Serviço do banco de dados usando seu ID.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = "DELETE FROM ordens_servico WHERE id = %s;"
-        
-        cursor.execute(query, (os_id,))
-        conn.commit() # Confirma a transação
-        
+        with cursor_scope(uow) as cursor:
+            query = "DELETE FROM ordens_servico WHERE id = %s;"
+
+            cursor.execute(query, (os_id,))
+            deletou = cursor.rowcount > 0
+
         # Verifica se alguma linha foi realmente deletada
-        if cursor.rowcount > 0:
+        if deletou:
             print(f"Model (OS): OS ID {os_id} deletada com sucesso.")
             return True
         else:
             print(f"Model (OS): NENHUMA OS encontrada com ID {os_id}.")
             return False # Nenhuma linha foi afetada
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         # Graças ao 'ON DELETE CASCADE', isto também deletará
         # os itens em 'os_materiais'
         print(f"Model Error (OS): Erro ao deletar OS: {error}")
-        if conn:
-            conn.rollback() # Desfaz a transação
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
 # --- Seção 2: Vínculo OS <-> Material ---
+# Toda alteração em 'os_materiais' já ajusta o orcamento_materiais (e o total)
+# da OS no próprio banco, só pela diferença (trigger da migração 013).
 
-def add_material_to_os(os_id, material_id, quantidade, preco_custo):
+def add_material_to_os(os_id, material_id, quantidade, preco_custo, uow=None):
     """
     Adiciona um novo material (e sua quantidade) a uma OS.
     Grava o preço do custo no momento da adição.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO os_materiais (os_id, material_id, quantidade, preco_custo_na_data)
-        VALUES (%s, %s, %s, %s)
-        RETURNING id;
-        """
-        
-        cursor.execute(query, (os_id, material_id, quantidade, preco_custo))
-        new_id = cursor.fetchone()[0]
-        conn.commit()
-        
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO os_materiais (os_id, material_id, quantidade, preco_custo_na_data)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id;
+            """
+
+            cursor.execute(query, (os_id, material_id, quantidade, preco_custo))
+            new_id = cursor.fetchone()[0]
+
         print(f"Model (OS-Material): Material ID {material_id} adicionado à OS ID {os_id}.")
         return new_id
-        
+
     except psycopg2.IntegrityError as e:
         # Captura o erro da 'UNIQUE constraint (os_id, material_id)'
         print(f"Model Error (OS-Material): Item já existe na OS. {e}")
-        if conn:
-            conn.rollback()
         return None # Indica falha por duplicidade
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (OS-Material): Erro ao adicionar material: {error}")
-        if conn:
-            conn.rollback()
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def get_materiais_for_os(os_id):
+def get_materiais_for_os(os_id, uow=None):
     """
     Busca a lista de materiais vinculados a uma OS específica.
     Usa JOIN para trazer os nomes e SKUs dos materiais.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        query = """
-        SELECT 
-            osm.id as os_material_id, -- ID da linha na tabela 'os_materiais'
-            m.id as material_id,
-            m.nome as material_nome,
-            m.sku,
-            osm.quantidade,
-            osm.preco_custo_na_data
-        FROM os_materiais AS osm
-        JOIN materiais AS m ON osm.material_id = m.id
-        WHERE osm.os_id = %s;
-        """
-        
-        cursor.execute(query, (os_id,))
-        materiais = cursor.fetchall()
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = """
+            SELECT
+                osm.id as os_material_id, -- ID da linha na tabela 'os_materiais'
+                m.id as material_id,
+                m.nome as material_nome,
+                m.sku,
+                osm.quantidade,
+                osm.preco_custo_na_data
+            FROM os_materiais AS osm
+            JOIN materiais AS m ON osm.material_id = m.id
+            WHERE osm.os_id = %s;
+            """
+
+            cursor.execute(query, (os_id,))
+            materiais = cursor.fetchall()
         return materiais # Lista de dicionários
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (OS-Material): Erro ao buscar materiais da OS: {error}")
         return []
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def remove_material_from_os(os_material_id):
+def remove_material_from_os(os_material_id, uow=None):
     """
     Remove uma linha da tabela 'os_materiais' pelo ID único dela.
     (os_material_id é o 'osm.id' da query anterior)
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = "DELETE FROM os_materiais WHERE id = %s;"
-        
-        cursor.execute(query, (os_material_id,))
-        conn.commit()
-        return cursor.rowcount > 0 # True se deletou
-        
+        with cursor_scope(uow) as cursor:
+            query = "DELETE FROM os_materiais WHERE id = %s;"
+
+            cursor.execute(query, (os_material_id,))
+            removeu = cursor.rowcount > 0
+        return removeu # True se deletou
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (OS-Material): Erro ao remover material da OS: {error}")
-        if conn:
-            conn.rollback()
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-def update_material_quantidade_in_os(os_material_id, nova_quantidade):
+def update_material_quantidade_in_os(os_material_id, nova_quantidade, uow=None):
     """
     Atualiza a quantidade de um material já vinculado a uma OS.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = "UPDATE os_materiais SET quantidade = %s WHERE id = %s;"
-        
-        cursor.execute(query, (nova_quantidade, os_material_id))
-        conn.commit()
-        return cursor.rowcount > 0 # True se atualizou
-        
+        with cursor_scope(uow) as cursor:
+            query = "UPDATE os_materiais SET quantidade = %s WHERE id = %s;"
+
+            cursor.execute(query, (nova_quantidade, os_material_id))
+            atualizou = cursor.rowcount > 0
+        return atualizou # True se atualizou
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error (OS-Material): Erro ao atualizar quantidade: {error}")
-        if conn:
-            conn.rollback()
         return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
 
-# --- Seção 3: Orçamento e Fluxo de Aprovação ---
-
-def update_os_orcamento(os_id, custo_materiais, custo_mao_de_obra, custo_total):
+def reservar_material_para_os(os_id, material_id, quantidade, uow=None):
     """
-    Atualiza os campos de orçamento de uma OS específica.
+    Vincula um material à OS e dá baixa no estoque em UM único comando SQL.
+
+    A baixa é condicional ('WHERE estoque_atual >= quantidade'), então duas
+    reservas simultâneas nunca deixam o estoque negativo nem se sobrescrevem.
+    O INSERT em 'os_materiais' só acontece se a baixa aconteceu.
+
+    Retorna um dicionário:
+    - 'resultado': 'ok', 'estoque_insuficiente', 'nao_encontrado', 'duplicado' ou 'erro'
+    - 'os_material_id', 'material_nome', 'disponivel', 'estoque_restante'
     """
-    conn = None
-    cursor = None
+    retorno = {
+        "resultado": "erro",
+        "os_material_id": None,
+        "material_nome": None,
+        "disponivel": None,
+        "estoque_restante": None
+    }
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        UPDATE ordens_servico SET
-            orcamento_materiais = %s,
-            orcamento_mao_de_obra = %s,
-            orcamento_total = %s,
-            data_atualizacao = CURRENT_TIMESTAMP
-        WHERE
-            id = %s;
-        """
-        
-        cursor.execute(query, (custo_materiais, custo_mao_de_obra, custo_total, os_id))
-        conn.commit()
-        
-        if cursor.rowcount > 0:
-            print(f"Model (OS): Orçamento da OS ID {os_id} atualizado.")
-            return True
+        with cursor_scope(uow) as cursor:
+            # 'materiais AS m' no SELECT final enxerga o estoque ANTES da baixa,
+            # o que permite informar o saldo disponível quando faltar material.
+            query = """
+            WITH baixa AS (
+                UPDATE materiais SET
+                    estoque_atual = estoque_atual - %(quantidade)s,
+                    data_atualizacao = CURRENT_TIMESTAMP
+                WHERE id = %(material_id)s AND estoque_atual >= %(quantidade)s
+                RETURNING id, preco_custo, estoque_atual
+            ), vinculo AS (
+                INSERT INTO os_materiais (os_id, material_id, quantidade, preco_custo_na_data)
+                SELECT %(os_id)s, id, %(quantidade)s, preco_custo FROM baixa
+                RETURNING id
+            )
+            SELECT
+                m.nome,
+                m.estoque_atual AS disponivel,
+                b.estoque_atual AS estoque_restante,
+                v.id AS os_material_id
+            FROM materiais AS m
+            LEFT JOIN baixa AS b ON b.id = m.id
+            LEFT JOIN vinculo AS v ON TRUE
+            WHERE m.id = %(material_id)s;
+            """
+
+            cursor.execute(query, {
+                "os_id": os_id,
+                "material_id": material_id,
+                "quantidade": quantidade
+            })
+            row = cursor.fetchone()
+
+        if row is None:
+            retorno["resultado"] = "nao_encontrado"
+            return retorno
+
+        retorno["material_nome"], retorno["disponivel"], retorno["estoque_restante"], retorno["os_material_id"] = row
+
+        if retorno["os_material_id"] is None:
+            retorno["resultado"] = "estoque_insuficiente"
+        else:
+            retorno["resultado"] = "ok"
+            print(f"Model (OS-Material): {quantidade} un. do material ID {material_id} reservadas na OS ID {os_id}.")
+        return retorno
+
+    except psycopg2.IntegrityError as e:
+        # Em qualquer caso o comando inteiro é desfeito, inclusive a baixa
+        if e.pgcode == errorcodes.UNIQUE_VIOLATION:
+            # 'UNIQUE (os_id, material_id)'
+            print(f"Model Error (OS-Material): Item já existe na OS. {e}")
+            retorno["resultado"] = "duplicado"
+        elif e.pgcode == errorcodes.FOREIGN_KEY_VIOLATION:
+            # OS (ou material) inexistente / excluída enquanto isso
+            print(f"Model Error (OS-Material): OS ou material não encontrado. {e}")
+            retorno["resultado"] = "nao_encontrado"
         else:
-            print(f"Model (OS): OS ID {os_id} não encontrada para atualizar orçamento.")
-            return False
+            print(f"Model Error (OS-Material): Erro de integridade ao reservar material ({e.pgcode}): {e}")
+        return retorno
 
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (OS): Erro ao atualizar orçamento: {error}")
-        if conn:
-            conn.rollback()
-        return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
+        print(f"Model Error (OS-Material): Erro ao reservar material: {error}")
+        return retorno
 
-def update_os_status(os_id, novo_status):
+def estornar_material_da_os(os_material_id, uow=None):
     """
-    Função genérica para atualizar o STATUS de uma OS.
-    Usada para Enviar, Aprovar, Rejeitar, etc.
+    Remove o vínculo OS <-> Material e devolve a quantidade ao estoque
+    em UM único comando SQL (a quantidade vem do próprio vínculo, não da tela).
+
+    Retorna um dicionário com 'material_nome', 'quantidade' e 'estoque_atual',
+    ou None se o vínculo não existir (ou em caso de erro).
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Garante que o status ENUM exista antes de usá-lo
-        cursor.execute("ALTER TYPE status_os ADD VALUE IF NOT EXISTS %s", (novo_status,))
-        
-        query = "UPDATE ordens_servico SET status = %s WHERE id = %s;"
-        
-        cursor.execute(query, (novo_status, os_id))
-        conn.commit()
-        return cursor.rowcount > 0
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = """
+            WITH removido AS (
+                DELETE FROM os_materiais WHERE id = %s
+                RETURNING material_id, quantidade
+            )
+            UPDATE materiais AS m SET
+                estoque_atual = m.estoque_atual + r.quantidade,
+                data_atualizacao = CURRENT_TIMESTAMP
+            FROM removido AS r
+            WHERE m.id = r.material_id
+            RETURNING m.nome AS material_nome, r.quantidade, m.estoque_atual;
+            """
+
+            cursor.execute(query, (os_material_id,))
+            estorno = cursor.fetchone()
+
+        if estorno:
+            print(f"Model (OS-Material): Vínculo ID {os_material_id} removido e {estorno['quantidade']} un. estornadas.")
+        return estorno
 
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (OS): Erro ao atualizar status: {error}")
-        if conn: conn.rollback()
-        return False
-    finally:
-        if cursor: cursor.close()
-        if conn: release_connection(conn)
+        print(f"Model Error (OS-Material): Erro ao estornar material da OS: {error}")
+        return None
 
-def set_os_orcamento_enviado(os_id):
+# --- Seção 3: Orçamento e Fluxo de Aprovação ---
+
+def recalcular_orcamento_os(os_id, custo_mao_de_obra, uow=None):
     """
-    Define o status como 'aguardando aprovação' e salva a data de envio.
+    Recalcula o orçamento de uma OS DENTRO do banco, numa única instrução:
+    soma (preço na data x quantidade) dos materiais vinculados e grava
+    materiais, mão de obra e total.
+    (O custo de materiais já é mantido pela migração 013; a soma completa
+    aqui serve de conferência ao salvar a mão de obra.)
+    Retorna um dict com 'materiais', 'mao_de_obra' e 'total' (Decimal),
+    ou None se a OS não existe / em caso de erro.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        UPDATE ordens_servico SET 
-            status = 'aguardando aprovação',
-            data_orcamento_enviado = CURRENT_TIMESTAMP
-        WHERE id = %s;
-        """
-        
-        cursor.execute(query, (os_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = """
+            UPDATE ordens_servico AS o SET
+                orcamento_materiais = t.materiais,
+                orcamento_mao_de_obra = %(mao_de_obra)s,
+                orcamento_total = t.materiais + %(mao_de_obra)s,
+                data_atualizacao = CURRENT_TIMESTAMP
+            FROM (
+                SELECT COALESCE(SUM(preco_custo_na_data * quantidade), 0) AS materiais
+                FROM os_materiais
+                WHERE os_id = %(os_id)s
+            ) AS t
+            WHERE o.id = %(os_id)s
+            RETURNING
+                o.orcamento_materiais AS materiais,
+                o.orcamento_mao_de_obra AS mao_de_obra,
+                o.orcamento_total AS total;
+            """
+            cursor.execute(query, {"os_id": os_id, "mao_de_obra": custo_mao_de_obra})
+            totais = cursor.fetchone()
+
+        if totais:
+            print(f"Model (OS): Orçamento da OS ID {os_id} recalculado. Total: {totais['total']}")
+        else:
+            print(f"Model (OS): OS ID {os_id} não encontrada para recalcular orçamento.")
+        return totais
 
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (OS): Erro ao enviar orçamento: {error}")
-        if conn: conn.rollback()
-        return False
-    finally:
-        if cursor: cursor.close()
-        if conn: release_connection(conn)
+        print(f"Model Error (OS): Erro ao recalcular orçamento: {error}")
+        return None
+
+# Transições de status permitidas (a "máquina de estados" da OS).
+# 'de': status em que a OS precisa estar; 'para': novo status;
+# 'data': coluna que recebe o momento da transição (opcional);
+# 'condicao': exigência extra sobre a OS (SQL fixo, opcional), com o
+# 'motivo' mostrado quando só ela impede a transição.
+TRANSICOES_OS = {
+    'enviar': {
+        'de': ('aberta',),
+        'para': 'aguardando aprovação',
+        'data': 'data_orcamento_enviado',
+        'condicao': "COALESCE(o.orcamento_total, 0) > 0",
+        'motivo': "O orçamento ainda não foi calculado ou está zerado."
+    },
+    'iniciar': {
+        # Sem proprietário não há quem aprove: a empresa inicia direto
+        'de': ('aberta',),
+        'para': 'em andamento',
+        'condicao': "o.proprietario_id IS NULL",
+        'motivo': "A OS tem proprietário: o orçamento precisa ser aprovado por ele."
+    },
+    'aprovar': {
+        'de': ('aguardando aprovação',),
+        'para': 'em andamento',
+        'data': 'data_aprovacao'
+    },
+    'rejeitar': {
+        'de': ('aguardando aprovação',),
+        'para': 'aberta'
+    },
+    'concluir': {
+        'de': ('em andamento',),
+        'para': 'concluída'
+    },
+    'cancelar': {
+        'de': ('aberta', 'aguardando aprovação', 'em andamento'),
+        'para': 'cancelada'
+    },
+}
 
-def set_os_orcamento_aprovado(os_id, novo_status_aprovado):
+def aplicar_transicao_os(os_ids, acao, uow=None):
     """
-    Define o status (ex: 'em andamento') e salva a data de aprovação.
+    Aplica a transição 'acao' (chave de TRANSICOES_OS) às OS de 'os_ids'
+    numa ÚNICA instrução "compare-and-set": cada OS só muda se AINDA
+    estiver num dos status de origem (WHERE status = ANY(de)). Dois cliques
+    simultâneos (ex: aprovar e rejeitar) nunca passam os dois.
+
+    Retorna um dict {os_id: resultado} só com as OS que existem, onde
+    'resultado' traz 'aplicada' (bool), 'status_anterior' e 'orcamento_total'.
+    Retorna None em caso de erro.
     """
-    conn = None
-    cursor = None
+    transicao = TRANSICOES_OS[acao]
+    atribuicoes = ["status = %(para)s::status_os", "data_atualizacao = CURRENT_TIMESTAMP"]
+    if transicao.get('data'):
+        atribuicoes.append(f"{transicao['data']} = CURRENT_TIMESTAMP")
+    condicao = f"AND {transicao['condicao']}" if transicao.get('condicao') else ""
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Garante que o status ENUM exista
-        cursor.execute("ALTER TYPE status_os ADD VALUE IF NOT EXISTS %s", (novo_status_aprovado,))
-        
-        query = """
-        UPDATE ordens_servico SET 
-            status = %s,
-            data_aprovacao = CURRENT_TIMESTAMP
-        WHERE id = %s;
-        """
-        
-        cursor.execute(query, (novo_status_aprovado, os_id))
-        conn.commit()
-        return cursor.rowcount > 0
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            # 'alvo' vê as OS como estavam; 'mudou' só as que passaram na condição
+            query = f"""
+            WITH alvo AS (
+                SELECT id, status, orcamento_total
+                FROM ordens_servico
+                WHERE id = ANY(%(os_ids)s)
+            ), mudou AS (
+                UPDATE ordens_servico AS o SET {', '.join(atribuicoes)}
+                WHERE o.id = ANY(%(os_ids)s)
+                  AND o.status = ANY(%(de)s::status_os[])
+                  {condicao}
+                RETURNING o.id
+            )
+            SELECT
+                a.id,
+                a.status::text AS status_anterior,
+                a.orcamento_total,
+                (m.id IS NOT NULL) AS aplicada
+            FROM alvo AS a
+            LEFT JOIN mudou AS m ON m.id = a.id;
+            """
+            cursor.execute(query, {
+                "os_ids": list(os_ids),
+                "de": list(transicao['de']),
+                "para": transicao['para']
+            })
+            resultados = {linha['id']: linha for linha in cursor.fetchall()}
+
+        aplicadas = sum(1 for r in resultados.values() if r['aplicada'])
+        print(f"Model (OS): Transição '{acao}' aplicada em {aplicadas} de {len(os_ids)} OS.")
+        return resultados
 
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (OS): Erro ao aprovar orçamento: {error}")
-        if conn: conn.rollback()
-        return False
-    finally:
-        if cursor: cursor.close()
-        if conn: release_connection(conn)
-
-def get_os_stats():
-    """
-    Retorna estatísticas gerais das Ordens de Serviço.
-    Ex: Contagem por status, valor total, etc.
-    """
-    conn = None
-    cursor = None
-    stats = {
-        "total_abertas": 0,
-        "total_em_andamento": 0,
-        "total_pendentes": 0, # Aguardando aprovação
-        "valor_em_projetos": 0.00 # Soma dos orçamentos aprovados/em andamento
-    }
-    
+        print(f"Model Error (OS): Erro ao aplicar transição '{acao}': {error}")
+        return None
+
+# --- Seção 4: Busca por Texto (OS e Chat) ---
+
+# Texto indexado de cada OS. DEVE ser idêntico à expressão do índice GIN
+# da migração 010, senão o PostgreSQL não usa o índice.
+TEXTO_BUSCA_OS = """
+    coalesce(descricao, '') || ' ' || coalesce(tipo_servico, '') || ' ' || coalesce(endereco, '')
+"""
+
+def buscar_texto(termo, filtros=None, limite=TAMANHO_PAGINA, cursor=None, uow=None):
+    """
+    Busca textual (full-text, em português, com radicais: "pintura" acha
+    "pintar") nas OS (descrição, tipo de serviço, endereço) e nas mensagens
+    do chat. Usa os índices GIN da migração 010.
+
+    'termo' aceita a sintaxe de busca web: "frase exata", OR, -excluir.
+    'filtros' aceita 'cliente_id' e 'proprietario_id' (restrição de perfil).
+    Resultados em ordem de relevância, paginados por "keyset"
+    (relevancia, origem, id); 'cursor' é o 'proximo_cursor' anterior.
+
+    Cada resultado (dict): origem ('os' ou 'mensagem'), id, os_id, relevancia,
+    data, trecho (com os termos encontrados entre [ ]).
+    Retorna (resultados, proximo_cursor). Em caso de erro, ([], None).
+    """
+    filtros = filtros or {}
+    condicoes_os = []
+    params = {"termo": termo, "limite": limite + 1} # Uma a mais indica que existe próxima página
+
+    for coluna in ('cliente_id', 'proprietario_id'):
+        if filtros.get(coluna) is not None:
+            condicoes_os.append(f"o.{coluna} = %({coluna})s")
+            params[coluna] = filtros[coluna]
+    restricao = "".join(f" AND {condicao}" for condicao in condicoes_os)
+
+    filtro_cursor = ""
+    if cursor is not None:
+        filtro_cursor = "WHERE (relevancia, origem, id) < (%(cursor_relevancia)s, %(cursor_origem)s, %(cursor_id)s)"
+        params['cursor_relevancia'], params['cursor_origem'], params['cursor_id'] = cursor
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # 1. Contagem por Status
-        query_status = "SELECT status, COUNT(*) FROM ordens_servico GROUP BY status;"
-        cursor.execute(query_status)
-        rows = cursor.fetchall()
-        
-        for status, count in rows:
-            if status == 'aberta':
-                stats["total_abertas"] = count
-            elif status == 'em andamento':
-                stats["total_em_andamento"] = count
-            elif status == 'aguardando aprovação':
-                stats["total_pendentes"] = count
-        
-        # 2. Soma Financeira (Apenas de projetos ativos)
-        query_valor = """
-        SELECT SUM(orcamento_total) FROM ordens_servico 
-        WHERE status IN ('em andamento', 'concluída');
-        """
-        cursor.execute(query_valor)
-        resultado = cursor.fetchone()[0]
-        stats["valor_em_projetos"] = resultado if resultado else 0.00
-        
-        return stats
+        with cursor_scope(uow, dict_cursor=True) as cur:
+            # O trecho (ts_headline, caro) só é gerado para as linhas da página
+            query = f"""
+            WITH consulta AS (
+                SELECT websearch_to_tsquery('portuguese', %(termo)s) AS q
+            ),
+            resultados AS (
+                SELECT 'os' AS origem, o.id AS id, o.id AS os_id,
+                       ts_rank(to_tsvector('portuguese', {TEXTO_BUSCA_OS}), c.q)::float8 AS relevancia,
+                       o.data_abertura AS data,
+                       {TEXTO_BUSCA_OS} AS texto
+                FROM ordens_servico AS o, consulta AS c
+                WHERE to_tsvector('portuguese', {TEXTO_BUSCA_OS}) @@ c.q {restricao}
+
+                UNION ALL
+
+                SELECT 'mensagem', m.id, m.os_id,
+                       ts_rank(to_tsvector('portuguese', m.conteudo), c.q)::float8,
+                       m.data_envio,
+                       m.conteudo
+                FROM mensagens AS m
+                JOIN ordens_servico AS o ON o.id = m.os_id, consulta AS c
+                WHERE to_tsvector('portuguese', m.conteudo) @@ c.q {restricao}
+            ),
+            pagina AS (
+                SELECT * FROM resultados
+                {filtro_cursor}
+                ORDER BY relevancia DESC, origem DESC, id DESC
+                LIMIT %(limite)s
+            )
+            SELECT p.origem, p.id, p.os_id, p.relevancia, p.data,
+                   ts_headline('portuguese', p.texto, c.q,
+                               'StartSel=[, StopSel=], MaxWords=20, MinWords=8') AS trecho
+            FROM pagina AS p, consulta AS c
+            ORDER BY p.relevancia DESC, p.origem DESC, p.id DESC;
+            """
+            cur.execute(query, params)
+            linhas = cur.fetchall()
+
+        proximo_cursor = None
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            ultima = linhas[-1]
+            proximo_cursor = (ultima['relevancia'], ultima['origem'], ultima['id'])
+        return (linhas, proximo_cursor)
 
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Model Error (OS Stats): {error}")
-        return stats # Retorna zerado em caso de erro
-    finally:
-        if cursor: cursor.close()
-        if conn: release_connection(conn)
\ No newline at end of file
+        print(f"Model Error (OS): Erro na busca por texto '{termo}': {error}")
+        return ([], None)
@@ -0,0 +1,71 @@
+from app.models.base_model import cursor_scope
+import psycopg2
+
+"""
+Camada Model (Modelo) para Sessões ("lembrar de mim").
+
+Responsabilidade:
+- Registrar, validar e revogar sessões persistentes (tabela 'sessoes').
+- O banco guarda só o HASH do token; o token em si fica no computador
+  do usuário (app/utils/sessao_local.py).
+"""
+
+def create_sessao(usuario_id, token_hash, dias, uow=None):
+    """
+    Registra uma nova sessão válida por 'dias' dias (contados pelo relógio
+    do banco). Retorna a data de expiração (datetime), ou None.
+    """
+    try:
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO sessoes (usuario_id, token_hash, expira_em)
+            VALUES (%s, %s, CURRENT_TIMESTAMP + make_interval(days => %s))
+            RETURNING expira_em;
+            """
+            cursor.execute(query, (usuario_id, token_hash, dias))
+            expira_em = cursor.fetchone()[0]
+        return expira_em
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Sessão): Erro ao criar sessão: {error}")
+        return None
+
+def get_usuario_por_sessao(token_hash, uow=None):
+    """
+    Valida uma sessão e, numa única instrução, registra o uso e devolve o
+    usuário (DictRow, mesmas colunas de 'usuarios').
+    Retorna None se a sessão não existe, expirou, foi revogada ou o
+    usuário foi desativado.
+    """
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = """
+            UPDATE sessoes AS s SET ultimo_uso = CURRENT_TIMESTAMP
+            FROM usuarios AS u
+            WHERE s.token_hash = %s
+              AND NOT s.revogada
+              AND s.expira_em > CURRENT_TIMESTAMP
+              AND u.id = s.usuario_id
+              AND u.ativo = TRUE
+            RETURNING u.*;
+            """
+            cursor.execute(query, (token_hash,))
+            user_data = cursor.fetchone()
+        return user_data
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Sessão): Erro ao validar sessão: {error}")
+        return None
+
+def revogar_sessao(token_hash, uow=None):
+    """ Revoga uma sessão (ex: o usuário clicou em "Sair"). """
+    try:
+        with cursor_scope(uow) as cursor:
+            query = "UPDATE sessoes SET revogada = TRUE WHERE token_hash = %s;"
+            cursor.execute(query, (token_hash,))
+            revogou = cursor.rowcount > 0
+        return revogou
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error (Sessão): Erro ao revogar sessão: {error}")
+        return False
@@ -1,84 +1,135 @@
-from app.utils.db_connector import get_connection, release_connection
+from app.models.base_model import cursor_scope
 import psycopg2
-from psycopg2 import extras # Para retornar dicts
+from psycopg2 import extras # Para o INSERT de várias linhas (execute_values)
 
 """
 Camada Model (Modelo) para Usuários.
 
 Responsabilidade:
 - Funções para buscar dados de usuários no banco.
-- Funções para criar novos usuários.
+- Funções para criar novos usuários (um a um ou em lote).
 """
 
-def get_user_by_email(email):
+def get_user_by_email(email, uow=None):
     """
     Busca um usuário específico pelo seu email.
     O email é UNIQUE, então deve retornar 0 ou 1 usuário.
     Retorna um dicionário (DictRow) com os dados do usuário.
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor(cursor_factory=extras.DictCursor)
-        
-        query = "SELECT * FROM usuarios WHERE email = %s AND ativo = TRUE;"
-        cursor.execute(query, (email,))
-        
-        user_data = cursor.fetchone() # Pega apenas um resultado
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = "SELECT * FROM usuarios WHERE email = %s AND ativo = TRUE;"
+            cursor.execute(query, (email,))
+
+            user_data = cursor.fetchone() # Pega apenas um resultado
         return user_data
-        
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao buscar usuário por email ({email}): {error}")
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
-
-def create_user(nome, email, senha_hash, perfil):
+
+def get_users_by_perfil(perfil, uow=None):
+    """
+    Lista os usuários ATIVOS de um perfil (ex: 'proprietario'), por nome.
+    Retorna uma lista de dicionários (id, nome_completo, email).
     """
-    Cria um novo usuário no banco de dados.
+    try:
+        with cursor_scope(uow, dict_cursor=True) as cursor:
+            query = """
+            SELECT id, nome_completo, email
+            FROM usuarios
+            WHERE perfil = %s AND ativo = TRUE
+            ORDER BY nome_completo ASC, id ASC;
+            """
+            cursor.execute(query, (perfil,))
+            usuarios = cursor.fetchall()
+        return usuarios
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Erro ao listar usuários do perfil '{perfil}': {error}")
+        return []
+
+def create_user(nome, email, senha_hash, perfil, uow=None):
+    """
+    Cria um novo usuário no banco de dados, numa única instrução que
+    também detecta e-mail já cadastrado (ON CONFLICT): não há intervalo
+    entre "verificar" e "inserir" para dois cadastros simultâneos.
     Recebe a senha JÁ HASHEADA do controller.
+
+    Retorna (novo_id, ja_existia):
+    - (id, False):   usuário criado
+    - (None, True):  o e-mail já está cadastrado (nada foi gravado)
+    - (None, False): erro no banco
     """
-    conn = None
-    cursor = None
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO usuarios (nome_completo, email, senha_hash, perfil)
-        VALUES (%s, %s, %s, %s)
-        RETURNING id;
-        """
-        
-        # O psycopg2 faz a limpeza (sanitize) dos dados
-        cursor.execute(query, (nome, email, senha_hash, perfil))
-        
-        new_id = cursor.fetchone()[0]
-        conn.commit() # Confirma a transação
-        
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO usuarios (nome_completo, email, senha_hash, perfil)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id;
+            """
+
+            # O psycopg2 faz a limpeza (sanitize) dos dados
+            cursor.execute(query, (nome, email, senha_hash, perfil))
+
+            linha = cursor.fetchone() # Nenhuma linha = e-mail já existia
+
+        if linha is None:
+            print(f"Model: E-mail já cadastrado ({email}). Nenhum usuário criado.")
+            return (None, True)
+
+        new_id = linha[0]
         print(f"Model: Novo usuário criado com sucesso. ID: {new_id}")
-        return new_id
-        
-    except psycopg2.IntegrityError as e:
-        # Erro especial do PostgreSQL para 'UNIQUE constraint' (email duplicado)
-        print(f"Model Error (IntegrityError): Email provavelmente duplicado. {e}")
-        if conn:
-            conn.rollback() # Desfaz a transação
-        return None
-        
+        return (new_id, False)
+
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Model Error: Erro ao criar usuário: {error}")
-        if conn:
-            conn.rollback()
+        return (None, False)
+
+def create_users_bulk(usuarios, uow=None):
+    """
+    Cria vários usuários num ÚNICO INSERT de várias linhas.
+    'usuarios' é uma lista de tuplas (nome, email, senha_hash, perfil),
+    com as senhas JÁ HASHEADAS e sem e-mails repetidos.
+
+    E-mails que já existem no banco são ignorados (ON CONFLICT DO NOTHING),
+    sem abortar os demais.
+    Retorna um dict {email: novo_id} só com os criados, ou None em caso de erro.
+    """
+    if not usuarios:
+        return {}
+    try:
+        with cursor_scope(uow) as cursor:
+            query = """
+            INSERT INTO usuarios (nome_completo, email, senha_hash, perfil)
+            VALUES %s
+            ON CONFLICT (email) DO NOTHING
+            RETURNING email, id;
+            """
+            # page_size = total: tudo vai numa única instrução
+            linhas = extras.execute_values(cursor, query, usuarios, page_size=len(usuarios), fetch=True)
+            criados = {email: new_id for email, new_id in linhas}
+
+        print(f"Model: {len(criados)} de {len(usuarios)} usuário(s) criados em lote.")
+        return criados
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error: Erro ao criar usuários em lote: {error}")
         return None
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            release_connection(conn)
\ No newline at end of file
+
+def update_senha_hash(user_id, senha_hash, uow=None):
+    """
+    Substitui o hash da senha de um usuário (ex: re-hash com um custo
+    bcrypt maior). Recebe o hash JÁ PRONTO do controller.
+    """
+    try:
+        with cursor_scope(uow) as cursor:
+            query = "UPDATE usuarios SET senha_hash = %s WHERE id = %s;"
+            cursor.execute(query, (senha_hash, user_id))
+            atualizou = cursor.rowcount > 0
+        return atualizou
+
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Model Error: Erro ao atualizar hash da senha: {error}")
+        return False
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from config import settings
+import threading
+import tkinter
+
+"""
+Execução de chamadas de Controller em segundo plano para as Views.
+
+Responsabilidade:
+- Manter um pool de threads compartilhado pela aplicação.
+- Rodar a função fora da thread do Tk e devolver o resultado para a thread
+  do Tk (via widget.after()), onde é seguro mexer na interface.
+- Permitir cancelamento e o modo "o último pedido vence" (key=...), para
+  que cliques repetidos em "Atualizar" não empilhem consultas.
+
+Uso (numa View):
+    background.run_in_background(
+        self, os_controller.listar_os, user_id, perfil,
+        on_success=self._on_os_carregadas, key="lista_os"
+    )
+
+Importante: as funções deste módulo devem ser chamadas pela thread do Tk.
+Nenhum código de interface roda nas threads do pool.
+"""
+
+# Intervalo (ms) em que a thread do Tk verifica se a tarefa terminou
+POLL_MS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Última tarefa de cada (widget, key), para o modo "o último pedido vence"
+_latest_by_key = {}
+
+# TODAS as tarefas pendentes de cada widget (com ou sem key), para cancel_all()
+_pending_by_widget = {}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BG_WORKERS,
+                thread_name_prefix="workstock-bg"
+            )
+        return _executor
+
+
+class BackgroundTask:
+    """
+    Tarefa submetida por run_in_background().
+    cancel() impede a entrega do resultado (e a execução, se ainda não começou).
+    """
+
+    def __init__(self, widget, future, on_success, on_error, key):
+        self.widget = widget
+        self.future = future
+        self.on_success = on_success
+        self.on_error = on_error
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+        self._forget()
+
+    @property
+    def done(self):
+        return self.cancelled or self.future.done()
+
+    def _forget(self):
+        if self.key is not None and _latest_by_key.get(self.key) is self:
+            del _latest_by_key[self.key]
+        pendentes = _pending_by_widget.get(str(self.widget))
+        if pendentes is not None:
+            pendentes.discard(self)
+            if not pendentes:
+                del _pending_by_widget[str(self.widget)]
+
+    def _widget_existe(self):
+        try:
+            return bool(self.widget.winfo_exists())
+        except (tkinter.TclError, RuntimeError):
+            return False
+
+    def _schedule_poll(self):
+        try:
+            self.widget.after(POLL_MS, self._poll)
+        except (tkinter.TclError, RuntimeError):
+            # Janela já foi fechada: ninguém para receber o resultado
+            self.cancel()
+
+    def _poll(self):
+        if self.cancelled:
+            return
+        if not self.future.done():
+            self._schedule_poll()
+            return
+
+        self._forget()
+        if not self._widget_existe():
+            # A janela foi fechada enquanto a tarefa rodava: descarta o resultado
+            return
+        try:
+            resultado = self.future.result()
+        except CancelledError:
+            return
+        except Exception as error:
+            print(f"Background Error: {error}")
+            if self.on_error:
+                self.on_error(error)
+            return
+
+        if self.on_success:
+            self.on_success(resultado)
+
+
+def run_in_background(widget, func, *args, on_success=None, on_error=None, key=None, **kwargs):
+    """
+    Executa func(*args, **kwargs) numa thread do pool.
+
+    - on_success(resultado) e on_error(exceção) são chamados NA THREAD DO TK.
+    - 'widget' é quem agenda a verificação (after); se ele for destruído,
+      o resultado é descartado.
+    - 'key': com a mesma chave (no mesmo widget), o pedido novo cancela o
+      anterior ("o último pedido vence").
+
+    Retorna a BackgroundTask (para cancelar, se necessário).
+    """
+    if key is not None:
+        key = (str(widget), key)
+        anterior = _latest_by_key.get(key)
+        if anterior is not None:
+            anterior.cancel()
+
+    future = _get_executor().submit(func, *args, **kwargs)
+    task = BackgroundTask(widget, future, on_success, on_error, key)
+    if key is not None:
+        _latest_by_key[key] = task
+    _pending_by_widget.setdefault(str(widget), set()).add(task)
+    task._schedule_poll()
+    return task
+
+
+def cancel_all(widget=None):
+    """ Cancela as tarefas pendentes (de um widget, ou de todos), com ou sem key. """
+    if widget is None:
+        tarefas = [task for pendentes in _pending_by_widget.values() for task in pendentes]
+    else:
+        tarefas = list(_pending_by_widget.get(str(widget), ()))
+    for task in tarefas:
+        task.cancel()
+
+
+def shutdown():
+    """
+    Encerra o pool de threads (chamado ao fechar o app, em main.py).
+    Tarefas ainda na fila são descartadas; as que já rodam terminam sozinhas.
+    """
+    global _executor
+    cancel_all()
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,65 +1,224 @@
 import psycopg2
 from psycopg2 import pool
+from psycopg2 import extensions
+from contextlib import contextmanager
 from config import settings  # Importamos nossas configurações
 import sys
+import threading
+import time
 
 # Variável global para armazenar o pool de conexões
 _connection_pool = None
 
+# Protege a criação/fechamento do pool e os contadores abaixo
+_pool_lock = threading.Lock()
+
+# Limita quantas conexões podem estar emprestadas ao mesmo tempo.
+# O ThreadedConnectionPool lança PoolError quando esgota; com o semáforo
+# a thread espera (até DB_POOL_TIMEOUT) por uma conexão devolvida.
+_pool_semaforo = None
+
+# Momento do último uso de cada conexão (id(conn) -> time.monotonic())
+_ultimo_uso = {}
+
+# Estatísticas expostas por get_pool_stats()
+_stats = {
+    "checkouts": 0,    # Total de conexões entregues
+    "em_uso": 0,       # Conexões emprestadas neste momento
+    "descartadas": 0,  # Conexões quebradas que foram fechadas e removidas
+    "timeouts": 0      # Pedidos que desistiram de esperar por uma conexão
+}
+
 def init_db_pool():
     """
     Inicializa o pool de conexões com o PostgreSQL.
     Esta função DEVE ser chamada na inicialização do app (em main.py).
     """
-    global _connection_pool
-    if _connection_pool:
-        return  # Já inicializado
+    global _connection_pool, _pool_semaforo
+    with _pool_lock:
+        if _connection_pool:
+            return  # Já inicializado
 
+        try:
+            print("Inicializando pool de conexões com o PostgreSQL...")
+            # ThreadedConnectionPool: seguro para uso a partir de várias threads
+            _connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn=settings.DB_POOL_MIN,   # Mínimo de conexões prontas
+                maxconn=settings.DB_POOL_MAX,   # Máximo de conexões que o pool pode criar
+                user=settings.DB_USER,
+                password=settings.DB_PASSWORD,
+                host=settings.DB_HOST,
+                port=settings.DB_PORT,
+                database=settings.DB_NAME
+            )
+            if _pool_semaforo is None:
+                # Mantido entre close/init: conexões ainda emprestadas devolvem a vaga nele
+                _pool_semaforo = threading.BoundedSemaphore(settings.DB_POOL_MAX)
+            print("Pool de conexões inicializado com sucesso.")
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(f"Erro ao inicializar o pool de conexões: {error}")
+            sys.exit(1) # Falha crítica: se não conectar ao DB, a app não pode funcionar
+
+def _conexao_valida(conn):
+    """
+    Verifica se uma conexão recém-retirada do pool ainda pode ser usada.
+    Conexões fechadas ou em estado desconhecido (servidor caiu) são rejeitadas.
+    Se a conexão ficou ociosa por muito tempo, faz um 'SELECT 1' para confirmar.
+    """
+    if conn.closed:
+        return False
+    if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+
+    ultimo_uso = _ultimo_uso.get(id(conn))
+    if ultimo_uso is None or time.monotonic() - ultimo_uso > settings.DB_POOL_PING_APOS:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as error:
+            print(f"Conexão inválida detectada no pool: {error}")
+            return False
+    return True
+
+def _descartar_conexao(conn):
+    """ Fecha a conexão e a remove do pool (o pool abrirá outra quando precisar). """
+    _ultimo_uso.pop(id(conn), None)
     try:
-        print("Inicializando pool de conexões com o PostgreSQL...")
-        _connection_pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,   # Mínimo de conexões prontas
-            maxconn=10,  # Máximo de conexões que o pool pode criar
-            user=settings.DB_USER,
-            password=settings.DB_PASSWORD,
-            host=settings.DB_HOST,
-            port=settings.DB_PORT,
-            database=settings.DB_NAME
-        )
-        print("Pool de conexões inicializado com sucesso.")
+        _connection_pool.putconn(conn, close=True)
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Erro ao inicializar o pool de conexões: {error}")
-        sys.exit(1) # Falha crítica: se não conectar ao DB, a app não pode funcionar
+        print(f"Erro ao descartar conexão: {error}")
+    with _pool_lock:
+        _stats["descartadas"] += 1
 
 def get_connection():
     """
     Obtém uma conexão do pool.
-    
+
     Importante: Sempre que obter uma conexão, você DEVE
     liberá-la usando release_connection() quando terminar.
+    (Prefira usar 'with connection()' ou 'with transaction()'.)
     """
     if _connection_pool is None:
         print("Erro: O pool de conexões não foi inicializado.")
         init_db_pool() # Tenta inicializar
-    
+
+    # Espera por uma vaga no pool (em vez de falhar na hora com PoolError)
+    if not _pool_semaforo.acquire(timeout=settings.DB_POOL_TIMEOUT):
+        with _pool_lock:
+            _stats["timeouts"] += 1
+        print("Erro ao obter conexão do pool: tempo de espera esgotado.")
+        return None
+
+    conn = None
     try:
-        # Pega uma conexão "pronta" da garagem
-        conn = _connection_pool.getconn()
-        return conn
+        # Tenta algumas vezes: conexões quebradas são descartadas e substituídas
+        for _ in range(settings.DB_POOL_MAX + 1):
+            # Pega uma conexão "pronta" da garagem
+            conn = _connection_pool.getconn()
+            if _conexao_valida(conn):
+                with _pool_lock:
+                    _stats["checkouts"] += 1
+                    _stats["em_uso"] += 1
+                return conn
+            _descartar_conexao(conn)
+            conn = None
+        print("Erro ao obter conexão do pool: nenhuma conexão válida disponível.")
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"Erro ao obter conexão do pool: {error}")
-        return None
+        if conn is not None:
+            # Retirada mas não entregue: em estado desconhecido, não volta para a garagem
+            _descartar_conexao(conn)
+
+    _pool_semaforo.release()
+    return None
 
-def release_connection(conn):
+def release_connection(conn, descartar=False):
     """
     Devolve uma conexão ao pool para que outros possam usá-la.
+    Se 'descartar' for True (ou a conexão estiver fechada), ela é
+    fechada e removida do pool em vez de ser reaproveitada.
     """
-    if _connection_pool:
-        try:
+    try:
+        if _connection_pool is None:
+            # Pool já fechado (close_db_pool): só fecha a conexão
+            if not conn.closed:
+                conn.close()
+            return
+        with _pool_lock:
+            _stats["em_uso"] -= 1
+        if descartar or conn.closed:
+            _descartar_conexao(conn)
+        else:
+            _ultimo_uso[id(conn)] = time.monotonic()
             # Devolve o "carro" para a garagem
             _connection_pool.putconn(conn)
-        except (Exception, psycopg2.DatabaseError) as error:
-            print(f"Erro ao devolver conexão ao pool: {error}")
+            if conn.closed:
+                # O pool só guarda até 'minconn' conexões paradas; as demais ele fecha
+                _ultimo_uso.pop(id(conn), None)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Erro ao devolver conexão ao pool: {error}")
+    finally:
+        _pool_semaforo.release()
+
+@contextmanager
+def connection():
+    """
+    Empresta uma conexão do pool durante o bloco 'with' e a devolve no final.
+
+    Uso:
+        with db_connector.connection() as conn:
+            ...
+
+    Erros de conexão (OperationalError/InterfaceError) fazem a conexão
+    ser descartada, para que uma queda do servidor não "envenene" o pool.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise psycopg2.OperationalError("Não foi possível obter uma conexão do pool.")
+
+    descartar = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        descartar = True
+        raise
+    finally:
+        release_connection(conn, descartar=descartar)
+
+@contextmanager
+def transaction():
+    """
+    Como connection(), mas dentro de uma transação:
+    faz COMMIT se o bloco terminar sem erro e ROLLBACK caso contrário.
+
+    Uso:
+        with db_connector.transaction() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(...)
+    """
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    pass # A conexão será descartada por connection()
+            raise
+
+def get_pool_stats():
+    """
+    Retorna um dicionário com o estado atual do pool de conexões.
+    Útil para diagnóstico (ex: conexões presas ou quedas frequentes).
+    """
+    with _pool_lock:
+        stats = dict(_stats)
+        stats["minconn"] = settings.DB_POOL_MIN
+        stats["maxconn"] = settings.DB_POOL_MAX
+    return stats
 
 def close_db_pool():
     """
@@ -67,7 +226,10 @@ def close_db_pool():
     Esta função DEVE ser chamada ao fechar o app (em main.py).
     """
     global _connection_pool
-    if _connection_pool:
-        _connection_pool.closeall()
-        _connection_pool = None
-        print("Pool de conexões fechado.")
\ No newline at end of file
+    with _pool_lock:
+        if _connection_pool:
+            _connection_pool.closeall()
+            _connection_pool = None
+            _ultimo_uso.clear()
+            _stats["em_uso"] = 0
+            print("Pool de conexões fechado.")
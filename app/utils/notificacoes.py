@@ -0,0 +1,217 @@
+import psycopg2
+from psycopg2 import extensions
+from collections import deque
+from config import settings
+import select
+import threading
+import tkinter
+
+"""
+Canal de notificações "push" do PostgreSQL (LISTEN/NOTIFY) para as Views.
+
+Responsabilidade:
+- Manter UMA conexão dedicada (fora do pool, em autocommit) escutando os
+  canais do banco, numa thread própria.
+- Entregar cada notificação às janelas interessadas, NA THREAD DO TK
+  (via widget.after()), onde é seguro mexer na interface.
+- Reconectar sozinho se a conexão cair, avisando as janelas (que podem ter
+  perdido notificações nesse intervalo).
+
+O banco publica no canal CANAL_CHAT o texto "<os_id>:<mensagem_id>" a cada
+mensagem nova (trigger da migração 006).
+
+Uso (numa View):
+    self.assinatura = notificacoes.assinar(
+        self, notificacoes.CANAL_CHAT, self.os_id,
+        self._on_novas_mensagens,        # recebe a lista de ids novos
+        ao_reconectar=self.load_chat
+    )
+    ...
+    self.assinatura.cancelar()           # ao fechar a janela
+"""
+
+# Canal das mensagens do chat (ver database/migrations/006_notificacao_chat.sql)
+CANAL_CHAT = "chat_mensagens"
+CANAIS = (CANAL_CHAT,)
+
+# Intervalo (ms) em que a thread do Tk entrega as notificações recebidas
+POLL_MS = 100
+# Tempo máximo (segundos) de cada espera do select() (para poder encerrar a thread)
+ESPERA_SELECT = 5
+# Espera máxima (segundos) entre tentativas de reconexão
+ESPERA_MAX_RECONEXAO = 30
+
+_lock = threading.Lock()
+_thread = None
+_parar = threading.Event()
+_conectado = threading.Event()
+
+# (canal, chave) -> assinaturas ativas
+_assinaturas = {}
+
+
+class Assinatura:
+    """
+    Interesse de uma janela nas notificações de (canal, chave).
+    Os valores chegam pela thread do listener e são entregues em lote
+    para 'callback' na thread do Tk.
+    """
+
+    def __init__(self, widget, canal, chave, callback, ao_reconectar):
+        self.widget = widget
+        self.canal = canal
+        self.chave = str(chave)
+        self.callback = callback
+        self.ao_reconectar = ao_reconectar
+        self.ativa = True
+        self._pendentes = deque()   # Preenchida pela thread do listener
+        self._reconectou = False
+
+    def cancelar(self):
+        self.ativa = False
+        with _lock:
+            assinaturas = _assinaturas.get((self.canal, self.chave))
+            if assinaturas is not None:
+                assinaturas.discard(self)
+                if not assinaturas:
+                    del _assinaturas[(self.canal, self.chave)]
+
+    def _agendar(self):
+        try:
+            self.widget.after(POLL_MS, self._entregar)
+        except (tkinter.TclError, RuntimeError):
+            # Janela já foi fechada
+            self.cancelar()
+
+    def _entregar(self):
+        if not self.ativa:
+            return
+
+        if self._reconectou:
+            self._reconectou = False
+            self._pendentes.clear() # A recarga completa já traz tudo
+            if self.ao_reconectar:
+                self.ao_reconectar()
+        elif self._pendentes:
+            valores = []
+            while self._pendentes:
+                valores.append(self._pendentes.popleft())
+            self.callback(valores)
+
+        self._agendar()
+
+
+def assinar(widget, canal, chave, callback, ao_reconectar=None):
+    """
+    Registra 'callback(valores)' para as notificações de 'canal' com a 'chave'
+    dada (ex: o ID da OS). Inicia o listener na primeira assinatura.
+    Retorna a Assinatura (chame cancelar() ao fechar a janela).
+    """
+    assinatura = Assinatura(widget, canal, chave, callback, ao_reconectar)
+    with _lock:
+        _assinaturas.setdefault((canal, assinatura.chave), set()).add(assinatura)
+    _iniciar()
+    assinatura._agendar()
+    return assinatura
+
+
+def conectado():
+    """ True se o listener está conectado e escutando agora. """
+    return _conectado.is_set()
+
+
+def _iniciar():
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _parar.clear()
+        _thread = threading.Thread(target=_loop, name="workstock-listen", daemon=True)
+        _thread.start()
+
+
+def _conectar():
+    conn = psycopg2.connect(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME
+    )
+    # LISTEN só recebe notificações fora de transação: autocommit obrigatório
+    conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cursor:
+        for canal in CANAIS:
+            cursor.execute(f"LISTEN {canal};")
+    return conn
+
+
+def _despachar(canal, payload):
+    chave, _, valor = payload.partition(":")
+    try:
+        valor = int(valor)
+    except ValueError:
+        pass
+    with _lock:
+        assinaturas = list(_assinaturas.get((canal, chave), ()))
+    for assinatura in assinaturas:
+        assinatura._pendentes.append(valor)
+
+
+def _avisar_reconexao():
+    with _lock:
+        todas = [a for assinaturas in _assinaturas.values() for a in assinaturas]
+    for assinatura in todas:
+        assinatura._reconectou = True
+
+
+def _loop():
+    conn = None
+    espera = 1
+    ja_conectou = False
+
+    while not _parar.is_set():
+        try:
+            if conn is None:
+                conn = _conectar()
+                _conectado.set()
+                espera = 1
+                print("Notificações: escutando o banco (LISTEN).")
+                if ja_conectou:
+                    # Podemos ter perdido notificações enquanto estávamos fora
+                    _avisar_reconexao()
+                ja_conectou = True
+
+            if select.select([conn], [], [], ESPERA_SELECT) == ([], [], []):
+                continue # Nada chegou; volta a esperar (e checa _parar)
+
+            conn.poll()
+            while conn.notifies:
+                notificacao = conn.notifies.pop(0)
+                _despachar(notificacao.channel, notificacao.payload)
+
+        except (psycopg2.OperationalError, psycopg2.InterfaceError, OSError, ValueError) as error:
+            print(f"Notificações: conexão perdida ({error}). Nova tentativa em {espera}s.")
+            _conectado.clear()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+            _parar.wait(espera)
+            espera = min(espera * 2, ESPERA_MAX_RECONEXAO)
+
+    _conectado.clear()
+    if conn is not None:
+        conn.close()
+
+
+def shutdown():
+    """ Encerra o listener (chamado ao fechar o app, em main.py). """
+    global _thread
+    _parar.set()
+    with _lock:
+        thread, _thread = _thread, None
+    if thread is not None:
+        thread.join(timeout=ESPERA_SELECT + 1)
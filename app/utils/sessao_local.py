@@ -0,0 +1,51 @@
+from config import settings
+import json
+import os
+
+"""
+Armazenamento LOCAL do token de sessão ("lembrar de mim").
+
+Responsabilidade:
+- Gravar/ler/apagar o arquivo settings.SESSAO_ARQUIVO, legível só pelo
+  usuário do sistema operacional.
+
+A validade do token é decidida só pela tabela 'sessoes' do banco, com o
+relógio do servidor (ver auth_controller.restaurar_sessao).
+"""
+
+def salvar(token):
+    """ Grava o token. """
+    conteudo = {"token": token}
+    temporario = settings.SESSAO_ARQUIVO + ".tmp"
+    try:
+        # Cria já com permissão 600 (só o dono lê) e troca de uma vez
+        fd = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as arquivo:
+            json.dump(conteudo, arquivo)
+        os.replace(temporario, settings.SESSAO_ARQUIVO)
+        return True
+    except OSError as e:
+        print(f"Sessão local: não foi possível gravar o token. {e}")
+        return False
+
+def ler():
+    """ Retorna o token salvo, ou None (sem arquivo ou inválido). """
+    try:
+        with open(settings.SESSAO_ARQUIVO, encoding="utf-8") as arquivo:
+            conteudo = json.load(arquivo)
+        token = conteudo["token"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Sessão local: arquivo de sessão inválido. {e}")
+        apagar()
+        return None
+    return token
+
+def apagar():
+    try:
+        os.remove(settings.SESSAO_ARQUIVO)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Sessão local: não foi possível apagar o token. {e}")
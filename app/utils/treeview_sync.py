@@ -0,0 +1,114 @@
+"""
+Atualização incremental (por diferença) de um ttk.Treeview.
+
+Responsabilidade:
+- Em vez de apagar e reinserir todas as linhas a cada "Atualizar", comparar
+  as linhas novas com as que já estão na tabela (pela chave, ex: o ID) e só
+  inserir, alterar, remover ou reordenar o que mudou.
+- Manter a seleção, o foco e a posição da rolagem do usuário.
+
+Uso (numa View):
+    self.os_sync = TreeviewSync(self.os_tree)     # chave = 1ª coluna (ID)
+    self.os_sync.sincronizar(linhas)              # substitui o conteúdo
+    self.os_sync.anexar(linhas_da_proxima_pagina) # "Carregar mais"
+
+'linhas' são tuplas de valores JÁ formatadas para exibição (as mesmas que
+seriam passadas em tree.insert(..., values=...)).
+"""
+
+
+def _chave_padrao(valores):
+    return valores[0]
+
+
+class TreeviewSync:
+
+    def __init__(self, tree, chave=_chave_padrao):
+        self.tree = tree
+        self.chave = chave
+        # Valores exibidos em cada linha (iid -> tupla), para comparar sem
+        # consultar o Tk (que devolve tudo convertido para texto)
+        self._valores = {}
+
+    def __len__(self):
+        return len(self._valores)
+
+    def linhas(self):
+        """ Valores exibidos em cada linha, na ordem atual da tabela. """
+        return [self._valores[iid] for iid in self.tree.get_children() if iid in self._valores]
+
+    def _iid(self, valores):
+        return str(self.chave(valores))
+
+    def sincronizar(self, linhas):
+        """
+        Deixa a tabela com exatamente 'linhas', nesta ordem, mexendo só no que mudou.
+        Retorna (inseridas, alteradas, removidas).
+        """
+        novos = {}
+        ordem = []
+        for valores in linhas:
+            valores = tuple(valores)
+            iid = self._iid(valores)
+            if iid in novos:
+                continue # Chave repetida (ex: linha que "andou" entre páginas): vale a primeira
+            novos[iid] = valores
+            ordem.append(iid)
+
+        # Guarda o "lugar" do usuário antes de mexer na tabela
+        topo = self.tree.yview()[0]
+        selecao = self.tree.selection()
+        foco = self.tree.focus()
+
+        removidos = [iid for iid in self._valores if iid not in novos]
+        if removidos:
+            self.tree.delete(*removidos)
+            for iid in removidos:
+                del self._valores[iid]
+
+        inseridas = alteradas = 0
+        for iid in ordem:
+            valores = novos[iid]
+            atual = self._valores.get(iid)
+            if atual is None:
+                self.tree.insert("", "end", iid=iid, values=valores)
+                inseridas += 1
+            elif atual != valores:
+                self.tree.item(iid, values=valores)
+                alteradas += 1
+            self._valores[iid] = valores
+
+        # Reordena numa única chamada, só se a ordem mudou
+        if self.tree.get_children() != tuple(ordem):
+            self.tree.set_children("", *ordem)
+
+        # Restaura seleção (das linhas que continuam), foco e rolagem
+        selecao = [iid for iid in selecao if iid in novos]
+        if tuple(selecao) != self.tree.selection():
+            self.tree.selection_set(selecao)
+        if foco in novos:
+            self.tree.focus(foco)
+        self.tree.yview_moveto(topo)
+
+        return (inseridas, alteradas, len(removidos))
+
+    def anexar(self, linhas):
+        """
+        Acrescenta 'linhas' ao final (próxima página). Uma linha que já está
+        na tabela só tem os valores atualizados, sem mudar de lugar.
+        """
+        for valores in linhas:
+            valores = tuple(valores)
+            iid = self._iid(valores)
+            atual = self._valores.get(iid)
+            if atual is None:
+                self.tree.insert("", "end", iid=iid, values=valores)
+            elif atual != valores:
+                self.tree.item(iid, values=valores)
+            self._valores[iid] = valores
+
+    def limpar(self):
+        """ Remove todas as linhas. """
+        if self._valores:
+            self.tree.delete(*self._valores)
+        self._valores.clear()
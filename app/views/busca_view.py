@@ -0,0 +1,112 @@
+import customtkinter as ctk
+from tkinter import ttk, messagebox
+from app.controllers import os_controller
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
+
+"""
+Camada View (Visão) para a Busca por Texto.
+
+Responsabilidade:
+- Buscar palavras nas OS (descrição, serviço, endereço) e nas conversas do chat.
+- Exibir os resultados por relevância, com um trecho do texto encontrado.
+- Abrir a OS ou o chat do resultado escolhido (duplo clique).
+"""
+
+# Resultados por página
+TAMANHO_PAGINA_BUSCA = 30
+
+class BuscaView(ctk.CTkToplevel):
+
+    def __init__(self, master, user_data, ao_abrir_resultado=None):
+        super().__init__(master)
+
+        self.user_data = user_data
+        # ao_abrir_resultado(os_id, origem): chamado no duplo clique ('os' ou 'mensagem')
+        self.ao_abrir_resultado = ao_abrir_resultado
+
+        self.termo = ""
+        self.cursor = None
+        self.resultados = {} # iid da linha -> resultado
+
+        self.title("Buscar em OS e Conversas")
+        self.geometry("760x480")
+        self.transient(master)
+
+        self.create_widgets()
+
+    def destroy(self):
+        background.cancel_all(self)
+        super().destroy()
+
+    def create_widgets(self):
+        barra = ctk.CTkFrame(self, fg_color="transparent")
+        barra.pack(fill="x", padx=10, pady=10)
+
+        self.termo_entry = ctk.CTkEntry(barra, placeholder_text='Palavras, "frase exata", -excluir')
+        self.termo_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.termo_entry.bind("<Return>", lambda e: self._on_buscar())
+        self.termo_entry.focus()
+
+        ctk.CTkButton(barra, text="Buscar", width=80, command=self._on_buscar).pack(side="right")
+
+        columns = ("origem", "os_id", "trecho", "data")
+        self.resultados_tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse")
+        self.resultados_tree.heading("origem", text="Onde"); self.resultados_tree.heading("os_id", text="OS #")
+        self.resultados_tree.heading("trecho", text="Trecho"); self.resultados_tree.heading("data", text="Data")
+        self.resultados_tree.column("origem", width=80, anchor="center"); self.resultados_tree.column("os_id", width=60, anchor="center")
+        self.resultados_tree.column("trecho", width=460); self.resultados_tree.column("data", width=120, anchor="center")
+        self.resultados_tree.pack(fill="both", expand=True, padx=10)
+        self.resultados_tree.bind("<Double-1>", self._on_double_click)
+
+        self.mais_button = ctk.CTkButton(self, text="Carregar mais", command=self._carregar_pagina,
+                                         fg_color="transparent", border_width=1)
+        self.status_label = ctk.CTkLabel(self, text="", text_color="gray")
+        self.status_label.pack(pady=(5, 10))
+
+    def _on_buscar(self):
+        self.termo = self.termo_entry.get()
+        self.cursor = None
+        self._carregar_pagina(nova_busca=True)
+
+    def _carregar_pagina(self, nova_busca=False):
+        background.run_in_background(
+            self, os_controller.buscar_texto,
+            self.user_data.get('id'), self.user_data.get('perfil'), self.termo,
+            limite=TAMANHO_PAGINA_BUSCA, cursor=None if nova_busca else self.cursor,
+            on_success=lambda resultado: self._on_pagina(resultado, nova_busca),
+            key="busca" # Nova busca antes da anterior terminar: só a última é exibida
+        )
+        self.status_label.configure(text="Buscando...")
+
+    def _on_pagina(self, resultado, nova_busca):
+        sucesso, dados = resultado
+        if not sucesso:
+            self.status_label.configure(text="")
+            messagebox.showwarning("Busca", dados, parent=self)
+            return
+
+        if nova_busca:
+            for item in self.resultados_tree.get_children(): self.resultados_tree.delete(item)
+            self.resultados.clear()
+
+        for r in dados['resultados']:
+            iid = f"{r['origem']}-{r['id']}"
+            if iid in self.resultados: continue
+            self.resultados[iid] = r
+            origem_fmt = "Chat" if r['origem'] == 'mensagem' else "OS"
+            self.resultados_tree.insert("", "end", iid=iid, values=(origem_fmt, r['os_id'], r['trecho'], r['data']))
+
+        self.cursor = dados['proximo_cursor']
+        if self.cursor is not None:
+            self.mais_button.pack(before=self.status_label, pady=(5, 0))
+        else:
+            self.mais_button.pack_forget()
+
+        total = len(self.resultados)
+        self.status_label.configure(text=f"{total} resultado(s)" if total else "Nada encontrado.")
+
+    def _on_double_click(self, event=None):
+        resultado = self.resultados.get(self.resultados_tree.focus())
+        if resultado and self.ao_abrir_resultado:
+            self.ao_abrir_resultado(resultado['os_id'], resultado['origem'])
@@ -1,14 +1,25 @@
 import customtkinter as ctk
 from app.controllers import chat_controller
 from tkinter import messagebox
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
+# Mensagens novas chegam por "push" do banco (LISTEN/NOTIFY)
+from app.utils import notificacoes
+# Lista virtualizada: só as mensagens visíveis viram widgets
+from app.views.lista_mensagens import ListaMensagens
 
 """
 Camada View (Visão) para o Chat da OS.
 
 Responsabilidade:
-- Exibir histórico de mensagens com rolagem.
+- Exibir histórico de mensagens com rolagem (abre nas últimas mensagens;
+  as anteriores são carregadas sob demanda, ao rolar até o topo).
+  A lista é virtualizada (ListaMensagens): o número de widgets não cresce
+  com o tamanho do histórico.
 - Permitir envio de novas mensagens.
 - Diferenciar visualmente mensagens do usuário atual vs. outros.
+- Receber mensagens novas em tempo real (notificação do banco), buscando só elas
+  e acrescentando os balões no fim (sem recriar o histórico).
 """
 
 class ChatView(ctk.CTkToplevel):
@@ -18,6 +29,10 @@ class ChatView(ctk.CTkToplevel):
         
         self.os_id = os_id
         self.current_user_id = current_user_id # ID de quem está logado
+        self._ultimo_id = None     # Maior ID exibido (a próxima busca traz só as posteriores)
+        self._cursor_anterior = None # (data_envio, id) da mais antiga exibida; None = não há anteriores
+        self._carregando_anteriores = False
+        self._ids_pendentes = set() # Avisos recebidos antes da primeira página
         
         self.title(f"Chat - Ordem de Serviço #{self.os_id}")
         self.geometry("500x600")
@@ -29,9 +44,22 @@ class ChatView(ctk.CTkToplevel):
         self.create_widgets()
         self.load_chat()
 
+        # Avisos de mensagens novas desta OS (se a conexão cair e voltar, busca o que faltou)
+        self.assinatura = notificacoes.assinar(
+            self, notificacoes.CANAL_CHAT, self.os_id,
+            self._on_novas_mensagens, ao_reconectar=self.load_chat
+        )
+
+    def destroy(self):
+        if getattr(self, "assinatura", None) is not None:
+            self.assinatura.cancelar()
+        background.cancel_all(self)
+        super().destroy()
+
     def create_widgets(self):
         # --- Área de Histórico (Rolagem) ---
-        self.history_frame = ctk.CTkScrollableFrame(self, width=460, height=480)
+        self.history_frame = ListaMensagens(self, self.current_user_id, width=460, height=480,
+                                            ao_chegar_no_topo=self._carregar_anteriores)
         self.history_frame.pack(pady=10, padx=10, fill="both", expand=True)
         
         # --- Área de Envio ---
@@ -42,9 +70,14 @@ class ChatView(ctk.CTkToplevel):
         self.msg_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
         self.msg_entry.bind("<Return>", self._on_send) # Enter envia
         
-        send_button = ctk.CTkButton(input_frame, text="Enviar", width=80, command=self._on_send)
-        send_button.pack(side="right")
+        self.send_button = ctk.CTkButton(input_frame, text="Enviar", width=80, command=self._on_send)
+        self.send_button.pack(side="right")
         
+        # Carregar mensagens anteriores (também dispara ao rolar até o topo)
+        self.anteriores_button = ctk.CTkButton(self, text="Carregar mensagens anteriores", height=24,
+                                               fg_color="transparent", border_width=1,
+                                               command=self._carregar_anteriores)
+
         # Botão de Atualizar (Manual)
         refresh_btn = ctk.CTkButton(self, text="Atualizar", width=60, height=20, 
                                     fg_color="gray", command=self.load_chat)
@@ -52,78 +85,125 @@ class ChatView(ctk.CTkToplevel):
 
     def load_chat(self):
         """
-        Busca mensagens e preenche o frame de histórico.
+        Busca (em segundo plano) só as mensagens mais novas que a última exibida
+        e acrescenta os balões no fim. Na primeira vez, traz a última página.
         """
-        # Limpa as mensagens antigas da tela
-        for widget in self.history_frame.winfo_children():
-            widget.destroy()
-            
-        sucesso, mensagens = chat_controller.buscar_chat_os(self.os_id)
-        
+        if self._ultimo_id is None:
+            self._carregar_anteriores(inicial=True)
+            return
+        background.run_in_background(
+            self, chat_controller.buscar_chat_os, self.os_id, apos_id=self._ultimo_id,
+            on_success=self._on_chat_carregado, key="chat"
+        )
+
+    def _on_chat_carregado(self, resultado):
+        sucesso, mensagens = resultado
+
         if sucesso:
-            for msg in mensagens:
-                self._add_message_bubble(msg)
-                
-            # Rola para o final (mensagem mais recente)
-            # (O CustomTkinter não tem um método .see() perfeito para scrollable frame,
-            #  mas adicionar os widgets no fim já ajuda).
+            # As mensagens já exibidas ficam; só as novas entram (no fim)
+            if not self.history_frame.adicionar_no_fim(mensagens): return
+            self._ultimo_id = self.history_frame.ultimo_id()
+            self.history_frame.rolar_para_o_fim()
+            self._marcar_como_lidas()
         else:
             pass # Erro silencioso ou log
 
-    def _add_message_bubble(self, msg):
-        """
-        Cria o visual de uma única mensagem (o "balão").
-        """
-        eh_minha = (msg['remetente_id'] == self.current_user_id)
-        
-        # Configuração visual (Alinhamento e Cor)
-        if eh_minha:
-            align = "e" # East (Direita)
-            bubble_color = "#3B8ED0" # Azul padrão
-            text_color = "white"
-            anchor_frame = "e"
+    def _carregar_anteriores(self, inicial=False):
+        """ Busca (em segundo plano) a página de mensagens anterior à mais antiga exibida. """
+        if not inicial and self._cursor_anterior is None: return
+        if self._carregando_anteriores and not inicial: return
+        self._carregando_anteriores = True
+        background.run_in_background(
+            self, chat_controller.buscar_chat_anterior, self.os_id,
+            antes=None if inicial else self._cursor_anterior,
+            on_success=lambda resultado: self._on_anteriores_carregadas(resultado, inicial),
+            on_error=self._on_erro_anteriores,
+            key="anteriores"
+        )
+
+    def _on_erro_anteriores(self, error):
+        self._carregando_anteriores = False # Libera uma nova tentativa
+        print(f"View (Chat): Erro ao carregar mensagens anteriores: {error}")
+        messagebox.showerror("Erro", f"Erro ao carregar mensagens anteriores: {error}")
+
+    def _on_anteriores_carregadas(self, resultado, inicial):
+        self._carregando_anteriores = False
+        sucesso, dados = resultado
+        if not sucesso: return
+
+        # As mensagens vêm em ordem crescente e entram antes das já exibidas
+        self.history_frame.adicionar_no_inicio(dados['mensagens'])
+        if inicial:
+            self._ultimo_id = self.history_frame.ultimo_id()
+        self._cursor_anterior = dados['cursor_anterior']
+
+        if self._cursor_anterior is not None:
+            self.anteriores_button.pack(before=self.history_frame, pady=(10, 0))
         else:
-            align = "w" # West (Esquerda)
-            bubble_color = "#444444" # Cinza escuro
-            text_color = "#DCE4EE"
-            anchor_frame = "w"
-
-        # Container da mensagem
-        container = ctk.CTkFrame(self.history_frame, fg_color="transparent")
-        container.pack(fill="x", pady=5, anchor=anchor_frame)
-        
-        # Balão colorido
-        bubble = ctk.CTkFrame(container, fg_color=bubble_color, corner_radius=15)
-        bubble.pack(anchor=anchor_frame, padx=10) # O pack define o lado
-        
-        # Cabeçalho (Nome - Data)
-        header_text = f"{msg['nome']} ({msg['perfil']})"
-        if not eh_minha: # Só mostra nome se não for eu
-            header_lbl = ctk.CTkLabel(bubble, text=header_text, 
-                                      font=("Arial", 10, "bold"), text_color=text_color)
-            header_lbl.pack(anchor="w", padx=10, pady=(5, 0))
-        
-        # Texto da Mensagem
-        # Usamos 'wraplength' para quebrar linhas se o texto for longo
-        msg_lbl = ctk.CTkLabel(bubble, text=msg['texto'], 
-                               font=("Arial", 12), text_color=text_color,
-                               wraplength=350, justify="left")
-        msg_lbl.pack(padx=10, pady=5)
-        
-        # Rodapé (Hora)
-        time_lbl = ctk.CTkLabel(bubble, text=msg['data'], 
-                                font=("Arial", 9), text_color="#DDDDDD")
-        time_lbl.pack(anchor="e", padx=10, pady=(0, 5))
+            self.anteriores_button.pack_forget()
+
+        if inicial:
+            self.history_frame.rolar_para_o_fim()
+            self._marcar_como_lidas()
+            # Avisos que chegaram durante a primeira busca (o que ela já trouxe é ignorado)
+            pendentes, self._ids_pendentes = self._ids_pendentes, set()
+            if pendentes:
+                self._on_novas_mensagens(pendentes)
+
+    def _marcar_como_lidas(self):
+        """ Avisa (em segundo plano) que o usuário já viu até a última mensagem exibida. """
+        if self._ultimo_id is None: return
+        background.run_in_background(
+            self, chat_controller.marcar_como_lidas, self.os_id, self.current_user_id, self._ultimo_id,
+            key="marcar_lidas"
+        )
+
+    def _on_novas_mensagens(self, ids):
+        """ O banco avisou que chegaram mensagens: busca as que ainda não estão na tela. """
+        faltando = [msg_id for msg_id in ids if not self.history_frame.contem(msg_id)]
+        if not faltando: return
+        if self._ultimo_id is None:
+            # A primeira página ainda não chegou: espera por ela em vez de buscar o histórico todo
+            self._ids_pendentes.update(faltando)
+            return
+        # Uma transação mais lenta pode confirmar um ID menor que o último exibido:
+        # nesse caso a busca começa antes dele (as repetidas são ignoradas)
+        apos_id = min(self._ultimo_id, min(faltando) - 1)
+        background.run_in_background(
+            self, chat_controller.buscar_chat_os, self.os_id, apos_id=apos_id,
+            on_success=self._on_chat_carregado
+        )
 
     def _on_send(self, event=None):
+        if self.send_button.cget("state") == "disabled": return # Envio anterior ainda em andamento
         texto = self.msg_entry.get()
         if not texto.strip(): return
         
-        # Envia
-        sucesso, msg = chat_controller.enviar_mensagem(self.os_id, self.current_user_id, texto)
+        # Envia (em segundo plano); campo e botão ficam travados até a resposta
+        self._travar_envio(True)
+        background.run_in_background(
+            self, chat_controller.enviar_mensagem, self.os_id, self.current_user_id, texto,
+            on_success=self._on_mensagem_enviada,
+            on_error=self._on_erro_envio
+        )
+
+    def _travar_envio(self, travar):
+        estado = "disabled" if travar else "normal"
+        self.send_button.configure(state=estado)
+        self.msg_entry.configure(state=estado)
+
+    def _on_erro_envio(self, error):
+        self._travar_envio(False)
+        messagebox.showerror("Erro", f"Erro ao enviar mensagem: {error}")
+
+    def _on_mensagem_enviada(self, resultado):
+        self._travar_envio(False)
+        sucesso, msg = resultado
         
         if sucesso:
             self.msg_entry.delete(0, "end") # Limpa campo
-            self.load_chat() # Recarrega para ver a mensagem
+            # Com o listener conectado, a própria mensagem chega pela notificação
+            if not notificacoes.conectado():
+                self.load_chat() # Recarrega para ver a mensagem
         else:
             messagebox.showerror("Erro", msg)
\ No newline at end of file
@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from app.controllers import os_controller, estoque_controller
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
 
 # --- PALETA DE CORES ---
 COLOR_PRIMARY = "#264653"
@@ -12,6 +14,10 @@ COLOR_DANGER_HOVER = "#A6391F"
 COLOR_TEXT_DARK = "#264653"
 COLOR_BG_LIGHT = "#F2F2F2"
 
+# Busca de materiais: espera (ms) após a última tecla e máximo de resultados
+SEARCH_DEBOUNCE_MS = 300
+SEARCH_MAX_RESULTS = 10
+
 class GerenciarMateriaisView(ctk.CTkToplevel):
     
     def __init__(self, master, os_id):
@@ -29,15 +35,23 @@ class GerenciarMateriaisView(ctk.CTkToplevel):
         self.transient(master)
         self.grab_set()
         
-        self.inventory_map = {}
+        self.search_results = []     # Resultados da última busca (dicts do controller)
+        self._search_after_id = None  # Busca agendada (debounce)
         
         self._setup_styles()
         self.create_widgets()
         
-        self._load_inventory_list()
         self._load_linked_materials()
         self._load_orcamento_data()
 
+    def destroy(self):
+        # Cancela uma busca agendada para não disparar depois que a janela fechar
+        if getattr(self, "_search_after_id", None) is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        background.cancel_all(self)
+        super().destroy()
+
     def _setup_styles(self):
         style = ttk.Style()
         style.theme_use("default")
@@ -97,8 +111,12 @@ class GerenciarMateriaisView(ctk.CTkToplevel):
         ctk.CTkLabel(right_frame, text="ADICIONAR DO ESTOQUE", 
                      font=("Roboto", 12, "bold"), text_color="#AABEC9").pack(pady=(20, 10))
         
-        self.material_combo = ctk.CTkComboBox(right_frame, values=["Carregando..."], width=280)
-        self.material_combo.pack(pady=(0, 10))
+        # Busca por digitação: só consulta o banco após uma pausa na digitação
+        self.material_search_entry = ctk.CTkEntry(right_frame, width=280, placeholder_text="Buscar (nome, SKU ou fornecedor)")
+        self.material_search_entry.pack(pady=(0, 5))
+        self.material_search_entry.bind("<KeyRelease>", self._on_search_key)
+
+        self.create_search_results_table(right_frame)
         
         self.quantidade_entry = ctk.CTkEntry(right_frame, width=280, placeholder_text="Quantidade")
         self.quantidade_entry.pack(pady=(0, 15))
@@ -146,6 +164,13 @@ class GerenciarMateriaisView(ctk.CTkToplevel):
         )
         self.save_orcamento_button.pack(side="bottom", pady=30)
 
+    def create_search_results_table(self, parent_frame):
+        columns = ("nome", "estoque")
+        self.search_tree = ttk.Treeview(parent_frame, columns=columns, show="headings", height=5, selectmode="browse")
+        self.search_tree.heading("nome", text="Material"); self.search_tree.heading("estoque", text="Estoque")
+        self.search_tree.column("nome", width=210); self.search_tree.column("estoque", width=60, anchor="center")
+        self.search_tree.pack(padx=20, pady=(0, 10), fill="x")
+
     def create_linked_table(self, parent_frame):
         columns = ("os_material_id", "material_id", "nome", "sku", "qtd", "custo_unit")
         self.linked_tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
@@ -162,60 +187,91 @@ class GerenciarMateriaisView(ctk.CTkToplevel):
 
     # --- LÓGICA (Inalterada, apenas colada para manter o arquivo funcional) ---
     
-    def _load_inventory_list(self):
-        sucesso, materiais = estoque_controller.listar_materiais()
-        if not sucesso: return
-        combo_values = []
-        self.inventory_map = {} 
-        for m in materiais:
-            display_name = f"{m['nome']} (Estoque: {m['estoque_atual']})"
-            combo_values.append(display_name)
-            self.inventory_map[display_name] = m['id']
-        self.material_combo.configure(values=combo_values)
-        if combo_values: self.material_combo.set(combo_values[0])
-        else: self.material_combo.set("")
+    def _on_search_key(self, event=None):
+        # Debounce: reinicia a espera a cada tecla; a busca roda quando o usuário para de digitar
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_material_search)
+
+    def _run_material_search(self):
+        self._search_after_id = None
+        termo = self.material_search_entry.get()
+        # key="busca": se o usuário voltar a digitar, só o resultado da última busca é exibido
+        background.run_in_background(self, estoque_controller.buscar_materiais, termo, limite=SEARCH_MAX_RESULTS,
+                                     on_success=self._on_search_result, key="busca")
+
+    def _on_search_result(self, resultado):
+        sucesso, materiais = resultado
+        if not sucesso: materiais = [] # Termo curto/vazio: nada de resultados antigos selecionáveis
+        self.search_results = materiais
+        for item in self.search_tree.get_children(): self.search_tree.delete(item)
+        for index, m in enumerate(materiais):
+            self.search_tree.insert("", "end", iid=str(index), values=(f"{m['nome']} ({m['sku']})", m['estoque_atual']))
+        if materiais:
+            self.search_tree.selection_set("0")
 
     def _load_linked_materials(self):
-        for item in self.linked_tree.get_children(): self.linked_tree.delete(item)
-        sucesso, dados = os_controller.listar_materiais_da_os(self.os_id)
+        background.run_in_background(self, os_controller.listar_materiais_da_os, self.os_id,
+                                     on_success=self._on_linked_materials, key="vinculados")
+
+    def _on_linked_materials(self, resultado):
+        sucesso, dados = resultado
         if sucesso:
+            for item in self.linked_tree.get_children(): self.linked_tree.delete(item)
             for item in dados:
                 valores = (item['os_material_id'], item['material_id'], item['material_nome'], item['sku'], item['quantidade'], f"{item['preco_custo_na_data']:.2f}")
                 self.linked_tree.insert("", "end", values=valores)
 
+    def _recarregar_tudo(self):
+        self._run_material_search(); self._load_linked_materials(); self._load_orcamento_data()
+
+    def _on_erro_background(self, error):
+        messagebox.showerror("Erro", f"Ocorreu um erro inesperado: {error}")
+
     def _on_add_material(self):
-        selected_name = self.material_combo.get()
+        selecionado = self.search_tree.selection()
         quantidade = self.quantidade_entry.get()
-        if not selected_name or not self.inventory_map or selected_name == "Carregando...":
-            messagebox.showwarning("Aviso", "Nenhum material selecionado.")
+        if not selecionado:
+            messagebox.showwarning("Aviso", "Busque e selecione um material.")
             return
-        try: material_id = self.inventory_map[selected_name]
-        except KeyError: return
-        sucesso, msg = os_controller.vincular_material_os(self.os_id, material_id, quantidade)
+        try: material_id = self.search_results[int(selecionado[0])]['id']
+        except (IndexError, ValueError): return
+        background.run_in_background(self, os_controller.vincular_material_os, self.os_id, material_id, quantidade,
+                                     on_success=self._on_material_adicionado, on_error=self._on_erro_background)
+
+    def _on_material_adicionado(self, resultado):
+        sucesso, msg = resultado
         if sucesso:
             messagebox.showinfo("Sucesso", msg)
-            self._load_inventory_list(); self._load_linked_materials(); self._load_orcamento_data()
+            self._recarregar_tudo()
             self.quantidade_entry.delete(0, 'end')
         else:
-            messagebox.showerror("Erro", msg); self._load_inventory_list()
+            messagebox.showerror("Erro", msg); self._run_material_search()
 
     def _on_remove_material(self):
         selected_item = self.linked_tree.focus()
         if not selected_item: return
         item_values = self.linked_tree.item(selected_item, "values")
         try:
-            os_material_id = int(item_values[0]); material_id = int(item_values[1])
-            material_nome = item_values[2]; quantidade_removida = int(item_values[4])
+            os_material_id = int(item_values[0]); material_nome = item_values[2]
         except: return
         if not messagebox.askyesno("Confirmar", f"Remover '{material_nome}'? O estoque será estornado."): return
-        sucesso, msg = os_controller.desvincular_material_os(os_material_id, material_id, quantidade_removida)
+        background.run_in_background(self, os_controller.desvincular_material_os, os_material_id,
+                                     on_success=self._on_material_removido, on_error=self._on_erro_background)
+
+    def _on_material_removido(self, resultado):
+        sucesso, msg = resultado
         if sucesso:
             messagebox.showinfo("Sucesso", msg)
-            self._load_inventory_list(); self._load_linked_materials(); self._load_orcamento_data()
+            self._recarregar_tudo()
         else: messagebox.showerror("Erro", msg)
 
     def _load_orcamento_data(self):
-        sucesso, data = os_controller.get_orcamento_os(self.os_id)
+        background.run_in_background(self, os_controller.get_orcamento_os, self.os_id,
+                                     on_success=self._on_orcamento_data, key="orcamento")
+
+    def _on_orcamento_data(self, resultado):
+        sucesso, data = resultado
         if sucesso:
             self.custo_materiais_label.configure(text=f"R$ {data.get('materiais', 0.0):.2f}")
             self.custo_total_label.configure(text=f"R$ {data.get('total', 0.0):.2f}")
@@ -224,8 +280,12 @@ class GerenciarMateriaisView(ctk.CTkToplevel):
 
     def _on_save_orcamento(self):
         mao_de_obra_str = self.mao_de_obra_entry.get()
-        sucesso, msg = os_controller.recalcular_e_salvar_orcamento_os(self.os_id, mao_de_obra_str)
+        background.run_in_background(self, os_controller.recalcular_e_salvar_orcamento_os, self.os_id, mao_de_obra_str,
+                                     on_success=self._on_orcamento_salvo, on_error=self._on_erro_background)
+
+    def _on_orcamento_salvo(self, resultado):
+        sucesso, msg = resultado
         if sucesso:
             messagebox.showinfo("Sucesso", msg)
             self._load_orcamento_data()
-        else: messagebox.showerror("Erro", msg)
\ No newline at end of file
+        else: messagebox.showerror("Erro", msg)
@@ -0,0 +1,271 @@
+import customtkinter as ctk
+import tkinter
+from bisect import bisect_right
+
+"""
+Lista de mensagens "virtualizada" usada pelo ChatView.
+
+Responsabilidade:
+- Guardar TODAS as mensagens da conversa só como dados (dicts).
+- Criar widgets (balões) apenas para as mensagens visíveis, mais uma pequena
+  margem, e REAPROVEITAR esses balões enquanto o usuário rola.
+- Manter a rolagem coerente: altura estimada para quem ainda não apareceu,
+  altura real (medida) para quem já apareceu.
+
+Assim, o número de widgets fica constante (cerca de uma tela), seja a
+conversa de 20 ou de 10 mil mensagens.
+"""
+
+# Altura (px) presumida de uma mensagem que ainda não foi exibida
+ALTURA_ESTIMADA = 70
+# Espaço (px) entre uma mensagem e outra
+ESPACO = 10
+# Mensagens extras renderizadas acima e abaixo da área visível
+MARGEM = 3
+# Largura máxima do texto dentro do balão
+WRAP_TEXTO = 350
+
+
+class _Balao:
+    """ Um balão reaproveitável: os widgets são criados uma vez e só reconfigurados. """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.msg_id = None
+        self.eh_minha = False
+
+        # Balão colorido
+        self.bubble = ctk.CTkFrame(canvas, corner_radius=15)
+        self.header_lbl = ctk.CTkLabel(self.bubble, font=("Arial", 10, "bold"))
+        self.msg_lbl = ctk.CTkLabel(self.bubble, font=("Arial", 12), wraplength=WRAP_TEXTO, justify="left")
+        self.time_lbl = ctk.CTkLabel(self.bubble, font=("Arial", 9), text_color="#DDDDDD")
+        self.item = canvas.create_window(0, 0, window=self.bubble, anchor="nw", state="hidden")
+
+    def mostrar(self, msg, eh_minha):
+        """ Reconfigura o balão para exibir 'msg'. """
+        self.msg_id = msg['id']
+        self.eh_minha = eh_minha
+
+        # Configuração visual (Cor)
+        if eh_minha:
+            bubble_color = "#3B8ED0" # Azul padrão
+            text_color = "white"
+        else:
+            bubble_color = "#444444" # Cinza escuro
+            text_color = "#DCE4EE"
+        self.bubble.configure(fg_color=bubble_color)
+
+        # Cabeçalho (Nome): só aparece se não for eu
+        self.header_lbl.pack_forget(); self.msg_lbl.pack_forget(); self.time_lbl.pack_forget()
+        if not eh_minha:
+            self.header_lbl.configure(text=f"{msg['nome']} ({msg['perfil']})", text_color=text_color)
+            self.header_lbl.pack(anchor="w", padx=10, pady=(5, 0))
+
+        # Texto da Mensagem e Rodapé (Hora)
+        self.msg_lbl.configure(text=msg['texto'], text_color=text_color)
+        self.msg_lbl.pack(padx=10, pady=5)
+        self.time_lbl.configure(text=msg['data'])
+        self.time_lbl.pack(anchor="e", padx=10, pady=(0, 5))
+
+        self.canvas.itemconfigure(self.item, state="normal")
+
+    def posicionar(self, y, largura):
+        # Minhas mensagens à direita, as dos outros à esquerda
+        if self.eh_minha:
+            self.canvas.coords(self.item, largura - 10, y)
+            self.canvas.itemconfigure(self.item, anchor="ne")
+        else:
+            self.canvas.coords(self.item, 10, y)
+            self.canvas.itemconfigure(self.item, anchor="nw")
+
+    def esconder(self):
+        self.msg_id = None
+        self.canvas.itemconfigure(self.item, state="hidden")
+
+    def altura(self):
+        return self.bubble.winfo_reqheight()
+
+
+class ListaMensagens(ctk.CTkFrame):
+    """
+    Lista rolável de mensagens do chat, com renderização virtualizada.
+
+    - adicionar_no_fim(msgs) / adicionar_no_inicio(msgs): msgs em ordem crescente.
+    - rolar_para_o_fim(): vai até a mensagem mais recente.
+    - 'ao_chegar_no_topo': chamado quando o usuário rola até o início
+      (para carregar mensagens anteriores).
+    """
+
+    def __init__(self, master, current_user_id, ao_chegar_no_topo=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.current_user_id = current_user_id
+        self.ao_chegar_no_topo = ao_chegar_no_topo
+
+        self._mensagens = []   # Dicts das mensagens, em ordem
+        self._ids = set()      # IDs presentes (para ignorar repetidas)
+        self._maior_id = None
+        self._alturas = []     # Altura de cada mensagem (estimada ou medida)
+        self._topos = []       # Posição y do topo de cada mensagem (soma acumulada)
+        self._altura_total = 0
+        self._ativos = {}      # msg_id -> _Balao em uso
+        self._livres = []      # Balões disponíveis para reaproveitar
+
+        cor_fundo = self._apply_appearance_mode(self.cget("fg_color"))
+        self.canvas = tkinter.Canvas(self, highlightthickness=0, bg=cor_fundo, yscrollincrement=20)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self._renderizar())
+        # A roda do mouse sobre qualquer parte da janela rola a lista
+        janela = self.winfo_toplevel()
+        janela.bind("<MouseWheel>", self._on_roda_mouse, add="+")
+        janela.bind("<Button-4>", self._on_roda_mouse, add="+") # Linux (para cima)
+        janela.bind("<Button-5>", self._on_roda_mouse, add="+") # Linux (para baixo)
+
+    def __len__(self):
+        return len(self._mensagens)
+
+    def contem(self, msg_id):
+        return msg_id in self._ids
+
+    # --- Dados ---
+
+    def adicionar_no_fim(self, mensagens):
+        """ Acrescenta mensagens (mais novas) no fim. Retorna quantas eram novas. """
+        novas = [msg for msg in mensagens if msg['id'] not in self._ids]
+        for msg in novas:
+            self._registrar_id(msg['id'])
+            self._topos.append(self._altura_total)
+            self._alturas.append(ALTURA_ESTIMADA)
+            self._mensagens.append(msg)
+            self._altura_total += ALTURA_ESTIMADA + ESPACO
+        if novas:
+            self._atualizar_scrollregion()
+            self._renderizar()
+        return len(novas)
+
+    def adicionar_no_inicio(self, mensagens):
+        """
+        Insere mensagens (mais antigas) no início, mantendo na tela
+        a mensagem que o usuário estava lendo. Retorna quantas eram novas.
+        """
+        novas = [msg for msg in mensagens if msg['id'] not in self._ids]
+        if not novas:
+            return 0
+        topo_visivel = self.canvas.canvasy(0)
+
+        for msg in novas:
+            self._registrar_id(msg['id'])
+        self._mensagens[0:0] = novas
+        self._alturas[0:0] = [ALTURA_ESTIMADA] * len(novas)
+        self._recalcular_topos()
+        self._atualizar_scrollregion()
+
+        # Desloca a rolagem pela altura inserida acima
+        deslocamento = len(novas) * (ALTURA_ESTIMADA + ESPACO)
+        self.canvas.yview_moveto((topo_visivel + deslocamento) / max(self._altura_total, 1))
+        self._renderizar()
+        return len(novas)
+
+    def ultimo_id(self):
+        """ Maior ID presente na lista (None se vazia). """
+        return self._maior_id
+
+    def _registrar_id(self, msg_id):
+        self._ids.add(msg_id)
+        if self._maior_id is None or msg_id > self._maior_id:
+            self._maior_id = msg_id
+
+    # --- Rolagem ---
+
+    def rolar_para_o_fim(self):
+        self.canvas.yview_moveto(1.0)
+        self._renderizar()
+        # Alturas medidas agora podem ter aumentado o total: confirma o fim
+        self.after_idle(lambda: (self.canvas.yview_moveto(1.0), self._renderizar()))
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._apos_rolar()
+
+    def _on_roda_mouse(self, event):
+        if event.num == 4 or event.delta > 0:
+            passos = -1 if not event.delta else -max(1, abs(event.delta) // 120)
+        else:
+            passos = 1 if not event.delta else max(1, abs(event.delta) // 120)
+        self.canvas.yview_scroll(passos * 3, "units")
+        self._apos_rolar()
+
+    def _apos_rolar(self):
+        self._renderizar()
+        if self.ao_chegar_no_topo and self._mensagens and self.canvas.yview()[0] <= 0:
+            self.ao_chegar_no_topo()
+
+    # --- Renderização virtual ---
+
+    def _recalcular_topos(self):
+        y = 0
+        self._topos = []
+        for altura in self._alturas:
+            self._topos.append(y)
+            y += altura + ESPACO
+        self._altura_total = y
+
+    def _atualizar_scrollregion(self):
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), self._altura_total))
+
+    def _faixa_visivel(self):
+        """ Índices (inicio, fim) das mensagens na área visível, com a margem. """
+        topo = self.canvas.canvasy(0)
+        base = topo + self.canvas.winfo_height()
+        inicio = max(bisect_right(self._topos, topo) - 1 - MARGEM, 0)
+        fim = min(bisect_right(self._topos, base) + MARGEM, len(self._mensagens))
+        return inicio, fim
+
+    def _renderizar(self):
+        if not self._mensagens:
+            return
+        largura = self.canvas.winfo_width()
+
+        # Até 2 passadas: medir alturas reais pode mudar o que está visível
+        for _ in range(2):
+            inicio, fim = self._faixa_visivel()
+            visiveis = {self._mensagens[i]['id']: i for i in range(inicio, fim)}
+
+            # Devolve ao estoque os balões que saíram da tela
+            for msg_id in [msg_id for msg_id in self._ativos if msg_id not in visiveis]:
+                balao = self._ativos.pop(msg_id)
+                balao.esconder()
+                self._livres.append(balao)
+
+            # Reaproveita (ou cria) balões para as mensagens que entraram
+            novos = []
+            for msg_id, indice in visiveis.items():
+                if msg_id not in self._ativos:
+                    balao = self._livres.pop() if self._livres else _Balao(self.canvas)
+                    msg = self._mensagens[indice]
+                    balao.mostrar(msg, msg['remetente_id'] == self.current_user_id)
+                    self._ativos[msg_id] = balao
+                    novos.append((indice, balao))
+
+            if not novos:
+                break
+
+            # Mede as alturas reais dos balões recém-exibidos
+            self.canvas.update_idletasks()
+            mudou = False
+            for indice, balao in novos:
+                altura = balao.altura()
+                if altura != self._alturas[indice]:
+                    self._alturas[indice] = altura
+                    mudou = True
+            if not mudou:
+                break
+            self._recalcular_topos()
+            self._atualizar_scrollregion()
+
+        # Posiciona os balões ativos
+        for msg_id, balao in self._ativos.items():
+            balao.posicionar(self._topos[visiveis[msg_id]], largura)
@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from app.controllers import auth_controller
 from tkinter import messagebox
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
 
 # --- PALETA DE CORES ---
 COLOR_PRIMARY = "#264653"   # Teal Escuro (Fundo do Card)
@@ -15,7 +17,7 @@ class LoginView(ctk.CTk):
         super().__init__()
         
         self.title("WorkStock - Login")
-        self.geometry("400x480")
+        self.geometry("400x560")
         self.resizable(False, False)
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
@@ -80,7 +82,14 @@ class LoginView(ctk.CTk):
             text_color=COLOR_TEXT_DARK,
             border_color="white"
         )
-        self.senha_entry.pack(pady=(0, 25))
+        self.senha_entry.pack(pady=(0, 15))
+
+        # Mantém o usuário conectado nas próximas aberturas do app
+        self.lembrar_checkbox = ctk.CTkCheckBox(
+            card_frame, text="Lembrar de mim", text_color=COLOR_TEXT_LIGHT,
+            fg_color=COLOR_ACCENT, hover_color=COLOR_ACCENT_HOVER
+        )
+        self.lembrar_checkbox.pack(pady=(0, 15), padx=(60, 0), anchor="w")
         
         # Botão Entrar (Laranja #F2B263)
         self.login_button = ctk.CTkButton(
@@ -96,24 +105,72 @@ class LoginView(ctk.CTk):
         )
         self.login_button.pack(pady=10)
 
+        # Indicador de "trabalhando" (só aparece durante o login)
+        self.progress_bar = ctk.CTkProgressBar(card_frame, width=280, height=6, mode="indeterminate",
+                                               progress_color=COLOR_ACCENT)
+
         self.senha_entry.bind("<Return>", self._on_login_click)
 
+        # Adianta a busca do usuário enquanto a senha é digitada:
+        # no clique em "Entrar" resta só a verificação da senha (bcrypt)
+        self.email_entry.bind("<FocusOut>", self._pre_carregar_usuario, add="+")
+        self.senha_entry.bind("<FocusIn>", self._pre_carregar_usuario, add="+")
+
         # Dados de teste (opcional)
         self.email_entry.insert(0, "empresa@gmail.com")
         self.senha_entry.insert(0, "123456")
+        self.after(0, self._pre_carregar_usuario)
+
+    def _pre_carregar_usuario(self, event=None):
+        email = self.email_entry.get()
+        if not email.strip(): return
+        background.run_in_background(self, auth_controller.pre_carregar_usuario, email, key="pre_carregar")
+
+    def _set_ocupado(self, ocupado):
+        """ Mostra/esconde o estado "verificando" e bloqueia/libera os campos. """
+        estado = "disabled" if ocupado else "normal"
+        self.email_entry.configure(state=estado)
+        self.senha_entry.configure(state=estado)
+        self.lembrar_checkbox.configure(state=estado)
+        if ocupado:
+            self.login_button.configure(state="disabled", text="VERIFICANDO...")
+            self.progress_bar.pack(pady=(0, 10))
+            self.progress_bar.start()
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.pack_forget()
+            self.login_button.configure(state="normal", text="ENTRAR")
 
     def _on_login_click(self, event=None):
+        # Evita logins duplicados enquanto o anterior ainda está rodando
+        if self.login_button.cget("state") == "disabled": return
+
         email = self.email_entry.get()
         senha = self.senha_entry.get()
-        sucesso, data_or_msg = auth_controller.login(email, senha)
+        lembrar = bool(self.lembrar_checkbox.get())
+
+        # O login (consulta + bcrypt) roda em segundo plano para não congelar a janela
+        self._set_ocupado(True)
+        background.run_in_background(
+            self, auth_controller.login, email, senha, lembrar=lembrar,
+            on_success=self._on_login_result, on_error=self._on_login_error
+        )
+
+    def _on_login_result(self, resultado):
+        sucesso, data_or_msg = resultado
         
         if sucesso:
             self.login_successful = True
             self.user_data = data_or_msg
             self.destroy() 
         else:
+            self._set_ocupado(False)
             messagebox.showerror("Erro de Login", data_or_msg)
 
+    def _on_login_error(self, error):
+        self._set_ocupado(False)
+        messagebox.showerror("Erro de Login", f"Erro inesperado: {error}")
+
     def _on_closing(self):
         self.login_successful = False
         self.destroy()
\ No newline at end of file
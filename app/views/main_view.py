@@ -1,5 +1,5 @@
 import customtkinter as ctk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, Menu
 # Importações das Views
 from app.views.estoque_view import EstoqueView
 from app.views.os_view import OSView
@@ -7,10 +7,16 @@ from app.views.user_view import UserView
 from app.views.gerenciar_materiais_view import GerenciarMateriaisView
 from app.views.solicitacao_view import SolicitacaoView
 from app.views.chat_view import ChatView
+from app.views.busca_view import BuscaView
 from app.controllers import dashboard_controller
 # Importações dos Controllers
 from app.controllers import estoque_controller
 from app.controllers import os_controller
+from app.controllers import auth_controller
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
+# Atualização incremental (por diferença) das tabelas
+from app.utils.treeview_sync import TreeviewSync
 
 # --- PALETA DE CORES ---
 COLOR_PRIMARY = "#264653"   # Teal Escuro (Sidebar, Headers)
@@ -22,6 +28,15 @@ COLOR_DANGER = "#BF4124"    # Vermelho (Perigo)
 COLOR_DANGER_HOVER = "#A6391F"
 COLOR_TEXT_DARK = "#264653" # Texto sobre fundo laranja
 
+# Quantidade de OS carregadas por vez na tabela ("Carregar mais" busca a próxima página)
+TAMANHO_PAGINA_OS = 50
+
+# Quantidade de materiais carregados por vez na tabela de estoque
+TAMANHO_PAGINA_MATERIAIS = 100
+
+# Opção "sem filtro" dos combos de filtro
+FILTRO_TODOS = "Todos"
+
 class MainView(ctk.CTk):
     
     def __init__(self, user_data):
@@ -36,6 +51,7 @@ class MainView(ctk.CTk):
         self.cadastro_user_window = None
         self.gerenciar_materiais_window = None
         self.solicitacao_window = None
+        self.busca_window = None
         self.chat_window = None
 
         self.create_main_widgets()
@@ -64,6 +80,10 @@ class MainView(ctk.CTk):
             font=("Roboto", 12), text_color="#DCE4EE"
         )
         self.user_info_label.pack(pady=(0, 20))
+
+        # "Sair": esquece a sessão lembrada neste computador e fecha o app
+        self.sair_button = self._create_sidebar_button("Sair", self._on_sair)
+        self.sair_button.pack(side="bottom", pady=20, padx=20, fill="x")
         
         # --- SEÇÃO DE ADMINISTRAÇÃO ---
         self.admin_label = ctk.CTkLabel(self.left_frame, text="ADMINISTRAÇÃO", 
@@ -92,6 +112,9 @@ class MainView(ctk.CTk):
 
         self.refresh_os_button = self._create_sidebar_button("Atualizar Lista", self.load_os)
         self.refresh_os_button.pack(pady=5, padx=20, fill="x")
+
+        self.busca_button = self._create_sidebar_button("Buscar (OS e Chat)", self.abrir_busca)
+        self.busca_button.pack(pady=5, padx=20, fill="x")
         
         self.chat_button = self._create_sidebar_button("Ver Chat da OS", self._on_ver_chat)
         self.chat_button.pack(pady=5, padx=20, fill="x")
@@ -176,6 +199,16 @@ class MainView(ctk.CTk):
         self.create_os_table(self.tab_view.tab("Ordens de Serviço"))
         self.create_materials_table(self.tab_view.tab("Estoque"))
 
+    def _on_sair(self):
+        if not messagebox.askyesno("Sair", "Deseja sair da sua conta?\nNa próxima abertura será pedido o login.", parent=self):
+            return
+        self.sair_button.configure(state="disabled")
+        background.run_in_background(
+            self, auth_controller.encerrar_sessao,
+            on_success=lambda resultado: self.destroy(),
+            on_error=lambda erro: self.destroy()
+        )
+
     def _create_sidebar_button(self, text, command):
         """ Helper para criar botões padrão da sidebar """
         return ctk.CTkButton(
@@ -189,6 +222,24 @@ class MainView(ctk.CTk):
             hover_color=COLOR_SECONDARY
         )
 
+    def _executar_acao(self, func, *args, titulo_erro="Erro", apos_sucesso=None):
+        """
+        Helper: roda uma ação de Controller que retorna (sucesso, mensagem)
+        em segundo plano e mostra o resultado quando terminar.
+        """
+        def _on_resultado(resultado):
+            sucesso, msg = resultado
+            if sucesso:
+                messagebox.showinfo("Sucesso", msg)
+                if apos_sucesso: apos_sucesso()
+            else:
+                messagebox.showerror(titulo_erro, msg)
+
+        background.run_in_background(self, func, *args, on_success=_on_resultado, on_error=self._on_erro_background)
+
+    def _on_erro_background(self, error):
+        messagebox.showerror("Erro", f"Ocorreu um erro inesperado. Verifique o console.\n\n{error}")
+
     # --- Métodos de Gestão (Usuário/Admin) ---
 
     def abrir_cadastro_usuario(self):
@@ -224,12 +275,8 @@ class MainView(ctk.CTk):
             material_name = item_values[2] 
             confirm = messagebox.askyesno("Confirmar Exclusão",f"Tem certeza que deseja deletar o material:\n\nID: {material_id}\nNome: {material_name}\n\nEsta ação não pode ser desfeita.")
             if not confirm: return 
-            sucesso, msg = estoque_controller.deletar_material(material_id)
-            if sucesso:
-                messagebox.showinfo("Sucesso", msg)
-                self.load_materials() 
-            else:
-                messagebox.showerror("Erro ao Deletar", msg)
+            self._executar_acao(estoque_controller.deletar_material, material_id,
+                                titulo_erro="Erro ao Deletar", apos_sucesso=self.load_materials)
         except (IndexError, TypeError, ValueError) as e:
             print(f"View (Main) Erro: Não foi possível obter o ID do material. {e}")
             messagebox.showwarning("Aviso", "Não foi possível identificar o material selecionado.")
@@ -256,19 +303,64 @@ class MainView(ctk.CTk):
         
         style.map("Treeview.Heading", background=[('active', COLOR_SECONDARY)])
         
+        self._create_materials_filter_bar(parent_frame)
+
         columns = ("id", "sku", "nome", "estoque_atual", "preco_custo", "unidade_medida")
         self.estoque_tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
         
         self.estoque_tree.heading("id", text="ID"); self.estoque_tree.heading("sku", text="SKU"); self.estoque_tree.heading("nome", text="Nome"); self.estoque_tree.heading("estoque_atual", text="Estoque"); self.estoque_tree.heading("preco_custo", text="Preço (R$)"); self.estoque_tree.heading("unidade_medida", text="Un.")
         self.estoque_tree.column("id", width=40, anchor="center"); self.estoque_tree.column("sku", width=100); self.estoque_tree.column("nome", width=250); self.estoque_tree.column("estoque_atual", width=60, anchor="center"); self.estoque_tree.column("preco_custo", width=80, anchor="e"); self.estoque_tree.column("unidade_medida", width=50, anchor="center")
         self.estoque_tree.pack(fill="both", expand=True, padx=0, pady=0)
+        self.estoque_sync = TreeviewSync(self.estoque_tree) # Linhas identificadas pelo ID do material
+
+        # Paginação do catálogo (uma página por vez)
+        self.materiais_cursor = None
+        self.materiais_filtros = {}
+        self.materiais_versao = None # Versão do catálogo exibido (recarga sem mudanças não busca nada)
+        self.materiais_mais_button = ctk.CTkButton(
+            parent_frame, text="Carregar mais", command=self._carregar_pagina_materiais,
+            fg_color="transparent", border_width=1, border_color=COLOR_PRIMARY, text_color=COLOR_PRIMARY
+        )
+
+    def _create_materials_filter_bar(self, parent_frame):
+        """ Barra de filtros do catálogo (aplicados no servidor). """
+        bar = ctk.CTkFrame(parent_frame, fg_color="transparent")
+        bar.pack(fill="x", pady=(0, 5))
+
+        self.filtro_fornecedor_entry = ctk.CTkEntry(bar, width=180, placeholder_text="Fornecedor contém...")
+        self.filtro_fornecedor_entry.pack(side="left", padx=(0, 5))
+        self.filtro_localizacao_entry = ctk.CTkEntry(bar, width=180, placeholder_text="Localização contém...")
+        self.filtro_localizacao_entry.pack(side="left", padx=5)
+        self.filtro_estoque_baixo_check = ctk.CTkCheckBox(bar, text="Só estoque baixo")
+        self.filtro_estoque_baixo_check.pack(side="left", padx=5)
+
+        ctk.CTkButton(bar, text="Filtrar", width=60, command=self._on_filtrar_materiais,
+                      fg_color=COLOR_ACCENT, hover_color=COLOR_ACCENT_HOVER, text_color=COLOR_TEXT_DARK).pack(side="right")
+
+    def _on_filtrar_materiais(self):
+        self.materiais_filtros = {
+            "fornecedor": self.filtro_fornecedor_entry.get(),
+            "localizacao": self.filtro_localizacao_entry.get(),
+            "estoque_baixo": bool(self.filtro_estoque_baixo_check.get())
+        }
+        self.load_materials(manter_posicao=False) # Consulta nova: volta à 1ª página
 
     def create_dashboard_tab(self, parent_frame):
         """ Cria o conteúdo da aba Dashboard (Cards de Estatísticas). """
         
-        # Busca os dados
-        sucesso, data = dashboard_controller.get_dashboard_data()
-        if not sucesso: return
+        # Busca os dados (em segundo plano); os cards são montados ao receber o resultado
+        background.run_in_background(
+            self, dashboard_controller.get_dashboard_data,
+            on_success=lambda resultado: self._render_dashboard(parent_frame, resultado),
+            on_error=self._on_erro_background, key="dashboard"
+        )
+
+    def _render_dashboard(self, parent_frame, resultado):
+        sucesso, data = resultado
+        if not sucesso or not parent_frame.winfo_exists(): return
+
+        # Remove os cards anteriores (ao clicar em "Atualizar Dados")
+        for widget in parent_frame.winfo_children(): widget.destroy()
 
         # Configuração de Grid
         parent_frame.columnconfigure((0, 1), weight=1)
@@ -310,13 +402,56 @@ class MainView(ctk.CTk):
                       fg_color="transparent", border_width=1, border_color=COLOR_PRIMARY, text_color=COLOR_PRIMARY,
                       command=lambda: self.create_dashboard_tab(parent_frame)).grid(row=2, column=0, columnspan=2, pady=20)
 
-    def load_materials(self):
-        for item in self.estoque_tree.get_children(): self.estoque_tree.delete(item)
-        sucesso, dados = estoque_controller.listar_materiais()
+    def load_materials(self, manter_posicao=True):
+        """
+        Recarrega o catálogo a partir do início (com os filtros atuais).
+        Com 'manter_posicao', busca de novo tantas linhas quantas já estão na tela,
+        para que o operador não perca as páginas carregadas nem o ponto da rolagem.
+        """
+        self._carregar_pagina_materiais(recarregar=True, manter_posicao=manter_posicao)
+
+    def _carregar_pagina_materiais(self, recarregar=False, manter_posicao=False):
+        """ Busca (em segundo plano) a próxima página do catálogo, ou a primeira se 'recarregar'. """
+        cursor = None if recarregar else self.materiais_cursor
+        limite = TAMANHO_PAGINA_MATERIAIS
+        versao_conhecida = None
+        if recarregar and manter_posicao:
+            # Mesma consulta de antes: o Controller responde "não modificado" se nada mudou
+            limite = max(limite, len(self.estoque_sync))
+            versao_conhecida = self.materiais_versao
+        background.run_in_background(
+            self, estoque_controller.listar_materiais,
+            filtros=self.materiais_filtros, limite=limite, cursor=cursor,
+            versao_conhecida=versao_conhecida,
+            on_success=lambda resultado: self._on_pagina_materiais(resultado, recarregar),
+            on_error=self._on_erro_background,
+            key="materiais" # Cliques repetidos: só o último pedido é exibido
+        )
+
+    def _on_pagina_materiais(self, resultado, recarregar):
+        sucesso, dados = resultado
         if sucesso:
-            for material in dados:
-                valores = (material['id'], material['sku'], material['nome'], material['estoque_atual'], f"{material['preco_custo']:.2f}", material['unidade_medida'])
-                self.estoque_tree.insert("", "end", values=valores)
+            if dados.get('nao_modificado'):
+                self.materiais_versao = dados.get('versao') # A tabela já está atualizada
+                return
+            if recarregar:
+                self.materiais_versao = dados.get('versao')
+            # Cada linha já vem na ordem das colunas da tabela: (id, sku, nome, estoque, preço, unidade)
+            linhas = [
+                (material_id, sku, nome, estoque_atual, f"{preco_custo:.2f}", unidade_medida)
+                for material_id, sku, nome, estoque_atual, preco_custo, unidade_medida in dados['materiais']
+            ]
+            # Só as linhas que mudaram são tocadas (seleção e rolagem são mantidas)
+            if recarregar:
+                self.estoque_sync.sincronizar(linhas)
+            else:
+                self.estoque_sync.anexar(linhas)
+            self.materiais_cursor = dados['proximo_cursor']
+
+            if self.materiais_cursor is not None:
+                self.materiais_mais_button.pack(pady=(5, 0))
+            else:
+                self.materiais_mais_button.pack_forget()
         else:
             messagebox.showerror("Erro", "Não foi possível carregar a lista de materiais.")
 
@@ -353,12 +488,7 @@ class MainView(ctk.CTk):
         os_tipo = item_values[3]; os_endereco = item_values[4]
         confirm = messagebox.askyesno("Confirmar Exclusão",f"Tem certeza que deseja deletar a Ordem de Serviço:\n\nOS #: {os_id}\nServiço: {os_tipo}\nEndereço: {os_endereco}\n\nEsta ação não pode ser desfeita.")
         if not confirm: return 
-        sucesso, msg = os_controller.deletar_os(os_id)
-        if sucesso:
-            messagebox.showinfo("Sucesso", msg)
-            self.load_os()
-        else:
-            messagebox.showerror("Erro ao Deletar", msg)
+        self._executar_acao(os_controller.deletar_os, os_id, titulo_erro="Erro ao Deletar", apos_sucesso=self.load_os)
     
     def _on_gerenciar_materiais(self):
         os_id = self._get_selected_os_id()
@@ -374,75 +504,310 @@ class MainView(ctk.CTk):
             self.load_materials()
             self.load_os()
     
+    def _get_selected_os_ids(self):
+        """ IDs de TODAS as OS selecionadas (Ctrl/Shift + clique). """
+        os_ids = []
+        for item in self.os_tree.selection():
+            try:
+                os_ids.append(int(self.os_tree.item(item, "values")[0]))
+            except (IndexError, TypeError, ValueError):
+                continue
+        if not os_ids:
+            messagebox.showwarning("Aviso", "Por favor, selecione uma Ordem de Serviço na tabela primeiro.")
+        return os_ids
+
+    def _executar_transicao_em_lote(self, acao, os_ids, titulo):
+        """ Aplica 'acao' a várias OS numa única chamada e mostra o resultado de cada uma. """
+        def _on_resultado(resultado):
+            sucesso, dados = resultado
+            if not sucesso:
+                messagebox.showerror(titulo, dados)
+                return
+            texto = f"{len(dados['aplicadas'])} de {len(os_ids)} OS atualizada(s)."
+            recusadas = list(dados['recusadas'].items())
+            if recusadas:
+                texto += "\n\nNão alteradas:\n" + "\n".join(f"OS #{os_id}: {motivo}" for os_id, motivo in recusadas[:10])
+                if len(recusadas) > 10:
+                    texto += f"\n... e mais {len(recusadas) - 10}."
+            messagebox.showinfo(titulo, texto)
+            self.load_os()
+
+        background.run_in_background(self, os_controller.aplicar_transicao_em_lote, os_ids, acao,
+                                     on_success=_on_resultado, on_error=self._on_erro_background)
+
+    # Ações do menu de contexto (botão direito) da tabela de OS
+    ACOES_STATUS_MENU = (
+        ("iniciar", "Iniciar (OS sem proprietário)", "Iniciar OS"),
+        ("concluir", "Marcar como concluída(s)", "Concluir OS"),
+        ("cancelar", "Cancelar OS selecionada(s)", "Cancelar OS"),
+    )
+
+    def _on_os_menu_contexto(self, event):
+        # Mudar status livremente é coisa da empresa (os demais aprovam/rejeitam)
+        if self.user_data.get('perfil') != 'empresa': return
+        item = self.os_tree.identify_row(event.y)
+        if not item: return
+        if item not in self.os_tree.selection():
+            self.os_tree.selection_set(item)
+            self.os_tree.focus(item)
+
+        menu = Menu(self, tearoff=0)
+        for acao, rotulo, titulo in self.ACOES_STATUS_MENU:
+            menu.add_command(label=rotulo, command=lambda a=acao, t=titulo: self._on_mudar_status_em_lote(a, t))
+        try:
+            menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            menu.grab_release()
+
+    def _on_mudar_status_em_lote(self, acao, titulo):
+        os_ids = self._get_selected_os_ids()
+        if not os_ids: return
+        lista = ", ".join(f"#{os_id}" for os_id in os_ids[:10]) + (" ..." if len(os_ids) > 10 else "")
+        if not messagebox.askyesno(titulo, f"{titulo}: {len(os_ids)} OS selecionada(s)?\n\n{lista}"): return
+        self._executar_transicao_em_lote(acao, os_ids, titulo)
+
     def _on_enviar_orcamento(self):
-        os_id = self._get_selected_os_id()
-        if not os_id: return
+        os_ids = self._get_selected_os_ids()
+        if not os_ids: return
+        if len(os_ids) > 1:
+            confirm = messagebox.askyesno("Confirmar Envio",f"Deseja enviar os orçamentos das {len(os_ids)} OS selecionadas para aprovação?\n\nO status delas mudará para 'Aguardando Aprovação'.")
+            if confirm: self._executar_transicao_em_lote('enviar', os_ids, "Envio de Orçamentos")
+            return
+        os_id = os_ids[0]
         confirm = messagebox.askyesno("Confirmar Envio",f"Deseja enviar o orçamento da OS #{os_id} para aprovação?\n\nIsso irá mudar o status para 'Aguardando Aprovação'.")
         if not confirm: return
-        sucesso, msg = os_controller.enviar_orcamento_para_aprovacao(os_id)
-        if sucesso:
-            messagebox.showinfo("Sucesso", msg)
-            self.load_os()
-        else:
-            messagebox.showerror("Erro ao Enviar", msg)
+        self._executar_acao(os_controller.enviar_orcamento_para_aprovacao, os_id, titulo_erro="Erro ao Enviar", apos_sucesso=self.load_os)
 
     def _on_aprovar_orcamento(self):
-        os_id = self._get_selected_os_id()
-        if not os_id: return
+        os_ids = self._get_selected_os_ids()
+        if not os_ids: return
+        if len(os_ids) > 1:
+            confirm = messagebox.askyesno("Confirmar Aprovação",f"Deseja APROVAR os orçamentos das {len(os_ids)} OS selecionadas?\n\nO status delas mudará para 'Em Andamento'.")
+            if confirm: self._executar_transicao_em_lote('aprovar', os_ids, "Aprovação de Orçamentos")
+            return
+        os_id = os_ids[0]
         confirm = messagebox.askyesno("Confirmar Aprovação",f"Deseja APROVAR o orçamento da OS #{os_id}?\n\nO status mudará para 'Em Andamento'.")
         if not confirm: return
-        sucesso, msg = os_controller.aprovar_orcamento_os(os_id)
-        if sucesso:
-            messagebox.showinfo("Sucesso", msg)
-            self.load_os()
-        else:
-            messagebox.showerror("Erro ao Aprovar", msg)
+        self._executar_acao(os_controller.aprovar_orcamento_os, os_id, titulo_erro="Erro ao Aprovar", apos_sucesso=self.load_os)
 
     def _on_rejeitar_orcamento(self):
-        os_id = self._get_selected_os_id()
-        if not os_id: return
+        os_ids = self._get_selected_os_ids()
+        if not os_ids: return
+        if len(os_ids) > 1:
+            confirm = messagebox.askyesno("Confirmar Rejeição",f"Deseja REJEITAR os orçamentos das {len(os_ids)} OS selecionadas?\n\nO status delas voltará para 'Aberta'.")
+            if confirm: self._executar_transicao_em_lote('rejeitar', os_ids, "Rejeição de Orçamentos")
+            return
+        os_id = os_ids[0]
         confirm = messagebox.askyesno("Confirmar Rejeição",f"Deseja REJEITAR o orçamento da OS #{os_id}?\n\nO status voltará para 'Aberta'.")
         if not confirm: return
-        sucesso, msg = os_controller.rejeitar_orcamento_os(os_id)
-        if sucesso:
-            messagebox.showinfo("Sucesso", msg)
-            self.load_os()
-        else:
-            messagebox.showerror("Erro ao Rejeitar", msg)
+        self._executar_acao(os_controller.rejeitar_orcamento_os, os_id, titulo_erro="Erro ao Rejeitar", apos_sucesso=self.load_os)
     
     def _on_ver_chat(self):
         os_id = self._get_selected_os_id()
         if not os_id: return
+        self._abrir_chat(os_id)
+
+    def _abrir_chat(self, os_id):
         current_user_id = self.user_data['id']
+        if self.chat_window is not None and self.chat_window.winfo_exists() and self.chat_window.os_id != os_id:
+            self.chat_window.destroy() # Uma janela de chat por vez: troca para a OS pedida
         if self.chat_window is None or not self.chat_window.winfo_exists():
             self.chat_window = ChatView(master=self, os_id=os_id, current_user_id=current_user_id)
+            self.chat_window.bind("<Destroy>", self.on_chat_closed)
         else:
             self.chat_window.focus()
 
+    def abrir_busca(self):
+        if self.busca_window is None or not self.busca_window.winfo_exists():
+            self.busca_window = BuscaView(master=self, user_data=self.user_data,
+                                          ao_abrir_resultado=self._on_abrir_resultado_busca)
+        else:
+            self.busca_window.focus()
+
+    def _on_abrir_resultado_busca(self, os_id, origem):
+        # Mensagem encontrada: abre o chat. OS encontrada: abre a OS (só a empresa edita).
+        if origem == 'os' and self.user_data.get('perfil') == 'empresa':
+            self.abrir_cadastro_os(os_id=os_id)
+        else:
+            self._abrir_chat(os_id)
+
+    def on_chat_closed(self, event):
+        # As mensagens vistas no chat deixam de contar como "novas" na lista
+        if event.widget == self.chat_window:
+            self.load_os()
+
     def create_os_table(self, parent_frame):
+        self._create_os_filter_bar(parent_frame)
+
         # Estilo da Tabela (Mesmo do Estoque)
-        columns = ("id", "status", "prioridade", "tipo_servico", "endereco", "data_abertura", "data_prevista")
-        self.os_tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
-        self.os_tree.heading("id", text="OS #"); self.os_tree.heading("status", text="Status"); self.os_tree.heading("prioridade", text="Prioridade"); self.os_tree.heading("tipo_servico", text="Serviço"); self.os_tree.heading("endereco", text="Endereço"); self.os_tree.heading("data_abertura", text="Data Abertura"); self.os_tree.heading("data_prevista", text="Previsão Entrega")
+        columns = ("id", "status", "prioridade", "tipo_servico", "endereco", "data_abertura", "data_prevista", "nao_lidas")
+        # 'extended': Ctrl/Shift + clique seleciona várias OS (ações em lote)
+        self.os_tree = ttk.Treeview(parent_frame, columns=columns, show="headings", selectmode="extended")
+        self.os_headings = {"id": "OS #", "status": "Status", "prioridade": "Prioridade", "tipo_servico": "Serviço", "endereco": "Endereço", "data_abertura": "Data Abertura", "data_prevista": "Previsão Entrega"}
+        for coluna, titulo in self.os_headings.items():
+            # Clicar no cabeçalho ordena (no servidor) por aquela coluna
+            self.os_tree.heading(coluna, text=titulo, command=lambda c=coluna: self._on_ordenar_os(c))
+        self.os_tree.heading("nao_lidas", text="Msgs Novas") # Não ordenável (vem do chat)
+        self.os_tree.column("nao_lidas", width=90, anchor="center")
         self.os_tree.column("id", width=50, anchor="center"); self.os_tree.column("status", width=120); self.os_tree.column("prioridade", width=80); self.os_tree.column("tipo_servico", width=150); self.os_tree.column("endereco", width=250); self.os_tree.column("data_abertura", width=130, anchor="center"); self.os_tree.column("data_prevista", width=130, anchor="center")
         self.os_tree.pack(fill="both", expand=True, padx=0, pady=0)
         self.os_tree.bind("<Double-1>", self._on_os_double_click)
+        self.os_tree.bind("<Button-3>", self._on_os_menu_contexto) # Mudança de status em lote
+        self.os_sync = TreeviewSync(self.os_tree) # Linhas identificadas pelo ID da OS
+
+        # Paginação: a lista carrega uma página por vez
+        self.os_cursor = None
+        self.os_versao = None # Versão da lista exibida (recarga sem mudanças não busca nada)
+        self.os_ordenar_por = "id"
+        self.os_decrescente = True
+        self.os_filtros = {}
+        self.os_mais_button = ctk.CTkButton(
+            parent_frame, text="Carregar mais", command=self._on_carregar_mais_os,
+            fg_color="transparent", border_width=1, border_color=COLOR_PRIMARY, text_color=COLOR_PRIMARY
+        )
+        self._atualizar_headings_os()
+
+    def _create_os_filter_bar(self, parent_frame):
+        """ Barra de filtros da lista de OS (aplicados no servidor). """
+        bar = ctk.CTkFrame(parent_frame, fg_color="transparent")
+        bar.pack(fill="x", pady=(0, 5))
+
+        self.filtro_status_combo = ctk.CTkComboBox(bar, width=160, values=[FILTRO_TODOS] + os_controller.VALID_STATUS)
+        self.filtro_status_combo.set(FILTRO_TODOS)
+        self.filtro_status_combo.pack(side="left", padx=(0, 5))
+
+        self.filtro_prioridade_combo = ctk.CTkComboBox(bar, width=110, values=[FILTRO_TODOS] + os_controller.VALID_PRIORIDADE)
+        self.filtro_prioridade_combo.set(FILTRO_TODOS)
+        self.filtro_prioridade_combo.pack(side="left", padx=5)
+
+        self.filtro_data_de_entry = ctk.CTkEntry(bar, width=95, placeholder_text="De DD/MM/AAAA")
+        self.filtro_data_de_entry.pack(side="left", padx=5)
+        self.filtro_data_ate_entry = ctk.CTkEntry(bar, width=95, placeholder_text="Até DD/MM/AAAA")
+        self.filtro_data_ate_entry.pack(side="left", padx=5)
+
+        # Filtro por cliente só faz sentido para a Empresa (os demais já veem só as suas OS)
+        self.filtro_cliente_entry = ctk.CTkEntry(bar, width=80, placeholder_text="Cliente ID")
+        if self.user_data.get('perfil') == 'empresa':
+            self.filtro_cliente_entry.pack(side="left", padx=5)
+
+        self.filtro_endereco_entry = ctk.CTkEntry(bar, placeholder_text="Endereço contém...")
+        self.filtro_endereco_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.filtro_endereco_entry.bind("<Return>", lambda e: self._on_filtrar_os())
+
+        ctk.CTkButton(bar, text="Limpar", width=60, command=self._on_limpar_filtros_os,
+                      fg_color="transparent", border_width=1, border_color=COLOR_PRIMARY, text_color=COLOR_PRIMARY).pack(side="right")
+        ctk.CTkButton(bar, text="Filtrar", width=60, command=self._on_filtrar_os,
+                      fg_color=COLOR_ACCENT, hover_color=COLOR_ACCENT_HOVER, text_color=COLOR_TEXT_DARK).pack(side="right", padx=5)
+
+    def _on_filtrar_os(self):
+        status = self.filtro_status_combo.get()
+        prioridade = self.filtro_prioridade_combo.get()
+        self.os_filtros = {
+            "status": "" if status == FILTRO_TODOS else status,
+            "prioridade": "" if prioridade == FILTRO_TODOS else prioridade,
+            "data_de": self.filtro_data_de_entry.get(),
+            "data_ate": self.filtro_data_ate_entry.get(),
+            "cliente_id": self.filtro_cliente_entry.get(),
+            "endereco": self.filtro_endereco_entry.get()
+        }
+        self.load_os(manter_posicao=False) # Consulta nova: volta à 1ª página
+
+    def _on_limpar_filtros_os(self):
+        self.filtro_status_combo.set(FILTRO_TODOS)
+        self.filtro_prioridade_combo.set(FILTRO_TODOS)
+        for entry in (self.filtro_data_de_entry, self.filtro_data_ate_entry, self.filtro_cliente_entry, self.filtro_endereco_entry):
+            entry.delete(0, "end")
+        self.os_filtros = {}
+        self.load_os(manter_posicao=False) # Consulta nova: volta à 1ª página
+
+    def _on_ordenar_os(self, coluna):
+        # Mesmo cabeçalho: inverte a direção. Outro cabeçalho: começa crescente (ID: decrescente).
+        if coluna == self.os_ordenar_por:
+            self.os_decrescente = not self.os_decrescente
+        else:
+            self.os_ordenar_por = coluna
+            self.os_decrescente = (coluna == "id")
+        self._atualizar_headings_os()
+        self.load_os(manter_posicao=False) # Consulta nova: volta à 1ª página
+
+    def _atualizar_headings_os(self):
+        for coluna, titulo in self.os_headings.items():
+            if coluna == self.os_ordenar_por:
+                titulo = f"{titulo} {'▼' if self.os_decrescente else '▲'}"
+            self.os_tree.heading(coluna, text=titulo)
+
+    def _formatar_linha_os(self, os, nao_lidas=0):
+        data_abertura_fmt = os['data_abertura'].strftime('%d/%m/%Y %H:%M')
+        data_prevista_fmt = os['data_conclusao_prevista'].strftime('%d/%m/%Y') if os['data_conclusao_prevista'] else "---"
+        return (os['id'], os['status'].capitalize(), os['prioridade'].capitalize(), os['tipo_servico'], os['endereco'], data_abertura_fmt, data_prevista_fmt, self._formatar_nao_lidas(nao_lidas))
+
+    def _formatar_nao_lidas(self, nao_lidas):
+        return f"● {nao_lidas}" if nao_lidas else ""
+
+    def load_os(self, manter_posicao=True):
+        """
+        Recarrega a lista de OS a partir do início (com os filtros/ordem atuais).
+        Com 'manter_posicao', busca de novo tantas linhas quantas já estão na tela,
+        para que o operador não perca as páginas carregadas nem o ponto da rolagem.
+        """
+        self._carregar_pagina_os(recarregar=True, manter_posicao=manter_posicao)
 
-    def load_os(self):
-        for item in self.os_tree.get_children(): self.os_tree.delete(item)
-        
+    def _on_carregar_mais_os(self):
+        self._carregar_pagina_os()
+
+    def _carregar_pagina_os(self, recarregar=False, manter_posicao=False):
+        """ Busca (em segundo plano) a próxima página de OS, ou a primeira se 'recarregar'. """
         user_id = self.user_data.get('id')
         user_perfil = self.user_data.get('perfil')
-        sucesso, dados = os_controller.listar_os(user_id, user_perfil)
-        
+        cursor = None if recarregar else self.os_cursor
+        limite = TAMANHO_PAGINA_OS
+        versao_conhecida = None
+        os_ids_exibidas = None
+        if recarregar and manter_posicao:
+            # Mesma consulta de antes: o Controller responde "não modificado" se nada mudou
+            limite = max(limite, len(self.os_sync))
+            versao_conhecida = self.os_versao
+            os_ids_exibidas = [linha[0] for linha in self.os_sync.linhas()]
+        background.run_in_background(
+            self, os_controller.listar_os,
+            user_id, user_perfil, filtros=self.os_filtros,
+            ordenar_por=self.os_ordenar_por, decrescente=self.os_decrescente,
+            limite=limite, cursor=cursor, versao_conhecida=versao_conhecida,
+            os_ids_exibidas=os_ids_exibidas,
+            on_success=lambda resultado: self._on_pagina_os(resultado, recarregar),
+            on_error=self._on_erro_background,
+            key="lista_os" # Cliques repetidos: só o último pedido é exibido
+        )
+
+    def _on_pagina_os(self, resultado, recarregar):
+        sucesso, dados = resultado
         if sucesso:
-            for os in dados:
-                data_abertura_fmt = os['data_abertura'].strftime('%d/%m/%Y %H:%M')
-                data_prevista_fmt = os['data_conclusao_prevista'].strftime('%d/%m/%Y') if os['data_conclusao_prevista'] else "---"
-                valores = (os['id'], os['status'].capitalize(), os['prioridade'].capitalize(), os['tipo_servico'], os['endereco'], data_abertura_fmt, data_prevista_fmt)
-                self.os_tree.insert("", "end", values=valores)
+            if dados.get('nao_modificado'):
+                self.os_versao = dados.get('versao') # A lista já está atualizada...
+                # ...menos o contador de não lidas, que não entra na versão
+                nao_lidas = dados.get('nao_lidas', {})
+                self.os_sync.sincronizar([
+                    linha[:-1] + (self._formatar_nao_lidas(nao_lidas.get(linha[0], 0)),)
+                    for linha in self.os_sync.linhas()
+                ])
+                return
+            if recarregar:
+                self.os_versao = dados.get('versao')
+            nao_lidas = dados.get('nao_lidas', {})
+            linhas = [self._formatar_linha_os(os, nao_lidas.get(os['id'], 0)) for os in dados['ordens']]
+            # Só as linhas que mudaram são tocadas (seleção e rolagem são mantidas)
+            if recarregar:
+                self.os_sync.sincronizar(linhas)
+            else:
+                self.os_sync.anexar(linhas)
+            self.os_cursor = dados['proximo_cursor']
+
+            if self.os_cursor is not None:
+                self.os_mais_button.pack(pady=(5, 0))
+            else:
+                self.os_mais_button.pack_forget()
         else:
-            messagebox.showerror("Erro", "Não foi possível carregar a lista de Ordens de Serviço.")
+            messagebox.showerror("Erro", dados)
 
     def abrir_cadastro_os(self, os_id=None):
         if self.cadastro_os_window is None or not self.cadastro_os_window.winfo_exists():
@@ -480,6 +845,7 @@ class MainView(ctk.CTk):
         self.os_label.pack_forget()
         self.nova_os_button.pack_forget()
         self.refresh_os_button.pack_forget()
+        self.busca_button.pack_forget()
         self.chat_button.pack_forget()
         self.delete_os_button.pack_forget()
         self.gerenciar_materiais_button.pack_forget()
@@ -519,6 +885,7 @@ class MainView(ctk.CTk):
             self.os_label.pack(pady=(10, 5), padx=20, fill="x")
             self.nova_os_button.pack(pady=5, padx=20, fill="x")
             self.refresh_os_button.pack(pady=5, padx=20, fill="x")
+            self.busca_button.pack(pady=5, padx=20, fill="x")
             self.chat_button.pack(pady=5, padx=20, fill="x")
             self.delete_os_button.pack(pady=5, padx=20, fill="x")
             self.gerenciar_materiais_button.pack(pady=5, padx=20, fill="x")
@@ -562,6 +929,7 @@ class MainView(ctk.CTk):
             # --- Sidebar ---
             self.os_label.pack(pady=(10, 5), padx=20, fill="x")
             self.refresh_os_button.pack(pady=5, padx=20, fill="x")
+            self.busca_button.pack(pady=5, padx=20, fill="x")
             self.chat_button.pack(pady=5, padx=20, fill="x")
             
             self.orcamento_label.pack(pady=(20, 5), padx=20, fill="x")
@@ -587,6 +955,7 @@ class MainView(ctk.CTk):
             
             self.os_label.pack(pady=(20, 5), padx=20, fill="x")
             self.refresh_os_button.pack(pady=5, padx=20, fill="x")
+            self.busca_button.pack(pady=5, padx=20, fill="x")
             self.chat_button.pack(pady=5, padx=20, fill="x")
             
             # Habilita Botões
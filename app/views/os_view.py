@@ -1,6 +1,12 @@
 import customtkinter as ctk
 from app.controllers import os_controller
+from app.controllers import user_controller
 from tkinter import messagebox
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
+
+# Opção "sem proprietário" do combo
+SEM_PROPRIETARIO = "(nenhum)"
 
 # --- PALETA DE CORES (Mesma da MainView) ---
 COLOR_PRIMARY = "#264653"
@@ -21,6 +27,8 @@ class OSView(ctk.CTkToplevel):
         
         self.prioridades_list = ["baixa", "média", "alta", "urgente"]
         self.status_list = ["aberta", "em andamento", "aguardando aprovação", "concluída", "cancelada"]
+        self.proprietarios = {SEM_PROPRIETARIO: None} # Texto do combo -> ID do usuário
+        self.proprietario_id = None # Proprietário atual da OS (na edição)
         
         # Configurações da Janela
         title_text = f"Editar OS #{self.os_id}" if self.os_id else "Criar Nova Ordem de Serviço"
@@ -28,6 +36,12 @@ class OSView(ctk.CTkToplevel):
         self.geometry("500x700")
         
         self.create_widgets(title_text)
+
+        background.run_in_background(
+            self, user_controller.listar_proprietarios,
+            on_success=self._on_proprietarios_carregados,
+            on_error=lambda error: print(f"View (OS): Erro ao carregar proprietários: {error}")
+        )
         
         if self.os_id:
             self._load_data_for_edit()
@@ -68,12 +82,21 @@ class OSView(ctk.CTkToplevel):
                                                 button_color=COLOR_PRIMARY)
         self.prioridade_combo.pack(fill="x", pady=(5, 10))
         
-        # Status
+        # Status (só leitura: muda pelas ações da lista de OS e do orçamento)
         ctk.CTkLabel(grid_frame, text="Status:", font=("Roboto", 12)).pack(anchor="w")
         self.status_combo = ctk.CTkComboBox(grid_frame, values=self.status_list,
                                             button_color=COLOR_PRIMARY)
+        self.status_combo.set("aberta")
+        self.status_combo.configure(state="disabled")
         self.status_combo.pack(fill="x", pady=(5, 0))
         
+        # Proprietário do imóvel: é quem vê e aprova a OS
+        self._add_label("Proprietário do Imóvel:") # Lista carregada em segundo plano
+        self.proprietario_combo = ctk.CTkComboBox(self.scroll_frame, values=list(self.proprietarios),
+                                                  height=35, button_color=COLOR_PRIMARY, state="readonly")
+        self.proprietario_combo.set(SEM_PROPRIETARIO)
+        self.proprietario_combo.pack(fill="x", pady=(0, 15))
+
         self._add_label("Data Previsão (DD/MM/AAAA):")
         self.data_prevista_entry = ctk.CTkEntry(self.scroll_frame, height=35)
         self.data_prevista_entry.pack(fill="x", pady=(0, 10))
@@ -106,20 +129,45 @@ class OSView(ctk.CTkToplevel):
             self.endereco_text.insert("1.0", dados['endereco'])
             self.descricao_text.insert("1.0", dados['descricao'])
             self.prioridade_combo.set(dados['prioridade'])
+            self.status_combo.configure(state="normal")
             self.status_combo.set(dados['status'])
+            self.status_combo.configure(state="disabled")
             self.data_prevista_entry.insert(0, dados['data_conclusao_prevista'])
+            self.proprietario_id = dados.get('proprietario_id')
+            self._selecionar_proprietario()
         else:
             messagebox.showerror("Erro", dados)
             self.destroy()
 
+    def _on_proprietarios_carregados(self, resultado):
+        _, proprietarios = resultado
+        for p in proprietarios:
+            self.proprietarios[f"{p['nome']} (#{p['id']})"] = p['id']
+        self._selecionar_proprietario()
+
+    def _selecionar_proprietario(self):
+        """ Mostra no combo o proprietário atual da OS (a lista e a OS chegam em qualquer ordem). """
+        proprietario_id = self.proprietario_id
+        if proprietario_id is not None:
+            provisorio = f"Usuário #{proprietario_id}"
+            self.proprietarios.pop(provisorio, None)
+            if proprietario_id not in self.proprietarios.values():
+                # Proprietário inativo (ou lista ainda não carregada): mantém o vínculo ao salvar
+                self.proprietarios[provisorio] = proprietario_id
+        self.proprietario_combo.configure(values=list(self.proprietarios))
+        for texto, user_id in self.proprietarios.items():
+            if user_id == proprietario_id:
+                self.proprietario_combo.set(texto)
+                break
+
     def salvar(self):
         data = {
             "tipo_servico": self.tipo_servico_entry.get(),
             "endereco": self.endereco_text.get("1.0", "end-1c"),
             "descricao": self.descricao_text.get("1.0", "end-1c"),
             "prioridade": self.prioridade_combo.get(),
-            "status": self.status_combo.get(),
             "data_conclusao_prevista": self.data_prevista_entry.get() or None,
+            "proprietario_id": self.proprietarios.get(self.proprietario_combo.get()),
         }
         
         if self.os_id:
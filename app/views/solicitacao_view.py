@@ -63,7 +63,6 @@ class SolicitacaoView(ctk.CTkToplevel):
             
             # --- Dados Padrão (Ocultos do Cliente) ---
             "prioridade": "baixa", # Solicitações de cliente entram como 'baixa'
-            "status": "aberta", # Sempre 'aberta'
             "data_conclusao_prevista": None, # A empresa define isso
             "cliente_id": self.user_id
         }
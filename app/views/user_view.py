@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from app.controllers import user_controller
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
+# Execução das chamadas de Controller fora da thread do Tk
+from app.utils import background
 
 # --- PALETA DE CORES ---
 COLOR_PRIMARY = "#264653"
@@ -14,7 +16,7 @@ class UserView(ctk.CTkToplevel):
         super().__init__(master)
         
         self.title("Cadastrar Novo Usuário")
-        self.geometry("400x600")
+        self.geometry("400x660")
         self.transient(master)
         self.grab_set()
         
@@ -67,6 +69,17 @@ class UserView(ctk.CTkToplevel):
         )
         save_button.pack(fill="x", pady=(20, 0))
 
+        # --- Importação em lote ---
+        self.importar_button = ctk.CTkButton(
+            body_frame,
+            text="Importar vários (CSV)...",
+            height=35,
+            fg_color="transparent", border_width=1,
+            border_color=COLOR_PRIMARY, text_color=COLOR_PRIMARY,
+            command=self.importar_csv
+        )
+        self.importar_button.pack(fill="x", pady=(10, 0))
+
     def _add_label(self, parent, text):
         ctk.CTkLabel(parent, text=text, font=("Roboto", 12, "bold"), text_color="gray").pack(anchor="w", pady=(0, 2))
 
@@ -83,4 +96,43 @@ class UserView(ctk.CTkToplevel):
             messagebox.showinfo("Sucesso", mensagem)
             self.destroy()
         else:
-            messagebox.showerror("Erro", mensagem)
\ No newline at end of file
+            messagebox.showerror("Erro", mensagem)
+
+    def destroy(self):
+        background.cancel_all(self)
+        super().destroy()
+
+    def importar_csv(self):
+        caminho = filedialog.askopenfilename(
+            parent=self, title="Importar usuários",
+            filetypes=[("CSV (nome, email, senha, perfil)", "*.csv"), ("Todos os arquivos", "*.*")]
+        )
+        if not caminho:
+            return
+        # Milhares de linhas levam um tempo (bcrypt): roda em segundo plano
+        self.importar_button.configure(state="disabled", text="Importando...")
+        background.run_in_background(
+            self, user_controller.importar_usuarios, caminho,
+            on_success=self._on_importacao, on_error=self._on_importacao_erro
+        )
+
+    def _on_importacao(self, resultado):
+        self.importar_button.configure(state="normal", text="Importar vários (CSV)...")
+        sucesso, dados = resultado
+        if not sucesso:
+            messagebox.showerror("Erro", dados, parent=self)
+            return
+
+        texto = (f"Criados: {dados['criados']}\n"
+                 f"Já cadastrados: {dados['existentes']}\n"
+                 f"Com erro: {dados['invalidos']}")
+        problemas = [r for r in dados['relatorio'] if r['status'] != 'criado']
+        if problemas:
+            texto += "\n\n" + "\n".join(f"Linha {r['linha']} ({r['email'] or '-'}): {r['mensagem']}" for r in problemas[:10])
+            if len(problemas) > 10:
+                texto += f"\n... e mais {len(problemas) - 10} linha(s)."
+        messagebox.showinfo("Importação concluída", texto, parent=self)
+
+    def _on_importacao_erro(self, error):
+        self.importar_button.configure(state="normal", text="Importar vários (CSV)...")
+        messagebox.showerror("Erro", f"Erro inesperado na importação: {error}", parent=self)
@@ -18,4 +18,29 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "workstock_db")
 DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD") # Deixamos None se não for encontrado
\ No newline at end of file
+DB_PASSWORD = os.getenv("DB_PASSWORD") # Deixamos None se não for encontrado
+
+# --- Configurações do Pool de Conexões ---
+# Mínimo/máximo de conexões mantidas pelo pool (ThreadedConnectionPool)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Tempo máximo (segundos) que uma thread espera por uma conexão livre
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Conexões ociosas há mais tempo que isso (segundos) são testadas com 'SELECT 1' antes do uso
+DB_POOL_PING_APOS = float(os.getenv("DB_POOL_PING_APOS", "30"))
+
+# --- Tarefas em Segundo Plano (app/utils/background.py) ---
+# Threads que executam chamadas de Controller fora da thread do Tk.
+# Deve ser menor ou igual a DB_POOL_MAX (cada tarefa pode usar uma conexão).
+BG_WORKERS = int(os.getenv("BG_WORKERS", "4"))
+
+# --- Segurança ---
+# Custo (work factor) do bcrypt para novas senhas. Cada +1 dobra o tempo do hash.
+# Ao aumentar, as senhas antigas são re-hasheadas no próximo login de cada usuário.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Processos usados para gerar os hashes na importação de usuários em lote (0 = todos os núcleos)
+IMPORTACAO_PROCESSOS = int(os.getenv("IMPORTACAO_PROCESSOS", "0"))
+
+# Sessão "lembrar de mim": validade (dias) e onde o token fica guardado no computador
+SESSAO_DIAS = int(os.getenv("SESSAO_DIAS", "7"))
+SESSAO_ARQUIVO = os.getenv("SESSAO_ARQUIVO", os.path.join(os.path.expanduser("~"), ".workstock_sessao.json"))
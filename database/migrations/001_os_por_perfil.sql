@@ -0,0 +1,22 @@
+-- =====================================================================
+-- 001 - Listagem de OS por perfil (Proprietário / Cliente)
+--
+-- - Cria o vínculo OS -> Proprietário ('proprietario_id'), gravado pelo
+--   formulário da OS. As OS já existentes ficam sem proprietário até a
+--   empresa atribuí-lo (o vínculo dá acesso e direito de aprovação, então
+--   não é deduzido).
+-- - Índices compostos para a paginação por "keyset" (id DESC) usada em
+--   os_model.get_os_by_proprietario() e os_model.get_os_by_cliente().
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+ALTER TABLE ordens_servico
+    ADD COLUMN IF NOT EXISTS proprietario_id INTEGER
+        REFERENCES usuarios(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_os_cliente_id
+    ON ordens_servico (cliente_id, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_os_proprietario_id
+    ON ordens_servico (proprietario_id, id DESC);
@@ -0,0 +1,24 @@
+-- =====================================================================
+-- 002 - Listagem de OS filtrada e paginada no servidor
+--
+-- Índices usados por os_model.get_os_page():
+-- - filtros por status / prioridade mantendo a ordem padrão (id DESC);
+-- - ordenação e filtro por data de abertura;
+-- - busca por trecho do endereço (ILIKE '%texto%') com trigramas.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_os_status_id
+    ON ordens_servico (status, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_os_prioridade_id
+    ON ordens_servico (prioridade, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_os_data_abertura_id
+    ON ordens_servico (data_abertura DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_os_endereco_trgm
+    ON ordens_servico USING gin (endereco gin_trgm_ops);
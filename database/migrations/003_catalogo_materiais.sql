@@ -0,0 +1,17 @@
+-- =====================================================================
+-- 003 - Catálogo de materiais paginado
+--
+-- Índices usados por estoque_model.get_materials_page():
+-- - ordem alfabética com desempate por id (cursor "keyset" (nome, id));
+-- - índice PARCIAL só com os itens abaixo do estoque mínimo, que
+--   costumam ser poucos: o filtro "estoque baixo" lê apenas esse índice.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_materiais_nome_id
+    ON materiais (nome, id);
+
+CREATE INDEX IF NOT EXISTS idx_materiais_estoque_baixo
+    ON materiais (nome, id)
+    WHERE estoque_atual < estoque_minimo;
@@ -0,0 +1,20 @@
+-- =====================================================================
+-- 004 - Busca de materiais por digitação (tela "Gerenciar Materiais")
+--
+-- Índices de trigramas usados por estoque_model.search_materials():
+-- atendem tanto ILIKE '%texto%' quanto o operador de similaridade (%)
+-- em nome, SKU e fornecedor.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_materiais_nome_trgm
+    ON materiais USING gin (nome gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_materiais_sku_trgm
+    ON materiais USING gin (sku gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_materiais_fornecedor_trgm
+    ON materiais USING gin (fornecedor_preferencial gin_trgm_ops);
@@ -0,0 +1,56 @@
+-- =====================================================================
+-- 005 - Registro de alterações por tabela (versão das listagens)
+--
+-- Cada transação que altera 'ordens_servico' ou 'materiais' grava UMA
+-- linha em 'alteracoes_tabelas' (trigger por COMANDO, não por linha),
+-- com o ID da própria transação. Transações diferentes gravam chaves
+-- diferentes: nenhum escritor espera pelo outro (não há uma linha
+-- "contador" compartilhada por tabela).
+--
+-- A "versão" que a tela guarda é o snapshot do banco no momento da
+-- leitura (base_model.get_versao_tabelas): a listagem só mudou se existe
+-- alguma alteração que aquele snapshot ainda não enxergava. Se não mudou,
+-- o "Atualizar" custa só essa consulta, sem buscar a tabela de novo.
+--
+-- Registros com mais de 1 dia são apagados de vez em quando pelo próprio
+-- trigger (versões mais antigas que isso são tratadas como desatualizadas).
+-- Requer PostgreSQL 13+ (pg_current_xact_id / pg_snapshot).
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE TABLE IF NOT EXISTS alteracoes_tabelas (
+    tabela         TEXT      NOT NULL,
+    xid            xid8      NOT NULL DEFAULT pg_current_xact_id(),
+    data_alteracao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tabela, xid)
+);
+
+CREATE OR REPLACE FUNCTION registrar_alteracao_tabela() RETURNS trigger AS $$
+BEGIN
+    -- Mesma transação alterando de novo: a linha já existe
+    INSERT INTO alteracoes_tabelas (tabela) VALUES (TG_TABLE_NAME)
+    ON CONFLICT (tabela, xid) DO NOTHING;
+
+    -- Limpeza ocasional; SKIP LOCKED evita esperar por outra limpeza em andamento
+    IF random() < 0.01 THEN
+        DELETE FROM alteracoes_tabelas
+        WHERE ctid IN (
+            SELECT ctid FROM alteracoes_tabelas
+            WHERE data_alteracao < CURRENT_TIMESTAMP - INTERVAL '1 day'
+            FOR UPDATE SKIP LOCKED
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_alteracao_ordens_servico ON ordens_servico;
+CREATE TRIGGER trg_alteracao_ordens_servico
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ordens_servico
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_alteracao_tabela();
+
+DROP TRIGGER IF EXISTS trg_alteracao_materiais ON materiais;
+CREATE TRIGGER trg_alteracao_materiais
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON materiais
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_alteracao_tabela();
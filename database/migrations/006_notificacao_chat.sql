@@ -0,0 +1,23 @@
+-- =====================================================================
+-- 006 - Notificação (LISTEN/NOTIFY) de mensagens novas no chat
+--
+-- A cada mensagem inserida, publica no canal 'chat_mensagens' o texto
+-- '<os_id>:<id>'. O app mantém uma conexão escutando esse canal
+-- (app/utils/notificacoes.py) e as janelas de chat abertas buscam só as
+-- mensagens novas, sem consultar o banco periodicamente.
+-- A notificação só é entregue quando a transação faz COMMIT.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION notificar_mensagem_chat() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('chat_mensagens', NEW.os_id || ':' || NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notificar_mensagem_chat ON mensagens;
+CREATE TRIGGER trg_notificar_mensagem_chat
+    AFTER INSERT ON mensagens
+    FOR EACH ROW EXECUTE FUNCTION notificar_mensagem_chat();
@@ -0,0 +1,12 @@
+-- =====================================================================
+-- 007 - Busca incremental do chat
+--
+-- chat_model.get_messages_by_os(os_id, apos_id) traz só as mensagens de
+-- uma OS com id maior que o último exibido: o índice (os_id, id) leva
+-- direto a elas, sem ler o histórico inteiro da OS.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_mensagens_os_id
+    ON mensagens (os_id, id);
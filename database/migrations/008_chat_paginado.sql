@@ -0,0 +1,12 @@
+-- =====================================================================
+-- 008 - Histórico do chat paginado ("carregar anteriores")
+--
+-- chat_model.get_messages_page() lê as mensagens de uma OS de trás para
+-- frente, a partir do cursor (data_envio, id) da mais antiga já exibida.
+-- Com este índice, abrir um chat de anos custa o mesmo que um novo.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_mensagens_os_data_id
+    ON mensagens (os_id, data_envio, id);
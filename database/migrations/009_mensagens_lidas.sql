@@ -0,0 +1,24 @@
+-- =====================================================================
+-- 009 - Contador de mensagens não lidas por OS
+--
+-- 'mensagens_lidas' guarda, por usuário e OS, o ID da última mensagem
+-- que o usuário já viu. As não lidas de todas as OS de uma página da
+-- listagem saem de UMA consulta agregada (chat_model.get_nao_lidas_por_os),
+-- que usa o índice (os_id, id) da migração 007.
+--
+-- 'mensagens' e 'mensagens_lidas' NÃO registram alterações (migração
+-- 005): o contador é de cada usuário, e o chat grava a cada mensagem
+-- enviada ou lida. A listagem de OS busca o contador das linhas exibidas
+-- mesmo quando a lista não mudou (os_controller.listar_os).
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE TABLE IF NOT EXISTS mensagens_lidas (
+    usuario_id     INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    os_id          INTEGER NOT NULL REFERENCES ordens_servico(id) ON DELETE CASCADE,
+    ultima_lida_id BIGINT  NOT NULL DEFAULT 0,
+    data_leitura   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (usuario_id, os_id)
+);
+
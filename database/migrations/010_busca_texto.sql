@@ -0,0 +1,20 @@
+-- =====================================================================
+-- 010 - Busca por texto (full-text, português) em OS e no chat
+--
+-- Índices GIN usados por os_model.buscar_texto(). As expressões DEVEM
+-- ser idênticas às da consulta (os_model.TEXTO_BUSCA_OS), senão o
+-- PostgreSQL não usa o índice.
+-- O dicionário 'portuguese' reduz as palavras ao radical e ignora
+-- palavras comuns ("de", "para"...).
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE INDEX IF NOT EXISTS idx_mensagens_busca_texto
+    ON mensagens USING GIN (to_tsvector('portuguese', conteudo));
+
+CREATE INDEX IF NOT EXISTS idx_ordens_servico_busca_texto
+    ON ordens_servico USING GIN (
+        to_tsvector('portuguese',
+            coalesce(descricao, '') || ' ' || coalesce(tipo_servico, '') || ' ' || coalesce(endereco, ''))
+    );
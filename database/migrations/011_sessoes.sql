@@ -0,0 +1,23 @@
+-- =====================================================================
+-- 011 - Sessões "lembrar de mim"
+--
+-- O app guarda localmente um token aleatório; o banco guarda só o HASH
+-- (SHA-256) dele. Ao abrir, o app confere o token aqui: se a sessão não
+-- expirou, não foi revogada e o usuário continua ativo, abre direto a
+-- tela principal, sem login nem bcrypt.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+CREATE TABLE IF NOT EXISTS sessoes (
+    id          BIGSERIAL PRIMARY KEY,
+    usuario_id  INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+    token_hash  TEXT NOT NULL UNIQUE,
+    criada_em   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ultimo_uso  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expira_em   TIMESTAMP NOT NULL,
+    revogada    BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessoes_usuario
+    ON sessoes (usuario_id);
@@ -0,0 +1,31 @@
+-- =====================================================================
+-- 012 - SKU único em materiais
+--
+-- estoque_model.create_material() grava com
+--     INSERT ... ON CONFLICT (sku) DO NOTHING RETURNING id
+-- e o PostgreSQL só aceita ON CONFLICT (sku) se existir um índice (ou
+-- constraint) UNIQUE só nessa coluna. Cria o índice apenas se o banco
+-- ainda não tiver um (ex: "sku ... UNIQUE" no CREATE TABLE original).
+--
+-- Atenção: falha se já houver SKUs repetidos; corrija-os antes.
+--
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index AS i
+        JOIN pg_attribute AS a
+          ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 'materiais'::regclass
+          AND i.indisunique
+          AND i.indnatts = 1
+          AND i.indpred IS NULL
+          AND a.attname = 'sku'
+    ) THEN
+        CREATE UNIQUE INDEX idx_materiais_sku_unico ON materiais (sku);
+    END IF;
+END
+$$;
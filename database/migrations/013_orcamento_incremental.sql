@@ -0,0 +1,77 @@
+-- =====================================================================
+-- 013 - Custo de materiais da OS mantido incrementalmente
+--
+-- Cada INSERT/UPDATE/DELETE em 'os_materiais' aplica só a DIFERENÇA
+-- (preço na data x quantidade) em ordens_servico.orcamento_materiais,
+-- e o orcamento_total acompanha (materiais + mão de obra).
+-- Vale para todos os caminhos: add_material_to_os, reservar_material_para_os,
+-- remove_material_from_os, update_material_quantidade_in_os e exclusões
+-- em cascata. Assim o orçamento lido pela tela é sempre o atual, sem
+-- somar todos os itens da OS.
+--
+-- O UPDATE na linha da OS serializa alterações simultâneas na mesma OS
+-- (trava de linha), então os deltas nunca se perdem.
+--
+-- Script idempotente: pode ser executado mais de uma vez (o acerto
+-- inicial no final recalcula tudo a partir de 'os_materiais').
+-- =====================================================================
+
+CREATE OR REPLACE FUNCTION aplicar_delta_orcamento(p_os_id INTEGER, p_delta NUMERIC)
+RETURNS void AS $$
+BEGIN
+    IF p_os_id IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+    UPDATE ordens_servico SET
+        orcamento_materiais = COALESCE(orcamento_materiais, 0) + p_delta,
+        orcamento_total = COALESCE(orcamento_materiais, 0) + p_delta + COALESCE(orcamento_mao_de_obra, 0)
+    WHERE id = p_os_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION manter_orcamento_materiais()
+RETURNS trigger AS $$
+DECLARE
+    valor_antigo NUMERIC := 0;
+    valor_novo   NUMERIC := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        valor_antigo := COALESCE(OLD.preco_custo_na_data, 0) * COALESCE(OLD.quantidade, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        valor_novo := COALESCE(NEW.preco_custo_na_data, 0) * COALESCE(NEW.quantidade, 0);
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.os_id IS DISTINCT FROM NEW.os_id THEN
+        -- Item trocou de OS: sai de uma, entra na outra
+        PERFORM aplicar_delta_orcamento(OLD.os_id, -valor_antigo);
+        PERFORM aplicar_delta_orcamento(NEW.os_id, valor_novo);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM aplicar_delta_orcamento(OLD.os_id, -valor_antigo);
+    ELSE
+        PERFORM aplicar_delta_orcamento(NEW.os_id, valor_novo - valor_antigo);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orcamento_os_materiais ON os_materiais;
+CREATE TRIGGER trg_orcamento_os_materiais
+    AFTER INSERT OR UPDATE OF os_id, quantidade, preco_custo_na_data OR DELETE ON os_materiais
+    FOR EACH ROW EXECUTE FUNCTION manter_orcamento_materiais();
+
+-- Acerto inicial: parte dos valores corretos (antes o custo só mudava
+-- ao salvar o orçamento na tela "Gerenciar Materiais")
+UPDATE ordens_servico AS o SET
+    orcamento_materiais = t.materiais,
+    orcamento_total = t.materiais + COALESCE(o.orcamento_mao_de_obra, 0)
+FROM (
+    SELECT os.id AS os_id, COALESCE(SUM(osm.preco_custo_na_data * osm.quantidade), 0) AS materiais
+    FROM ordens_servico AS os
+    LEFT JOIN os_materiais AS osm ON osm.os_id = os.id
+    GROUP BY os.id
+) AS t
+WHERE o.id = t.os_id
+  AND (o.orcamento_materiais IS DISTINCT FROM t.materiais
+       OR o.orcamento_total IS DISTINCT FROM t.materiais + COALESCE(o.orcamento_mao_de_obra, 0));
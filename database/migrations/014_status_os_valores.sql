@@ -0,0 +1,18 @@
+-- =====================================================================
+-- 014 - Valores do ENUM status_os criados uma única vez
+--
+-- Antes, aprovar/rejeitar uma OS executava
+--     ALTER TYPE status_os ADD VALUE IF NOT EXISTS ...
+-- a CADA chamada: DDL (trava pesada no tipo) no caminho mais usado.
+-- Os valores passam a ser garantidos aqui, e o app só faz UPDATEs
+-- condicionais (os_model.aplicar_transicao_os, tabela TRANSICOES_OS).
+--
+-- Requer PostgreSQL 12+ (ADD VALUE dentro de transação).
+-- Script idempotente: pode ser executado mais de uma vez.
+-- =====================================================================
+
+ALTER TYPE status_os ADD VALUE IF NOT EXISTS 'aberta';
+ALTER TYPE status_os ADD VALUE IF NOT EXISTS 'aguardando aprovação';
+ALTER TYPE status_os ADD VALUE IF NOT EXISTS 'em andamento';
+ALTER TYPE status_os ADD VALUE IF NOT EXISTS 'concluída';
+ALTER TYPE status_os ADD VALUE IF NOT EXISTS 'cancelada';
@@ -1,6 +1,9 @@
 from app.views.main_view import MainView
 from app.views.login_view import LoginView 
+from app.controllers import auth_controller
 from app.utils import db_connector
+from app.utils import background
+from app.utils import notificacoes
 import sys
 import customtkinter as ctk
 
@@ -9,7 +12,7 @@ Ponto de Entrada Principal (Entry Point) da Aplicação WorkStock.
 
 Responsabilidades:
 1. Inicializar serviços essenciais (DB Pool).
-2. Chamar a Tela de Login (LoginView).
+2. Restaurar a sessão "lembrar de mim" ou chamar a Tela de Login (LoginView).
 3. Aguardar o resultado do login.
 4. Se o login for bem-sucedido, chamar a Tela Principal (MainView).
 5. Gerenciar o desligamento limpo.
@@ -29,20 +32,24 @@ def main():
     ctk.set_appearance_mode("System")
     ctk.set_default_color_theme("blue")
     
-    # --- 2. Exibição da Tela de Login ---
-    login_app = LoginView()
-    # A linha abaixo "pausa" o script aqui até a janela de login fechar
-    login_app.mainloop() 
+    # --- 2. Sessão Lembrada ou Tela de Login ---
+    # Com uma sessão "lembrar de mim" válida, vai direto para a MainView
+    login_successful, user_data = auth_controller.restaurar_sessao()
+
+    if not login_successful:
+        login_app = LoginView()
+        # A linha abaixo "pausa" o script aqui até a janela de login fechar
+        login_app.mainloop() 
+
+        # O script continua daqui quando a LoginView é fechada
+        login_successful = login_app.login_successful
+        user_data = login_app.user_data if login_successful else None
     
     # --- 3. Verificação do Resultado do Login ---
-    # O script continua daqui quando a LoginView é fechada
     
-    if login_app.login_successful:
+    if login_successful:
         print("Login bem-sucedido. Iniciando a aplicação principal...")
         
-        # Pega os dados do usuário que logou
-        user_data = login_app.user_data 
-        
         # --- 4. Exibição da Tela Principal (MainView) ---
         try:
             # Passamos os dados do usuário para a MainView
@@ -59,6 +66,8 @@ def main():
 
     # --- 5. Desligamento Limpo ---
     # (Só será chamado após a MainView ou LoginView fechar)
+    notificacoes.shutdown()
+    background.shutdown()
     db_connector.close_db_pool()
     print("App finalizado.")
 